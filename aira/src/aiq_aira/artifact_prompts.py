@@ -50,6 +50,22 @@ draft report: a report about taiwan manufacturing
 response: {{"relevant": "yes"}}
 """
 
+RELEVANCY_GRADE = """
+You are an AI assistant part of a research team. You have a draft research report and access to
+the data sources for the report. The user will be asking questions about the report and making
+requests for edits.
+
+Determine whether the user prompt is within the scope of the draft report, e.g. a question about the
+report topic or a request to edit the report.
+
+## Prompt
+{prompt}
+
+## Draft Report
+{artifact}
+
+Answer with a single word, yes or no. Is the prompt within scope?"""
+
 
 UPDATE_ENTIRE_ARTIFACT_PROMPT = f"""You are an AI assistant, and the user has requested you make an update to an artifact you generated in the past.
 
@@ -13,18 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import logging
 
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.utils.json import parse_json_markdown
 
 from aiq_aira.artifact_prompts import (
     UPDATE_ENTIRE_ARTIFACT_PROMPT,
-    RELEVANCY_CHECK
+    RELEVANCY_CHECK,
+    RELEVANCY_GRADE
 )
 
+from aiq_aira.llm_gateway import invoke_llm, stream_llm
+from aiq_aira.relevancy import grade_yes_no
 from aiq_aira.schema import ArtifactQAInput, ArtifactQAOutput, ArtifactRewriteMode
+from aiq_aira.stream_utils import remove_think_tags
 
 logger = logging.getLogger(__name__)
 
@@ -33,29 +37,26 @@ logger = logging.getLogger(__name__)
 ##############################
 
 
-def remove_think_tags(text: str) -> str:
+async def check_relevant(llm, artifact, question, chat_history: list[str], grading: str = "json"):
     """
-    Remove any text in a string that is wrapped in <think> tags.
+    Guardrail that checks the question is within the scope of the artifact, returns 'yes' or 'no'.
+    With grading="constrained" the verdict is a single yes/no token instead of a JSON answer.
     """
-    # IF think tags are in there
-    if "<think>" not in text or "</think>" not in text:
-        return text
-
-    while "<think>" in text and "</think>" in text:
-        start = text.find("<think>")
-        end = text.find("</think>") + len("</think>")
-        text = text[:start] + text[end:]
-
-    return text
-
-
+    if grading == "constrained":
+        try:
+            relevant, confidence = await grade_yes_no(
+                llm, RELEVANCY_GRADE.format(artifact=artifact, prompt=question)
+            )
+            logger.info(f"Guardrail grade {relevant} with confidence {confidence}")
+            return relevant
+        except Exception as e:
+            logger.info(f"Failed to apply guardrails with {question}: {e}")
+            return 'no'
 
-async def check_relevant(llm, artifact, question, chat_history: list[str]):
-    
     try:
-        prompt = PromptTemplate.from_template(RELEVANCY_CHECK)
-        relevancy_checker = prompt | llm 
-        result =  await relevancy_checker.ainvoke({"artifact": artifact,"prompt": question})
+        result = await invoke_llm(llm,
+                                  RELEVANCY_CHECK.format(artifact=artifact, prompt=question),
+                                  "relevancy_check")
 
         
         response = parse_json_markdown(result.content)
@@ -63,7 +64,7 @@ async def check_relevant(llm, artifact, question, chat_history: list[str]):
             return 'no'
         
     except Exception as e:
-        logger.info(f"Failed to apply guardrails with {question} and {result}")
+        logger.info(f"Failed to apply guardrails with {question}: {e}")
         return 'no'
     
     return response['relevant']
@@ -83,15 +84,10 @@ async def do_entire_artifact_rewrite(llm, artifact_content: str, user_message: s
     # The user request is appended to the end.
     user_facing_prompt = rewrite_prompt + f"\n\nUser request:\n{user_message}"
 
-    final_text = ""
-    # We'll just read the entire stream from the LLM
-    async for chunk in llm.astream(user_facing_prompt):
-        final_text += chunk.content
+    # We'll just read the entire stream from the LLM, dropping any <think> sections
+    think_filter = await stream_llm(llm, user_facing_prompt, "update_entire_artifact")
 
-    # strip out <think> if present
-    final_text = remove_think_tags(final_text)
-
-    return final_text.strip()
+    return think_filter.answer.strip()
 
 
 ##############################
@@ -123,8 +119,15 @@ async def artifact_chat_handler(llm, input_data: ArtifactQAInput) -> ArtifactQAO
 
         if rewrite_mode == ArtifactRewriteMode.ENTIRE:
 
-            updated = await do_entire_artifact_rewrite(llm, current_artifact,
-                                                       add_context_to_user_message(user_message))
+            try:
+                updated = await do_entire_artifact_rewrite(
+                    llm, current_artifact, add_context_to_user_message(user_message))
+            except asyncio.TimeoutError:
+                return ArtifactQAOutput(
+                    updated_artifact=current_artifact,
+                    assistant_reply="Sorry, rewriting the artifact timed out. "
+                                    "No changes made, please try again."
+                )
 
             return ArtifactQAOutput(
                 updated_artifact=updated,
@@ -166,18 +169,16 @@ async def artifact_chat_handler(llm, input_data: ArtifactQAInput) -> ArtifactQAO
     # Add the new user message
     conversation_messages.append(HumanMessage(content=user_message))
 
-    # Build a ChatPromptTemplate
-    prompt = ChatPromptTemplate.from_messages(conversation_messages).format_messages()
-
-    # Call the LLM
-    answer_buf = ""
-    async for chunk in llm.astream(prompt):
-        answer_buf += chunk.content
-
-    # Remove <think> if present
-    answer_buf = remove_think_tags(answer_buf)
-
-    assistant_reply = answer_buf.strip()
+    # Call the LLM, dropping any <think> sections
+    try:
+        think_filter = await stream_llm(llm, conversation_messages, "artifact_chat")
+    except asyncio.TimeoutError:
+        return ArtifactQAOutput(
+            updated_artifact=current_artifact,
+            assistant_reply="Sorry, answering the question timed out. Please try again."
+        )
+
+    assistant_reply = think_filter.answer.strip()
 
     return ArtifactQAOutput(
         updated_artifact=current_artifact,
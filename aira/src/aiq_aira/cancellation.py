@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextvars
+import logging
+import threading
+from collections import Counter
+from typing import Any, AsyncIterator
+
+from aiq_aira.telemetry import observe_run
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class RunMetrics:
+    """
+    Counts the outcomes of the report runs: completed, cancelled (client disconnected) or failed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+        observe_run(outcome)
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+run_metrics = RunMetrics()
+
+
+async def cancel_on_disconnect(
+        stream: AsyncIterator[Any],
+        run_id: str | None = None,
+        context: contextvars.Context | None = None
+) -> AsyncIterator[Any]:
+    """
+    Consume `stream` (e.g. a graph run) in its own task and yield its items.
+    When the consumer goes away, i.e. this generator is cancelled or closed because the client of
+    the streaming endpoint disconnected, the task is cancelled. The cancellation reaches the
+    in-flight graph nodes and aborts their RAG and web search requests, LLM streams and NIM calls.
+    Items are handed over one at a time, so the run does not get ahead of the client.
+    The task runs in `context` if given, e.g. the scheduling lane of the request.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def _pump():
+        try:
+            async for item in stream:
+                await queue.put((item, None))
+            await queue.put((_DONE, None))
+        except Exception as e:
+            await queue.put((_DONE, e))
+
+    task = asyncio.create_task(_pump(), context=context)
+    outcome = "cancelled"
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                outcome = "failed" if error is not None else "completed"
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        run_metrics.record(outcome)
+        if not task.done():
+            logger.info(f"Client disconnected, cancelling run {run_id or ''}".rstrip())
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,191 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_PREFIX = "zlib+"
+# old threads are pruned at most this often while reports are written
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Checkpoint serializer that zlib-compresses large payloads.
+    Research results and report drafts are long, repetitive text, so the
+    checkpoints written after every node shrink considerably.
+    """
+
+    def __init__(self, min_size: int = 1024, level: int = 6):
+        self.min_size = min_size
+        self.level = level
+        self._serde = JsonPlusSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self._serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self._serde.dumps_typed(obj)
+        if len(data) < self.min_size:
+            return type_, data
+        return f"{COMPRESSED_PREFIX}{type_}", zlib.compress(data, self.level)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_.startswith(COMPRESSED_PREFIX):
+            return self._serde.loads_typed((type_[len(COMPRESSED_PREFIX):], zlib.decompress(data_)))
+        return self._serde.loads_typed((type_, data_))
+
+
+def _persistable_config(config: RunnableConfig) -> RunnableConfig:
+    """
+    Keep only plain values of the configurable, the LLM client is provided again on resume
+    and must not end up in the checkpoint metadata.
+    """
+    configurable = {
+        key: value for key, value in config["configurable"].items()
+        if key.startswith("__") or value is None or isinstance(value, (str, int, float, bool))
+    }
+    return {**config, "configurable": configurable}
+
+
+class ReportCheckpointer(AsyncSqliteSaver):
+    """
+    SQLite checkpointer for the report graph.
+    Tracks when each thread (report) was last written so old checkpoints can be pruned.
+    With retention_seconds, threads not written for that long are pruned at most every
+    prune_interval seconds when checkpoints are written, so the file of a long running server stays
+    bounded.
+    """
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        serde: SerializerProtocol | None = None,
+        retention_seconds: float = 0,
+        prune_interval: float = PRUNE_INTERVAL_SECONDS
+    ):
+        super().__init__(conn, serde=serde)
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._pruned_at: float | None = None
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await super().setup()
+        async with self.lock:
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_threads "
+                "(thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            await self.conn.commit()
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = await super().aput(
+            _persistable_config(config), checkpoint, metadata, new_versions
+        )
+        async with self.lock:
+            await self.conn.execute(
+                "INSERT OR REPLACE INTO report_threads (thread_id, updated_at) VALUES (?, ?)",
+                (str(config["configurable"]["thread_id"]), time.time())
+            )
+            await self.conn.commit()
+        await self.prune_if_due()
+        return next_config
+
+    async def prune_if_due(self) -> int:
+        """
+        Prune the threads older than retention_seconds if the last pruning was at least
+        prune_interval seconds ago. Returns the number of threads removed.
+        """
+        if self.retention_seconds <= 0:
+            return 0
+        if self._pruned_at is not None and time.monotonic() - self._pruned_at < self.prune_interval:
+            return 0
+        self._pruned_at = time.monotonic()
+        return await self.prune(self.retention_seconds)
+
+    async def prune(self, max_age_seconds: float) -> int:
+        """
+        Delete the checkpoints of every thread that was not written in the last max_age_seconds.
+        Returns the number of threads removed.
+        """
+        await self.setup()
+        cutoff = time.time() - max_age_seconds
+        async with self.lock:
+            async with self.conn.execute(
+                "SELECT thread_id FROM report_threads WHERE updated_at < ?", (cutoff,)
+            ) as cursor:
+                thread_ids = [row[0] for row in await cursor.fetchall()]
+            for table in ("checkpoints", "writes", "report_threads"):
+                await self.conn.executemany(
+                    f"DELETE FROM {table} WHERE thread_id = ?",
+                    [(thread_id,) for thread_id in thread_ids]
+                )
+            await self.conn.commit()
+        if thread_ids:
+            logger.info(f"Pruned checkpoints of {len(thread_ids)} report threads")
+        return len(thread_ids)
+
+
+@asynccontextmanager
+async def open_checkpointer(
+        db_path: str,
+        retention_hours: float = 0,
+        prune_interval: float = PRUNE_INTERVAL_SECONDS
+) -> AsyncIterator[ReportCheckpointer | None]:
+    """
+    Open the report checkpointer for the lifetime of a function.
+    An empty db_path disables checkpointing.
+    Threads older than retention_hours are pruned on open and then at most every prune_interval
+    seconds while checkpoints are written (0 keeps everything).
+    """
+    if not db_path:
+        yield None
+        return
+
+    async with aiosqlite.connect(db_path) as conn:
+        checkpointer = ReportCheckpointer(
+            conn,
+            serde=CompressedSerializer(),
+            retention_seconds=retention_hours * 3600,
+            prune_interval=prune_interval
+        )
+        await checkpointer.setup()
+        await checkpointer.prune_if_due()
+        yield checkpointer
@@ -0,0 +1,131 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Callable
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+def documents_hash(document_names: list[str]) -> str:
+    """
+    Content hash of a collection's document list, independent of the listing order.
+    Also used by data/sync_files2.py for the hash it writes to the registry file.
+    """
+    return hashlib.sha256("\n".join(sorted(document_names)).encode("utf-8")).hexdigest()
+
+
+class CollectionVersionRegistry:
+    """
+    Tracks the version of each RAG collection, so cache keys change when documents are ingested.
+
+    Versions come from the registry file that data/sync_files2.py updates after an upload FINISHED
+    (a monotonic counter plus the content hash of the document list).
+    Collections missing from the file are versioned by hashing the document list from
+    `GET /documents` of the ingestor server, refreshed at most every refresh_seconds.
+    Without either source every collection has the version "".
+
+    Listeners added with `on_change(collection, new_version)` are called the first time a new
+    version of a collection is seen, e.g. to evict cache entries of the previous version.
+    """
+
+    def __init__(self,
+                 registry_file: str = "",
+                 rag_ingest_url: str = "",
+                 refresh_seconds: float = 300):
+        self.registry_file = registry_file
+        self.rag_ingest_url = rag_ingest_url.rstrip("/")
+        self.refresh_seconds = refresh_seconds
+        self._file_mtime: float | None = None
+        self._file_versions: dict[str, str] = {}
+        self._fetched: dict[str, tuple[float, str]] = {}
+        self._seen: dict[str, str] = {}
+        self._listeners: list[Callable[[str, str], None]] = []
+
+    def on_change(self, listener: Callable[[str, str], None]):
+        self._listeners.append(listener)
+
+    def refresh(self):
+        """
+        Forgets the versions read from the registry file and the ingestor server,
+        the next get_version reads them again.
+        """
+        self._file_mtime = None
+        self._fetched.clear()
+
+    async def get_version(self, collection: str) -> str:
+        version = self._version_from_file(collection)
+        if version is None and self.rag_ingest_url:
+            version = await self._version_from_documents(collection)
+
+        version = version or ""
+        previous = self._seen.get(collection)
+        self._seen[collection] = version
+        if previous is not None and previous != version:
+            logger.info(f"Collection {collection} changed from version {previous!r} to {version!r}")
+            for listener in self._listeners:
+                listener(collection, version)
+        return version
+
+    def _version_from_file(self, collection: str) -> str | None:
+        if not self.registry_file:
+            return None
+        try:
+            mtime = os.stat(self.registry_file).st_mtime
+            if mtime != self._file_mtime:
+                with open(self.registry_file, "r") as f:
+                    collections = json.load(f).get("collections", {})
+                self._file_versions = {
+                    name: f"{entry['version']}-{entry['content_hash'][:16]}"
+                    for name, entry in collections.items()
+                }
+                self._file_mtime = mtime
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Could not read collection versions from {self.registry_file}: {e}")
+        return self._file_versions.get(collection)
+
+    async def _version_from_documents(self, collection: str) -> str | None:
+        fetched_at, version = self._fetched.get(collection, (None, None))
+        if fetched_at is not None and time.monotonic() - fetched_at < self.refresh_seconds:
+            return version
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f"{self.rag_ingest_url}/documents",
+                    params={"collection_name": collection},
+                    timeout=aiohttp.ClientTimeout(total=10)
+                ) as response:
+                    response.raise_for_status()
+                    result = await response.json()
+            names = [doc["document_name"] for doc in result.get("documents", [])]
+            version = f"docs-{documents_hash(names)[:16]}"
+        except Exception as e:
+            # keep the last known version, the ingestor may be temporarily unavailable
+            logger.warning(
+                f"Could not list the documents of collection {collection} "
+                f"from {self.rag_ingest_url}/documents: {e}"
+            )
+
+        self._fetched[collection] = (time.monotonic(), version)
+        return version
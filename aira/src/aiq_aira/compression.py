@@ -0,0 +1,160 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from aiq_aira.token_budget import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# sentence ends followed by the start of a new sentence, or line breaks (lists, tables, paragraphs)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[*#-])|\n+")
+# inline citation markers such as [1], [2, 3] or (Smith et al., 2020),
+# they belong to the previous sentence
+CITATION_MARKER = re.compile(r"^(\[\d+(?:[,\-–]\s*\d+)*\]|\([^()]*\d{4}[a-z]?\))[.,;]?$")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their this to was were
+what which with how why when where who does do can could should would will may might about into
+than then there these those
+""".split())
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Split text into sentences, keeping inline citation markers attached to their sentence.
+    """
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        if sentences and CITATION_MARKER.match(part):
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def bm25_scores(sentences: list[list[str]],
+                query: list[str],
+                document_frequency: dict[str, int],
+                n_documents: int) -> np.ndarray:
+    """
+    BM25 score of every tokenized sentence for the query terms.
+    Document frequencies are counted over all sentences of the research run, so boilerplate repeated
+    across sources scores low.
+    """
+    terms = sorted(set(query))
+    if not sentences or not terms:
+        return np.zeros(len(sentences))
+
+    term_index = {term: i for i, term in enumerate(terms)}
+    tf = np.zeros((len(sentences), len(terms)))
+    for row, tokens in enumerate(sentences):
+        for token in tokens:
+            col = term_index.get(token)
+            if col is not None:
+                tf[row, col] += 1
+
+    df = np.array([document_frequency.get(term, 0) for term in terms], dtype=float)
+    idf = np.log(1 + (n_documents - df + 0.5) / (df + 0.5))
+    lengths = np.array([len(tokens) for tokens in sentences], dtype=float)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1))
+    return (tf * (BM25_K1 + 1) / (tf + norm[:, None])) @ idf
+
+
+def select_sentences(sentences: list[str],
+                     scores: np.ndarray,
+                     max_tokens: int,
+                     counter: TokenCounter) -> list[str]:
+    """
+    Keep the highest scoring sentences that fit into max_tokens, in their original order.
+    Sentences without any overlap with the query are only used if no sentence has one.
+    """
+    keep = []
+    used = 0
+    has_overlap = bool(np.any(scores > 0))
+    # stable sort, ties keep the earlier sentence
+    for idx in np.argsort(-scores, kind="stable"):
+        if has_overlap and scores[idx] <= 0:
+            break
+        cost = counter.count(sentences[idx]) + 1
+        if used + cost > max_tokens:
+            continue
+        keep.append(idx)
+        used += cost
+    return [sentences[idx] for idx in sorted(keep)]
+
+
+def compress_sources(sources_xml: str,
+                     max_tokens_per_source: int,
+                     sections: dict[str, str] | None = None) -> str:
+    """
+    Extractive compression of the <sources> XML written by deduplicate_and_format_sources.
+    Answers longer than max_tokens_per_source are reduced to their sentences with the best BM25
+    overlap with the source's query and report section.
+    Queries, source types and the source store of the state are untouched, so every source still
+    maps to its citations.
+    """
+    try:
+        root = ET.fromstring(sources_xml)
+    except ET.ParseError as e:
+        logger.warning(f"Skipping source compression, sources are not valid XML: {e}")
+        return sources_xml
+
+    counter = TokenCounter()
+    sources = root.findall("source")
+    answers = [source.find("answer") for source in sources]
+    split = [split_sentences(answer.text or "") if answer is not None else [] for answer in answers]
+    tokenized = [[tokenize(sentence) for sentence in sentences] for sentences in split]
+
+    document_frequency: dict[str, int] = {}
+    for sentences in tokenized:
+        for tokens in sentences:
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+    n_documents = sum(len(sentences) for sentences in tokenized)
+
+    compressed = 0
+    for source, answer, sentences, sentence_tokens in zip(sources, answers, split, tokenized):
+        if answer is None or counter.count(answer.text or "") <= max_tokens_per_source:
+            continue
+        query = source.findtext("query") or ""
+        section = (sections or {}).get(query, "")
+        scores = bm25_scores(sentence_tokens,
+                             tokenize(f"{query} {section}"),
+                             document_frequency,
+                             n_documents)
+        answer.text = "\n".join(select_sentences(sentences, scores, max_tokens_per_source, counter))
+        compressed += 1
+
+    if not compressed:
+        return sources_xml
+    logger.info(
+        f"Compressed {compressed} of {len(sources)} sources to {max_tokens_per_source} tokens each")
+    return ET.tostring(root, encoding="unicode")
@@ -1,6 +1,10 @@
 import os
 ASYNC_TIMEOUT=120 
 
+# transient LLM endpoint errors (connection, rate limit, 5xx) are retried with exponential backoff
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF = 1.0
+
 # Only needed if RAG endpoint requires an API key
 RAG_API_KEY = os.getenv("RAG_API_KEY", "")
 
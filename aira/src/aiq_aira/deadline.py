@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+from langchain_core.runnables import RunnableConfig
+
+# time kept back for later steps, in multiples of the deadline_reserve of the request
+# (the time reserved for the final report): research leaves room for the draft and the final report,
+# virtual screening additionally for the screening NIMs and combining their results into the report
+FINALIZE_STEPS = 1
+RESEARCH_STEPS = 2
+VIRTUAL_SCREENING_STEPS = 4
+# seconds left after the final report to send the response
+RESPONSE_MARGIN = 2.0
+
+
+def make_deadline(seconds: float) -> float | None:
+    """
+    The deadline (epoch seconds) of a request that may take `seconds`, None if it is not bounded.
+    The deadline is a wall clock time so it stays a plain value in the graph config.
+    """
+    return time.time() + seconds if seconds and seconds > 0 else None
+
+
+def remaining_time(config: RunnableConfig) -> float | None:
+    """
+    Seconds until the deadline of the request, None if the request has no deadline.
+    """
+    deadline = config["configurable"].get("deadline")
+    return deadline - time.time() if deadline else None
+
+
+def reserved_time(config: RunnableConfig, steps: float) -> float:
+    return steps * (config["configurable"].get("deadline_reserve") or 0)
+
+
+def step_timeout(config: RunnableConfig,
+                 default: float | None,
+                 steps: float = 0,
+                 margin: float = 0) -> float | None:
+    """
+    The timeout of a step: its `default`, capped to the remaining request time less the time
+    reserved for `steps` later steps.
+    Never negative, a timeout of 0 means the step has no time left.
+    """
+    remaining = remaining_time(config)
+    if remaining is None:
+        return default
+    available = max(remaining - reserved_time(config, steps) - margin, 0.0)
+    return available if default is None else min(default, available)
+
+
+def has_time_for(config: RunnableConfig, steps: float, extra: float = 0) -> bool:
+    """
+    True if the request has no deadline,
+    or more than `steps` reserves plus `extra` seconds are left.
+    """
+    remaining = remaining_time(config)
+    return remaining is None or remaining > reserved_time(config, steps) + extra
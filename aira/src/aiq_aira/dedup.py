@@ -0,0 +1,187 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import xml.etree.ElementTree as ET
+import zlib
+
+import numpy as np
+
+from aiq_aira.schema import SourceRecord
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 31) - 1
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class MinHashDeduplicator:
+    """
+    Clusters near-duplicate texts with MinHash signatures over word shingles.
+    Candidate pairs come from locality sensitive hashing (bands x rows of the signature) and are
+    kept if their estimated Jaccard similarity is at least `threshold`.
+    Everything is seeded, so clusters are deterministic.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.8,
+                 num_perm: int = 64,
+                 bands: int = 16,
+                 shingle_size: int = 5,
+                 seed: int = 1):
+        assert num_perm % bands == 0, "num_perm must be a multiple of bands"
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+
+    def shingles(self, text: str) -> set[str]:
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> np.ndarray | None:
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) & MERSENNE_PRIME for s in shingles],
+                          dtype=np.int64)
+        # (a * h + b) mod p for every permutation,
+        # a, b and h are below 2^31 so nothing overflows int64
+        return ((self._a * hashes[None, :] + self._b) % MERSENNE_PRIME).min(axis=1)
+
+    def cluster(self, texts: list[str]) -> list[int]:
+        """
+        Returns, for each text, the index of the first text of its near-duplicate cluster
+        (itself if unique).
+        """
+        signatures = [self.signature(text) for text in texts]
+        parent = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        buckets: dict[tuple, list[int]] = {}
+        for idx, sig in enumerate(signatures):
+            if sig is None:
+                continue
+            for band in range(self.bands):
+                key = (band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                for other in buckets.setdefault(key, []):
+                    if (find(other) != find(idx)
+                            and np.mean(signatures[other] == sig) >= self.threshold):
+                        # the earlier text stays the representative
+                        root_a, root_b = sorted((find(other), find(idx)))
+                        parent[root_b] = root_a
+                buckets[key].append(idx)
+
+        return [find(idx) for idx in range(len(texts))]
+
+
+def split_passages(text: str) -> list[str]:
+    return [passage for passage in re.split(r"\n\s*\n|\n(?=\S)", text or "") if passage.strip()]
+
+
+def dedupe_sources(sources_xml: str,
+                   previous: list[str] | None = None,
+                   deduplicator: MinHashDeduplicator | None = None) -> str:
+    """
+    Removes passages from the answers of the <sources> XML that near-duplicate a passage seen
+    earlier, either in an earlier source of the same document or in the `previous` research results
+    of the run.
+    Sources left without any passage are dropped. The order of sources and passages is preserved.
+    """
+    deduplicator = deduplicator or MinHashDeduplicator()
+    try:
+        root = ET.fromstring(sources_xml)
+        previous_roots = [ET.fromstring(xml) for xml in previous or []]
+    except ET.ParseError as e:
+        logger.warning(f"Skipping source deduplication, sources are not valid XML: {e}")
+        return sources_xml
+
+    passages = []
+    for previous_root in previous_roots:
+        for answer in previous_root.iter("answer"):
+            passages.extend(split_passages(answer.text))
+    n_previous = len(passages)
+
+    sources = root.findall("source")
+    source_passages = [split_passages(source.findtext("answer")) for source in sources]
+    for per_source in source_passages:
+        passages.extend(per_source)
+
+    representatives = deduplicator.cluster(passages)
+    offset = n_previous
+    removed = 0
+    for source, per_source in zip(sources, source_passages):
+        kept = [p for i, p in enumerate(per_source) if representatives[offset + i] == offset + i]
+        offset += len(per_source)
+        removed += len(per_source) - len(kept)
+        if len(kept) == len(per_source):
+            continue
+        if per_source and not kept:
+            root.remove(source)
+        else:
+            source.find("answer").text = "\n\n".join(kept)
+
+    if not removed:
+        return sources_xml
+    logger.info(f"Removed {removed} near-duplicate passages from the research results")
+    return ET.tostring(root, encoding="unicode")
+
+
+def merge_duplicate_sources(
+        records: list[SourceRecord],
+        deduplicator: MinHashDeduplicator | None = None
+) -> tuple[list[SourceRecord], dict[int, int]]:
+    """
+    Merges sources with near-duplicate answers (same content returned for overlapping queries).
+    The first source of a cluster is kept in place and the documents and URLs of the others are
+    added to it.
+    Returns the merged sources and the id of the kept source for the id of every merged one.
+    """
+    deduplicator = deduplicator or MinHashDeduplicator()
+    representatives = deduplicator.cluster([record.answer for record in records])
+    documents: dict[int, dict[str, None]] = {}
+    urls: dict[int, dict[str, None]] = {}
+    for idx, record in enumerate(records):
+        rep = representatives[idx]
+        documents.setdefault(rep, {}).update(dict.fromkeys(record.documents))
+        urls.setdefault(rep, {}).update(dict.fromkeys(record.urls))
+
+    merged = [
+        record.model_copy(update={"documents": list(documents[idx]), "urls": list(urls[idx])})
+        for idx, record in enumerate(records)
+        if representatives[idx] == idx
+    ]
+    aliases = {
+        record.id: records[representatives[idx]].id
+        for idx, record in enumerate(records) if representatives[idx] != idx
+    }
+    if aliases:
+        logger.info(f"Merged {len(aliases)} near-duplicate sources")
+    return merged, aliases
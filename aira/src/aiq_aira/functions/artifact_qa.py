@@ -1,5 +1,5 @@
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Literal
 from aiq.data_models.function import FunctionBaseConfig
 from aiq.builder.builder import Builder
 from aiq.cli.register_workflow import register_function
@@ -16,6 +16,8 @@ from aiq_aira.schema import (
 
 from aiq_aira.artifact_utils import artifact_chat_handler, check_relevant
 from aiq_aira.nodes import process_single_query, deduplicate_and_format_sources
+from aiq_aira.scheduler import Lane, Priority, run_in_lane
+from aiq_aira.sources import cited_sources
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,11 @@ class ArtifactQAConfig(FunctionBaseConfig, name="artifact_qa"):
     """
     llm_name: LLMRef = "instruct_llm"
     rag_url: str = ""
+    # "constrained" grades the guardrail and the search results
+    # with a single yes/no token of llm_name
+    relevancy_grading: Literal["json", "constrained"] = "json"
+    # scheduling class of the chat, its LLM and RAG calls are served before those of running reports
+    priority: Priority = "interactive"
 
 
 @register_function(config_type=ArtifactQAConfig)
@@ -48,6 +55,10 @@ async def artifact_qa_fn(config: ArtifactQAConfig, aiq_builder: Builder):
         """
         Run the Q&A logic for a single user question about an artifact.
         """
+        return await run_in_lane(Lane(config.priority, query_message.tenant or "default"),
+                                 _answer(query_message))
+
+    async def _answer(query_message: ArtifactQAInput) -> ArtifactQAOutput:
 
         apply_guardrail = os.getenv("AIRA_APPLY_GUARDRAIL", "false")
 
@@ -57,7 +68,8 @@ async def artifact_qa_fn(config: ArtifactQAConfig, aiq_builder: Builder):
                 llm=llm,
                 artifact=query_message.artifact,
                 question=query_message.question,
-                chat_history=query_message.chat_history
+                chat_history=query_message.chat_history,
+                grading=config.relevancy_grading
             )
 
             if relevancy_check == 'no':
@@ -68,8 +80,10 @@ async def artifact_qa_fn(config: ArtifactQAConfig, aiq_builder: Builder):
             
         # Only enabled when not rewrite mode or rewrite mode is "entire"
         graph_config = {
-            "configurable" :{
+            "configurable": {
                 "rag_url": config.rag_url,
+                "relevancy_grading": config.relevancy_grading,
+                "grader_llm": llm,
             }
         }
 
@@ -80,7 +94,7 @@ async def artifact_qa_fn(config: ArtifactQAConfig, aiq_builder: Builder):
             """
             logger.debug(f"Writing message: {message}")
 
-        rag_answer, rag_citation, relevancy, web_answer, web_citation = await process_single_query(
+        rag_answer, rag_source, relevancy, web_answer, web_sources = await process_single_query(
             query=query_message.question,
             config=graph_config,
             writer=writer,
@@ -96,8 +110,8 @@ async def artifact_qa_fn(config: ArtifactQAConfig, aiq_builder: Builder):
         )
 
         query_message.question += "\n\n --- ADDITIONAL CONTEXT --- \n" + deduplicate_and_format_sources(
-            [rag_citation], [rag_answer], [relevancy], [web_answer], [gen_query]
-        )
+            [cited_sources(rag_source, relevancy, web_sources)], [rag_answer], [relevancy],
+            [web_answer], [gen_query])
 
         logger.info(f"Artifact QA Query message: {query_message}")
 
@@ -107,61 +121,7 @@ async def artifact_qa_fn(config: ArtifactQAConfig, aiq_builder: Builder):
         """
         Run the Q&A logic for a single user question about an artifact, streaming the response.
         """
-
-        apply_guardrail = os.getenv("AIRA_APPLY_GUARDRAIL", "false")
-
-        if apply_guardrail.lower() == "true":
-        
-            relevancy_check = await check_relevant(
-                llm=llm,
-                artifact=query_message.artifact,
-                question=query_message.question,
-                chat_history=query_message.chat_history
-            )
-
-            if relevancy_check == 'no':
-                yield ArtifactQAOutput(
-                    updated_artifact=query_message.artifact,
-                    assistant_reply="Sorry, I am not able to help answer that question. Please try again."
-                )
-                return
-            
-        # Only enabled when not rewrite mode or rewrite mode is "entire"
-        graph_config = {
-            "configurable": {
-                "rag_url": config.rag_url,
-            }
-        }
-
-        def writer(message):
-            """
-            The RAG search expects a stream writer function. 
-            This is a temporary placeholder to satisfy the type checker.
-            """
-            logger.debug(f"Writing message: {message}")
-
-        rag_answer, rag_citation, relevancy, web_answer, web_citation = await process_single_query(
-            query=query_message.question,
-            config=graph_config,
-            writer=writer,
-            collection=query_message.rag_collection,
-            llm=llm,
-            search_web=query_message.use_internet
-        )
-
-        gen_query = GeneratedQuery(
-            query=query_message.question,
-            report_section=query_message.artifact,
-            rationale="Q/A"
-        )
-
-        query_message.question += "\n\n --- ADDITIONAL CONTEXT --- \n" + deduplicate_and_format_sources(
-            [rag_citation], [rag_answer], [relevancy], [web_answer], [gen_query]
-        )
-
-        logger.info(f"Artifact QA Query message: {query_message}")
-
-        yield await artifact_chat_handler(llm, query_message)
+        yield await _artifact_qa(query_message)
 
     yield FunctionInfo.create(
         single_fn=_artifact_qa,
@@ -1,3 +1,4 @@
+import time
 from typing import AsyncGenerator
 import typing
 from aiq.data_models.api_server import AIQChatResponseChunk
@@ -7,9 +8,10 @@ from aiq.builder.builder import Builder
 from aiq.cli.register_workflow import register_function
 from aiq.builder.function_info import FunctionInfo
 from aiq.builder.framework_enum import LLMFrameworkEnum
-import json
 
 from aiq_aira.nodes import generate_query
+from aiq_aira.stream_utils import coalesce_stream, dumps_event, make_stream_coalescer
+from aiq_aira.usage import track_usage, usage_report
 from aiq_aira.schema import (
     ConfigSchema,
     GenerateQueryStateInput,
@@ -26,6 +28,9 @@ class AIRAGenerateQueriesConfig(FunctionBaseConfig, name="generate_queries"):
     """
     Configuration for the generate_queries function/endpoint
     """
+    # custom stream events are coalesced into frames, set the interval to 0 to stream every token
+    stream_flush_interval_ms: int = 50
+    stream_frame_max_chars: int = 1024
 
 @register_function(config_type=AIRAGenerateQueriesConfig)
 async def generate_queries_fn(config: AIRAGenerateQueriesConfig, aiq_builder: Builder):
@@ -38,7 +43,7 @@ async def generate_queries_fn(config: AIRAGenerateQueriesConfig, aiq_builder: Bu
         config_schema=ConfigSchema
     )
 
-    builder.add_node("generate_query", generate_query)
+    builder.add_node("generate_query", track_usage(generate_query))
     builder.add_edge(START, "generate_query")
     builder.add_edge("generate_query", END)
 
@@ -48,9 +53,9 @@ async def generate_queries_fn(config: AIRAGenerateQueriesConfig, aiq_builder: Bu
         """
         This function runs the graph to generate queries for a given topic/report structure
         """
+        start = time.monotonic()
         # Acquire the LLM from the builder
         llm = await aiq_builder.get_llm(llm_name=message.llm_name, wrapper_type=LLMFrameworkEnum.LANGCHAIN)
-        llm.model_kwargs["stream_options"] = {"include_usage": True, "continuous_usage_stats": True}
 
         response = await graph.ainvoke(
             input={"queries": [], "web_research_results": [], "running_summary": ""},
@@ -61,7 +66,10 @@ async def generate_queries_fn(config: AIRAGenerateQueriesConfig, aiq_builder: Bu
                 "topic": message.topic
             }
         )
-        return GenerateQueryStateOutput.model_validate(response)
+        return GenerateQueryStateOutput(
+            queries=response.get("queries"),
+            usage=usage_report(response.get("usage"), time.monotonic() - start)
+        )
 
     # ------------------------------------------------------------------
     # STREAMING VERSION
@@ -72,10 +80,11 @@ async def generate_queries_fn(config: AIRAGenerateQueriesConfig, aiq_builder: Bu
         """
         This function runs the graph to generate queries for a given topic/report structure, streaming the response
         """
+        start = time.monotonic()
         # Acquire the LLM from the builder
         llm = await aiq_builder.get_llm(llm_name=message.llm_name, wrapper_type=LLMFrameworkEnum.LANGCHAIN)
 
-        async for _t, val in graph.astream(
+        stream = graph.astream(
             input={"queries": [], "web_research_results": [], "running_summary": ""},
             stream_mode=['custom', 'values'],
             config={
@@ -84,17 +93,25 @@ async def generate_queries_fn(config: AIRAGenerateQueriesConfig, aiq_builder: Bu
                 "report_organization": message.report_organization,
                 "topic": message.topic
             }
-        ):
+        )
+        coalescer = make_stream_coalescer(config.stream_flush_interval_ms,
+                                          config.stream_frame_max_chars)
+        usage = None
+
+        async for _t, val in coalesce_stream(stream, coalescer):
 
             if _t == "values":
+                usage = val.get("usage")
                 if "queries" not in val:
-                    yield GenerateQueryStateOutput(intermediate_step=json.dumps(val))
+                    yield GenerateQueryStateOutput(intermediate_step=dumps_event(val))
                 else:
                     yield GenerateQueryStateOutput(
                         queries=val['queries']
                     )
             else:
-                yield GenerateQueryStateOutput(intermediate_step=json.dumps(val))
+                yield GenerateQueryStateOutput(intermediate_step=dumps_event(val))
+
+        yield GenerateQueryStateOutput(usage=usage_report(usage, time.monotonic() - start))
 
     yield FunctionInfo.create(
         single_fn=_generate_queries_single,
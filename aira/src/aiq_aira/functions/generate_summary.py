@@ -1,6 +1,8 @@
+import contextlib
+import time
 import typing
-from typing import AsyncGenerator
-import json
+import uuid
+from typing import AsyncGenerator, Literal
 
 from aiq.data_models.api_server import AIQChatResponseChunk
 from aiq.data_models.component_ref import LLMRef
@@ -9,10 +11,39 @@ from aiq.builder.builder import Builder
 from aiq.cli.register_workflow import register_function
 from aiq.builder.function_info import FunctionInfo
 from aiq.builder.framework_enum import LLMFrameworkEnum
-import json
 
-from aiq_aira.nodes import web_research, summarize_sources, reflect_on_summary, finalize_summary
-from aiq_aira.nodes import begin_virtual_screening_if_intended, call_virtual_screening_nims, combine_virtual_screening_info_into_summary
+from aiq_aira.nodes import (
+    web_research,
+    compress_research,
+    summarize_sources,
+    reflect_on_summary,
+    finalize_summary,
+    begin_virtual_screening_if_intended,
+    call_virtual_screening_nims,
+    combine_virtual_screening_info_into_summary,
+)
+from aiq_aira.cancellation import cancel_on_disconnect
+from aiq_aira.checkpoints import open_checkpointer
+from aiq_aira.deadline import make_deadline
+from aiq_aira.model_routing import ModelRoute, RoutedNode
+from aiq_aira.collection_versions import CollectionVersionRegistry
+from aiq_aira.scheduler import Lane, Priority, lane_context, run_in_lane, scheduler
+from aiq_aira.telemetry import call_span
+from aiq_aira.usage import track_usage, usage_report
+from aiq_aira.report_cache import (
+    CachedReport,
+    llm_fingerprint,
+    make_report_cache,
+    replay_intermediate_steps,
+    report_cache_key,
+)
+from aiq_aira.stream_utils import (
+    coalesce_stream,
+    dumps_event,
+    make_stream_coalescer,
+    merge_state_updates,
+    state_reducers,
+)
 from aiq_aira.schema import (
     ConfigSchema,
     GenerateSummaryStateInput,
@@ -21,60 +52,145 @@ from aiq_aira.schema import (
 )
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, END, StateGraph
+from pydantic import BaseModel
 
-def serialize_pydantic(obj):
-    if isinstance(obj, list):
-        return [serialize_pydantic(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: serialize_pydantic(value) for key, value in obj.items()}
-    elif hasattr(obj, "model_dump"):  # Pydantic v2
-        return obj.model_dump()
-    elif hasattr(obj, "dict"):  # Pydantic v1
-        return obj.dict()
-    else:
-        return obj
+# sources and usage are appended to and summed by the graph, the streamed deltas do the same
+STATE_REDUCERS = state_reducers(AIRAState)
+
+class ModelRouteConfig(BaseModel):
+    """
+    The model of a step of the summary graph, an llm of None uses the llm of the request.
+    reasoning switches the thinking of reasoning models on or off, None keeps the default of the
+    step.
+    """
+    llm: LLMRef | None = None
+    reasoning: bool | None = None
 
 class AIRAGenerateSummaryConfig(FunctionBaseConfig, name="generate_summaries"):
     """
     Configuration for the generate_summary function/endpoint
     """
     rag_url: str = ""
+    # custom stream events are coalesced into frames, set the interval to 0 to stream every token
+    stream_flush_interval_ms: int = 50
+    stream_frame_max_chars: int = 1024
+    # "delta" streams only the state fields changed by each node plus a final snapshot,
+    # "full" streams the entire state after every node
+    intermediate_state: Literal["delta", "full"] = "delta"
+    # overlap research and summarization:
+    # drafting starts once summary_first_k sources (default: half) arrived
+    # queries still running after research_deadline seconds are skipped (0 waits for all of them)
+    incremental_research: bool = False
+    summary_first_k: int = 0
+    research_deadline: float = 0
+    # "patch" has the LLM return only patches for the report sections a new source affects
+    # instead of rewriting the entire report on every reflection
+    report_extension: Literal["rewrite", "patch"] = "rewrite"
+    # "map_reduce" drafts each report section from its own sources in parallel and adds the
+    # title and abstract in a short final pass, "single" writes the first draft in one call
+    summary_mode: Literal["single", "map_reduce"] = "single"
+    # context window of the report writing model, sources are packed into what the prompt and the
+    # reserved output tokens leave (0 disables budgeting).
+    # "tiktoken" counts with a tokenizer instead of estimating
+    context_window: int = 128000
+    token_counter: Literal["estimate", "tiktoken"] = "estimate"
+    # extractive compression of research answers to their most relevant sentences before
+    # summarization, the default for requests that do not set compress_sources
+    compress_sources: bool = False
+    compressed_source_tokens: int = 512
+    # remove near-duplicate passages across all research results of a run (including reflection)
+    # and merge near-duplicate citations
+    dedupe_sources: bool = True
+    # how sources are written into the report prompts: "xml" tags, or "compact" blocks with a handle
+    # such as [S3] that the LLM cites and that is resolved to the sources list of the final report
+    source_encoding: Literal["xml", "compact"] = "xml"
+    # reflection stops early once a reflection query repeats an earlier one (Jaccard similarity of
+    # the query terms of at least reflection_query_similarity) or its research adds less than
+    # reflection_novelty_threshold new content (share of word 3-grams not in earlier sources or the
+    # report). 0 runs every reflection
+    reflection_novelty_threshold: float = 0.1
+    reflection_query_similarity: float = 0.8
+    # rule-based relevancy grades for RAG errors, empty answers, refusals and answers that contain
+    # at least relevancy_coverage_threshold of the query terms,
+    # only the remaining answers are graded by the LLM
+    relevancy_prefilter: bool = True
+    relevancy_coverage_threshold: float = 0.8
+    # "constrained" grades relevancy with a single yes/no token of relevancy_grader_llm
+    # (an instruct model) and its log probabilities instead of a JSON answer of the report LLM.
+    # relevancy_guided_choice restricts the output to yes/no on NIMs with guided decoding
+    relevancy_grading: Literal["json", "constrained"] = "json"
+    relevancy_grader_llm: LLMRef | None = None
+    relevancy_guided_choice: bool = False
+    # the model of each step of the summary graph, steps without a route use the llm of the request,
+    # e.g. finalize_summary: {llm: instruct_llm, reasoning: false}
+    model_routes: dict[RoutedNode, ModelRouteConfig] = {}
+    # seconds a report may take (0: unbounded),
+    # the default for requests that do not set request_timeout.
+    # every step sizes its timeouts from the time left, keeping deadline_reserve seconds for each
+    # later step (report draft, final report),
+    # and reflection and virtual screening are skipped when time runs low
+    request_timeout: float = 0
+    deadline_reserve: float = 60
+    # sqlite file for run checkpoints, so failed or cancelled runs can be resumed
+    # (empty disables checkpointing)
+    # checkpoints of runs not updated for checkpoint_retention_hours are deleted
+    # (0 keeps them forever)
+    checkpoint_db: str = ""
+    checkpoint_retention_hours: float = 24
+    # directory of the report cache, identical requests replay the cached report
+    # (empty disables the cache)
+    # cached intermediate steps are re-streamed report_cache_replay_speedup times faster
+    # (0 sends them at once)
+    report_cache_dir: str = ""
+    report_cache_ttl_hours: float = 24
+    report_cache_replay_speedup: float = 20
+    # collection versions are part of the cache key,
+    # so reports are not served after new documents are ingested
+    # versions are read from the file written by data/sync_files2.py, otherwise from the document
+    # list of the ingestor server, refreshed every collection_version_refresh_seconds
+    collection_versions_file: str = ""
+    rag_ingest_url: str = ""
+    collection_version_refresh_seconds: float = 300
+    # scheduling class of the reports (requests may ask for "batch"),
+    # interactive chat is served first.
+    # at most max_concurrent_reports reports run at once, further requests wait in the admission
+    # queue and are streamed their queue position.
+    # max_concurrent_calls bounds the concurrent LLM and RAG calls of all endpoints,
+    # shared fairly across tenants and priority classes (0: unlimited)
+    priority: Priority = "report"
+    max_concurrent_reports: int = 0
+    max_concurrent_calls: int = 0
 
-def serialize_pydantic(obj):
-    if isinstance(obj, list):
-        return [serialize_pydantic(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: serialize_pydantic(value) for key, value in obj.items()}
-    elif hasattr(obj, "model_dump"):  # Pydantic v2
-        return obj.model_dump()
-    elif hasattr(obj, "dict"):  # Pydantic v1
-        return obj.dict()
-    else:
-        return obj
-
-@register_function(config_type=AIRAGenerateSummaryConfig)
-async def generate_summary_fn(config: AIRAGenerateSummaryConfig, aiq_builder: Builder):
+def build_summary_graph(with_web_research: bool = True, checkpointer=None):
     """
-    The main function for research, report writing, and reflection to generate a report, representing /generate_summary in config.yml
+    Builds and compiles the Stage 2 pipeline.
+    Set with_web_research=False to start from research results that are already in the state,
+    e.g. when the research was pipelined with query generation.
+    With a checkpointer the state is saved after every node so the run can be resumed.
     """
-
-    # Build the Stage 2 pipeline
     builder = StateGraph(
         AIRAState,
         config_schema=ConfigSchema
     )
-    builder.add_node("web_research", web_research)
-    builder.add_node("summarize_sources", summarize_sources)
-    builder.add_node("finalize_summary", finalize_summary)
-    builder.add_node("reflect_on_summary", reflect_on_summary)
-    builder.add_node("begin_virtual_screening_if_intended", begin_virtual_screening_if_intended)
-    builder.add_node("call_virtual_screening_nims", call_virtual_screening_nims)
-    builder.add_node("combine_virtual_screening_info_into_summary", combine_virtual_screening_info_into_summary)
+    builder.add_node("compress_research", track_usage(compress_research))
+    builder.add_node("summarize_sources", track_usage(summarize_sources))
+    builder.add_node("finalize_summary", track_usage(finalize_summary))
+    builder.add_node("reflect_on_summary", track_usage(reflect_on_summary))
+    builder.add_node("begin_virtual_screening_if_intended",
+                     track_usage(begin_virtual_screening_if_intended))
+    builder.add_node("call_virtual_screening_nims", track_usage(call_virtual_screening_nims))
+    builder.add_node("combine_virtual_screening_info_into_summary",
+                     track_usage(combine_virtual_screening_info_into_summary))
 
 
     # The chain is: START -> web_research -> summarize_sources -> finalize_summary -> END
-    builder.add_edge(START, "web_research")
-    builder.add_edge("web_research", "begin_virtual_screening_if_intended")
+    if with_web_research:
+        builder.add_node("web_research", track_usage(web_research))
+        builder.add_edge(START, "web_research")
+        builder.add_edge("web_research", "compress_research")
+    else:
+        builder.add_edge(START, "compress_research")
+    builder.add_edge("compress_research", "begin_virtual_screening_if_intended")
     builder.add_edge("begin_virtual_screening_if_intended", "call_virtual_screening_nims")
     builder.add_edge("call_virtual_screening_nims", "summarize_sources")
     builder.add_edge("summarize_sources", "reflect_on_summary")
@@ -82,70 +198,365 @@ async def generate_summary_fn(config: AIRAGenerateSummaryConfig, aiq_builder: Bu
     builder.add_edge("combine_virtual_screening_info_into_summary", "finalize_summary")
     builder.add_edge("finalize_summary", END)
 
-    graph = builder.compile()
-
-    # ------------------------------------------------------------------
-    # SINGLE-OUTPUT
-    # ------------------------------------------------------------------
-    async def _generate_summary_single(message: GenerateSummaryStateInput) -> GenerateSummaryStateOutput:
-        """
-        Runs the entire pipeline to produce a final summarized report
-        """
-        # Acquire the LLM from the builder
-        llm = await aiq_builder.get_llm(llm_name=message.llm_name, wrapper_type=LLMFrameworkEnum.LANGCHAIN)
-
-        response: AIRAState = await graph.ainvoke(
-            input={"queries": message.queries, "web_research_results": [], "running_summary": ""},
-            config={
-                "llm": llm,
-                "report_organization": message.report_organization,
-                "rag_url": config.rag_url,
-                "collection": message.rag_collection,
-                "search_web": message.search_web,
-                "num_reflections": message.reflection_count, 
-                "topic": message.topic,
-            }
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def acquire_routed_llms(config: AIRAGenerateSummaryConfig,
+                              aiq_builder: Builder) -> tuple[typing.Any, dict]:
+    """
+    Acquires the relevancy grader LLM and the LLMs of the model routes, once per function.
+    Routes without an llm are None, model_routes fills in the llm of the request.
+    """
+    grader_llm = None
+    if config.relevancy_grading == "constrained" and config.relevancy_grader_llm:
+        grader_llm = await aiq_builder.get_llm(llm_name=config.relevancy_grader_llm,
+                                               wrapper_type=LLMFrameworkEnum.LANGCHAIN)
+    routed_llms = {
+        node: (await aiq_builder.get_llm(llm_name=route.llm,
+                                         wrapper_type=LLMFrameworkEnum.LANGCHAIN)
+               if route.llm else None)
+        for node, route in config.model_routes.items()
+    }
+    return grader_llm, routed_llms
+
+
+def model_routes(config: AIRAGenerateSummaryConfig, routed_llms: dict,
+                 llm) -> dict[str, ModelRoute]:
+    return {
+        node: ModelRoute(routed_llms.get(node) or llm, route.reasoning)
+        for node, route in config.model_routes.items()
+    }
+
+
+def summary_graph_config(
+        config: AIRAGenerateSummaryConfig,
+        message: GenerateSummaryStateInput,
+        llm,
+        thread_id: str | None = None,
+        grader_llm=None,
+        routed_llms: dict | None = None
+) -> dict:
+    """
+    The configurable values shared by every node of the graph for one request.
+    The ai_researcher workflow uses them for the research it pipelines with query generation.
+    """
+    return {
+        "thread_id": thread_id,
+        "llm": llm,
+        "report_organization": message.report_organization,
+        "rag_url": config.rag_url,
+        "collection": message.rag_collection,
+        "search_web": message.search_web,
+        "num_reflections": message.reflection_count, 
+        "topic": message.topic,
+        "incremental_research": config.incremental_research,
+        "summary_first_k": config.summary_first_k,
+        "research_deadline": config.research_deadline,
+        "report_extension": config.report_extension,
+        "summary_mode": config.summary_mode,
+        "context_window": config.context_window,
+        "token_counter": config.token_counter,
+        "compress_sources": (config.compress_sources
+                             if message.compress_sources is None else message.compress_sources),
+        "compressed_source_tokens": config.compressed_source_tokens,
+        "dedupe_sources": config.dedupe_sources,
+        "source_encoding": config.source_encoding,
+        "reflection_novelty_threshold": config.reflection_novelty_threshold,
+        "reflection_query_similarity": config.reflection_query_similarity,
+        "relevancy_prefilter": config.relevancy_prefilter,
+        "relevancy_coverage_threshold": config.relevancy_coverage_threshold,
+        "relevancy_grading": config.relevancy_grading,
+        "relevancy_guided_choice": config.relevancy_guided_choice,
+        "grader_llm": grader_llm,
+        "model_routes": model_routes(config, routed_llms or {}, llm),
+        "deadline": make_deadline(config.request_timeout
+                                  if message.request_timeout is None else message.request_timeout),
+        "deadline_reserve": config.deadline_reserve,
+    }
+
+@register_function(config_type=AIRAGenerateSummaryConfig)
+async def generate_summary_fn(config: AIRAGenerateSummaryConfig, aiq_builder: Builder):
+    """
+    The main function for research, report writing, and reflection to generate a report,
+    representing /generate_summary in config.yml
+    """
+
+    async with open_checkpointer(config.checkpoint_db,
+                                 config.checkpoint_retention_hours) as checkpointer:
+        graph = build_summary_graph(checkpointer=checkpointer)
+        # for requests with research done beforehand,
+        # e.g. pipelined with query generation by ai_researcher
+        researched_graph = build_summary_graph(with_web_research=False, checkpointer=checkpointer)
+        report_cache = make_report_cache(config.report_cache_dir, config.report_cache_ttl_hours)
+        collection_versions = CollectionVersionRegistry(
+            registry_file=config.collection_versions_file,
+            rag_ingest_url=config.rag_ingest_url,
+            refresh_seconds=config.collection_version_refresh_seconds
         )
-        return GenerateSummaryStateOutput(final_report=response["final_report"], citations=response["citations"])
-
-    # ------------------------------------------------------------------
-    # STREAMING VERSION
-    # ------------------------------------------------------------------
-    async def _generate_summary_stream(
-            message: GenerateSummaryStateInput
-    ) -> AsyncGenerator[GenerateSummaryStateOutput, None]:
-        """
-        Runs the entire pipeline to produce a final summarized report, streaming the response
-        """
-        # Acquire the LLM from the builder
-        llm = await aiq_builder.get_llm(llm_name=message.llm_name, wrapper_type=LLMFrameworkEnum.LANGCHAIN)
-
-        async for _t, val in graph.astream(
-                input={"queries": message.queries, "web_research_results": [], "running_summary": ""},
-                stream_mode=['custom', 'values'],
-                config={
-                    "llm": llm,
-                    "report_organization": message.report_organization,
-                    "rag_url": config.rag_url,
-                    "collection": message.rag_collection,
-                    "topic": message.topic,
-                    "search_web": message.search_web,
-                    "num_reflections": message.reflection_count, 
-                }
-        ):
-
-            if _t == "values":
-                if "final_report" not in val:
-                    yield GenerateSummaryStateOutput(intermediate_step=json.dumps(serialize_pydantic(val)))
+        if report_cache is not None:
+            # reports of an older collection version can never be hit again
+            collection_versions.on_change(report_cache.evict_collection)
+
+        scheduler.configure(config.max_concurrent_calls, config.max_concurrent_reports)
+
+        grader_llm, routed_llms = await acquire_routed_llms(config, aiq_builder)
+
+        def _graph_config(message: GenerateSummaryStateInput, llm, thread_id: str | None) -> dict:
+            return summary_graph_config(config, message, llm, thread_id, grader_llm, routed_llms)
+
+        async def _prepare_run(
+                message: GenerateSummaryStateInput) -> tuple[dict | None, str | None]:
+            """
+            Returns the graph input and thread id of the run.
+            A new run starts from the queries (and their research, if done beforehand),
+            a resumed run continues from its last checkpoint (input None).
+            """
+            graph_input = {
+                "queries": message.queries,
+                "web_research_results": message.web_research_results or [],
+                "running_summary": ""
+            }
+            if message.sources:
+                graph_input["sources"] = message.sources
+            if checkpointer is None:
+                if message.resume != "no":
+                    raise ValueError("Resuming a run requires checkpoint_db to be configured "
+                                     "for generate_summary")
+                return graph_input, None
+            if message.resume == "no":
+                return graph_input, message.thread_id or str(uuid.uuid4())
+
+            thread_config = {"configurable": {"thread_id": message.thread_id}}
+            saved_state = await graph.aget_state(thread_config) if message.thread_id else None
+            if saved_state is None or not saved_state.values:
+                raise ValueError(f"No checkpointed run found for thread_id {message.thread_id}")
+            if message.resume == "finalize_summary":
+                # mark everything before finalize_summary as done,
+                # so only the final report is re-written
+                await graph.aupdate_state(thread_config,
+                                          None,
+                                          as_node="combine_virtual_screening_info_into_summary")
+            return None, message.thread_id
+
+        async def _cache_key(message: GenerateSummaryStateInput, llm) -> tuple[str | None, str]:
+            """
+            Key of a finished report for this request and the collection version it includes.
+            The key is None if the report cache does not apply.
+            """
+            if report_cache is None or message.resume != "no" or message.thread_id:
+                return None, ""
+            collection_version = await collection_versions.get_version(message.rag_collection)
+            settings = {
+                k: v for k, v in _graph_config(message, llm, None).items()
+                if k not in ("llm", "grader_llm", "model_routes", "thread_id", "deadline")
+            }
+            routes = sorted(model_routes(config, routed_llms, llm).items())
+            fingerprints = [llm_fingerprint(llm), llm_fingerprint(grader_llm)] + [
+                [node, llm_fingerprint(route.llm), route.reasoning] for node, route in routes
+            ]
+            # reports cut short by a deadline are only served to requests with the same deadline
+            request_timeout = message.request_timeout
+            if request_timeout is None:
+                request_timeout = config.request_timeout
+            settings["request_timeout"] = request_timeout
+            key = report_cache_key(settings, message.queries, fingerprints, collection_version)
+            return key, collection_version
+
+        def _cached_report(cache_key: str | None,
+                           message: GenerateSummaryStateInput) -> CachedReport | None:
+            if not cache_key or message.force_refresh:
+                return None
+            with call_span("report_cache", collection=message.rag_collection) as span:
+                cached = report_cache.get(cache_key)
+                span.set_attribute("hit", cached is not None)
+            return cached
+
+        def _graph(message: GenerateSummaryStateInput):
+            """
+            The graph of a new run skips web_research if the research was done beforehand,
+            a resumed run continues in the full graph, which has every node of its checkpoints.
+            """
+            if message.web_research_results is not None and message.resume == "no":
+                return researched_graph
+            return graph
+
+        def _lane(message: GenerateSummaryStateInput) -> Lane:
+            return Lane(message.priority or config.priority,
+                        message.tenant or message.thread_id or "default")
+
+        # ------------------------------------------------------------------
+        # SINGLE-OUTPUT
+        # ------------------------------------------------------------------
+        async def _generate_summary_single(
+                message: GenerateSummaryStateInput) -> GenerateSummaryStateOutput:
+            """
+            Runs the entire pipeline to produce a final summarized report
+            """
+            start = time.monotonic()
+            # Acquire the LLM from the builder
+            llm = await aiq_builder.get_llm(llm_name=message.llm_name,
+                                            wrapper_type=LLMFrameworkEnum.LANGCHAIN)
+
+            cache_key, collection_version = await _cache_key(message, llm)
+            cached = _cached_report(cache_key, message)
+            if cached is not None:
+                return GenerateSummaryStateOutput(
+                    final_report=cached.final_report,
+                    citations=cached.citations,
+                    usage=usage_report({}, time.monotonic() - start, cache_hits=1)
+                )
+
+            graph_input, thread_id = await _prepare_run(message)
+
+            lane = _lane(message)
+            async with scheduler.reports.slot(lane):
+                response: AIRAState = await run_in_lane(lane, _graph(message).ainvoke(
+                    input=graph_input,
+                    config=_graph_config(message, llm, thread_id)
+                ))
+            # reports cut short by the deadline or a timeout are not cached,
+            # the next request may complete them
+            if cache_key and response.get("final_report") and not response.get("degraded"):
+                report_cache.put(cache_key, CachedReport(
+                    final_report=response["final_report"],
+                    citations=response["citations"],
+                    collection=message.rag_collection,
+                    collection_version=collection_version
+                ))
+
+            return GenerateSummaryStateOutput(
+                final_report=response["final_report"],
+                citations=response["citations"],
+                thread_id=thread_id,
+                partial=response.get("degraded", False),
+                usage=usage_report(response.get("usage"), time.monotonic() - start)
+            )
+
+        # ------------------------------------------------------------------
+        # STREAMING VERSION
+        # ------------------------------------------------------------------
+        async def _run_graph_stream(
+                message: GenerateSummaryStateInput,
+                llm,
+                start: float
+        ) -> AsyncGenerator[GenerateSummaryStateOutput, None]:
+            """
+            Runs the graph, streaming intermediate steps, the final report and finally the usage of
+            the request (`start` is the monotonic time the request started)
+            """
+            graph_input, thread_id = await _prepare_run(message)
+            if thread_id:
+                # sent first, so the client can resume the run if the connection drops
+                yield GenerateSummaryStateOutput(thread_id=thread_id)
+
+            delta_mode = config.intermediate_state == "delta"
+
+            stream = _graph(message).astream(
+                input=graph_input,
+                stream_mode=['custom', 'updates', 'values'] if delta_mode else ['custom', 'values'],
+                config=_graph_config(message, llm, thread_id))
+            coalescer = make_stream_coalescer(config.stream_flush_interval_ms,
+                                              config.stream_frame_max_chars)
+
+            # in delta mode the values events are only kept (not serialized) for the final snapshot
+            streamed_state = dict(graph_input or {})
+            snapshot = None
+            usage = None
+
+            async for _t, val in coalesce_stream(stream, coalescer):
+
+                if _t == "updates":
+                    delta = merge_state_updates(streamed_state, val, STATE_REDUCERS)
+                    if delta:
+                        yield GenerateSummaryStateOutput(intermediate_step=dumps_event(delta))
+                elif _t == "values":
+                    usage = val.get("usage")
+                    if delta_mode:
+                        snapshot = val
+                    elif "final_report" not in val:
+                        yield GenerateSummaryStateOutput(intermediate_step=dumps_event(val))
+                    else:
+                        yield GenerateSummaryStateOutput(final_report=val["final_report"],
+                                                         citations=val["citations"],
+                                                         thread_id=thread_id,
+                                                         partial=val.get("degraded", False))
                 else:
-                    yield GenerateSummaryStateOutput(final_report=val["final_report"], citations=val["citations"])
-            else:
-                yield GenerateSummaryStateOutput(intermediate_step=json.dumps(serialize_pydantic(val)))
+                    yield GenerateSummaryStateOutput(intermediate_step=dumps_event(val))
 
+            if delta_mode and snapshot is not None:
+                yield GenerateSummaryStateOutput(intermediate_step=dumps_event(snapshot))
+                yield GenerateSummaryStateOutput(final_report=snapshot.get("final_report"),
+                                                 citations=snapshot.get("citations"),
+                                                 thread_id=thread_id,
+                                                 partial=snapshot.get("degraded", False))
 
-    # Instead of from_fn(...), provide both single & stream versions:
-    yield FunctionInfo.create(
-        single_fn=_generate_summary_single,
-        stream_fn=_generate_summary_stream,
-        description="Generates a full report (Stage 2) by doing web research, summarizing, reflecting, and finalizing the report (supports streaming)."
-    )
+            yield GenerateSummaryStateOutput(usage=usage_report(usage, time.monotonic() - start))
+
+        async def _generate_summary_stream(
+                message: GenerateSummaryStateInput
+        ) -> AsyncGenerator[GenerateSummaryStateOutput, None]:
+            """
+            Runs the entire pipeline to produce a final summarized report, streaming the response.
+            Cached reports are replayed, including their intermediate steps at an accelerated pace.
+            """
+            start = time.monotonic()
+            # Acquire the LLM from the builder
+            llm = await aiq_builder.get_llm(llm_name=message.llm_name,
+                                            wrapper_type=LLMFrameworkEnum.LANGCHAIN)
+
+            cache_key, collection_version = await _cache_key(message, llm)
+            cached = _cached_report(cache_key, message)
+            if cached is not None:
+                async for step in replay_intermediate_steps(cached,
+                                                            config.report_cache_replay_speedup):
+                    yield GenerateSummaryStateOutput(intermediate_step=step)
+                yield GenerateSummaryStateOutput(final_report=cached.final_report,
+                                                 citations=cached.citations)
+                yield GenerateSummaryStateOutput(
+                    usage=usage_report({}, time.monotonic() - start, cache_hits=1))
+                return
+
+            lane = _lane(message)
+            admission = scheduler.reports.enqueue(lane)
+            try:
+                async for position in scheduler.reports.wait(admission):
+                    yield GenerateSummaryStateOutput(
+                        intermediate_step=dumps_event({"queue_position": position}))
+
+                run_start = time.monotonic()
+                intermediate_steps = []
+                final_output = None
+                # the graph runs in its own task, cancelled together with its RAG, search, LLM and
+                # NIM requests when the endpoint stops consuming the stream (client disconnect);
+                # a checkpointed run keeps its completed steps and can be resumed with its thread_id
+                run = cancel_on_disconnect(_run_graph_stream(message, llm, start),
+                                           message.thread_id,
+                                           lane_context(lane))
+                async with contextlib.aclosing(run) as outputs:
+                    async for output in outputs:
+                        if output.intermediate_step is not None:
+                            intermediate_steps.append(
+                                (round(time.monotonic() - run_start, 3), output.intermediate_step))
+                        if output.final_report:
+                            final_output = output
+                        yield output
+            finally:
+                scheduler.reports.leave(admission)
+
+            if cache_key and final_output is not None and not final_output.partial:
+                report_cache.put(cache_key, CachedReport(
+                    final_report=final_output.final_report,
+                    citations=final_output.citations,
+                    intermediate_steps=intermediate_steps,
+                    collection=message.rag_collection,
+                    collection_version=collection_version
+                ))
+
+
+        # Instead of from_fn(...), provide both single & stream versions:
+        yield FunctionInfo.create(
+            single_fn=_generate_summary_single,
+            stream_fn=_generate_summary_stream,
+            description=("Generates a full report (Stage 2) by doing web research, summarizing, "
+                         "reflecting, and finalizing the report (supports streaming).")
+        )
@@ -0,0 +1,253 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Callable
+
+import openai
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables.config import var_child_runnable_config
+
+from aiq_aira.constants import ASYNC_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_BACKOFF
+from aiq_aira.scheduler import scheduler
+from aiq_aira.stream_utils import ThinkTagFilter, filter_think_stream
+from aiq_aira.telemetry import observe_llm_call
+from aiq_aira.usage import record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+# errors of the LLM endpoint that are worth another attempt
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+@lru_cache(maxsize=256)
+def chat_prompt(system_prompt: str, human_template: str = "{input}") -> ChatPromptTemplate:
+    """
+    The system + human chat template, compiled once per distinct pair.
+    """
+    return ChatPromptTemplate.from_messages([("system", system_prompt), ("human", human_template)])
+
+
+def chat_messages(system_prompt: str,
+                  human_template: str = "{input}",
+                  **values) -> list[BaseMessage]:
+    return chat_prompt(system_prompt, human_template).format_messages(**values)
+
+
+def current_node(default: str) -> str:
+    """
+    The graph node the call is made from, or `default` outside of a graph run.
+    """
+    config = var_child_runnable_config.get() or {}
+    return (config.get("metadata") or {}).get("langgraph_node") or default
+
+
+class LLMMetrics:
+    """
+    Latency, time to first token, token usage and outcomes of the LLM calls, aggregated per node.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: dict[str, Counter] = defaultdict(Counter)
+
+    def record(
+            self,
+            node: str,
+            outcome: str,
+            latency: float,
+            ttft: float | None = None,
+            usage: dict | None = None,
+            retries: int = 0
+    ):
+        with self._lock:
+            stats = self._nodes[node]
+            stats["calls"] += 1
+            stats[outcome] += 1
+            stats["retries"] += retries
+            stats["latency_seconds"] += latency
+            if ttft is not None:
+                stats["streamed_calls"] += 1
+                stats["ttft_seconds"] += ttft
+            stats["prompt_tokens"] += (usage or {}).get("input_tokens", 0)
+            stats["completion_tokens"] += (usage or {}).get("output_tokens", 0)
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {node: dict(stats) for node, stats in sorted(self._nodes.items())}
+
+
+llm_metrics = LLMMetrics()
+
+
+class _CallTracker:
+    """
+    Measures one gateway call across its attempts and records it on exit.
+    """
+
+    def __init__(self, llm, call: str):
+        self.node = current_node(call)
+        self.call = call
+        self.model = getattr(llm, "model_name", None)
+        self.start = time.monotonic()
+        self.ttft: float | None = None
+        self.usage: dict | None = None
+        self.think_filter: ThinkTagFilter | None = None
+        self.retries = 0
+
+    def observe(self, message):
+        if self.ttft is None and getattr(message, "content", None):
+            self.ttft = time.monotonic() - self.start
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            # streamed usage is reported once at the end,
+            # or cumulatively with continuous usage stats
+            self.usage = dict(usage)
+
+    def finish(self, outcome: str):
+        latency = time.monotonic() - self.start
+        llm_metrics.record(self.node, outcome, latency, self.ttft, self.usage, self.retries)
+        observe_llm_call(self.node, outcome, latency, self.ttft)
+        record_llm_usage(self.usage,
+                         self.think_filter.thinking if self.think_filter is not None else "")
+        usage = self.usage or {}
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        logger.info(
+            f"LLM call {self.call} in {self.node} ({self.model}): {outcome} after {latency:.2f}s, "
+            f"TTFT {ttft}, {usage.get('input_tokens', '?')} prompt + "
+            f"{usage.get('output_tokens', '?')} completion tokens, "
+            f"{self.retries} retries"
+        )
+
+
+async def _run(tracker: _CallTracker,
+               attempt: Callable[[], Any],
+               timeout: float | None,
+               retries: int,
+               can_retry: Callable[[], bool]):
+    """
+    Runs the attempts of a call within the deadline of the call, retrying transient endpoint errors.
+    Each attempt is scheduled in the lane of the request (see scheduler.py).
+    """
+    try:
+        async with asyncio.timeout(timeout):
+            while True:
+                try:
+                    # waits for a slot of the scheduler (within the deadline),
+                    # released during the backoff
+                    async with scheduler.call_slot():
+                        result = await attempt()
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if tracker.retries >= retries or not can_retry():
+                        raise
+                    backoff = LLM_RETRY_BACKOFF * 2 ** tracker.retries
+                    tracker.retries += 1
+                    logger.warning(f"LLM call {tracker.call} failed ({e}), "
+                                   f"retry {tracker.retries} in {backoff:.1f}s")
+                    await asyncio.sleep(backoff)
+    except asyncio.TimeoutError:
+        tracker.finish("timeout")
+        raise
+    except asyncio.CancelledError:
+        tracker.finish("cancelled")
+        raise
+    except Exception:
+        tracker.finish("error")
+        raise
+    tracker.finish("ok")
+    return result
+
+
+def _bound(llm, options: dict):
+    # per-call options are bound to this call only, the shared client is never changed
+    return llm.bind(**options) if options else llm
+
+
+async def invoke_llm(
+        llm,
+        prompt,
+        call: str,
+        timeout: float | None = ASYNC_TIMEOUT,
+        retries: int = LLM_MAX_RETRIES,
+        **options
+) -> BaseMessage:
+    """
+    Single LLM call with a deadline and retries of transient endpoint errors.
+    `call` names the call in the metrics and logs (usually the prompt), the node is taken from the
+    graph run. Extra keyword arguments are call options such as max_tokens.
+    Raises asyncio.TimeoutError at the deadline.
+    """
+    tracker = _CallTracker(llm, call)
+    model = _bound(llm, options)
+
+    async def _attempt():
+        response = await model.ainvoke(prompt)
+        tracker.observe(response)
+        if isinstance(response.content, str):
+            # only split for the usage accounting, the callers handle the think tags themselves
+            tracker.think_filter = ThinkTagFilter()
+            tracker.think_filter.feed(response.content)
+            tracker.think_filter.flush()
+        return response
+
+    return await _run(tracker, _attempt, timeout, retries, lambda: True)
+
+
+async def stream_llm(
+        llm,
+        prompt,
+        call: str,
+        on_thinking: Callable[[str], None] | None = None,
+        on_answer: Callable[[str], None] | None = None,
+        think_filter: ThinkTagFilter | None = None,
+        timeout: float | None = ASYNC_TIMEOUT,
+        retries: int = LLM_MAX_RETRIES,
+        thinking_first: bool = False,
+        **options
+) -> ThinkTagFilter:
+    """
+    Streaming LLM call through a ThinkTagFilter (see stream_utils.filter_think_stream) with a
+    deadline. Transient endpoint errors are only retried before the first chunk, streamed text
+    cannot be taken back.
+    Raises asyncio.TimeoutError at the deadline,
+    pass in a `think_filter` to keep the partial output.
+    Set thinking_first for calls that should think (see model_routing.expects_thinking), so thinking
+    is streamed as such when the chat template already opened the <think> block.
+    """
+    tracker = _CallTracker(llm, call)
+    if think_filter is None:
+        think_filter = ThinkTagFilter(thinking_first)
+    tracker.think_filter = think_filter
+    model = _bound(llm, options)
+    received = False
+
+    async def _chunks():
+        nonlocal received
+        async for chunk in model.astream(prompt, stream_usage=True):
+            received = True
+            tracker.observe(chunk)
+            yield chunk
+
+    async def _attempt():
+        return await filter_think_stream(_chunks(), on_thinking, on_answer, think_filter)
+
+    return await _run(tracker, _attempt, timeout, retries, lambda: not received)
@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Literal, NamedTuple
+
+from langchain_core.runnables import RunnableConfig
+
+from aiq_aira.utils import update_system_prompt
+
+# the steps of the summary graph that can be sent to their own model,
+# "relevancy" grades the RAG answers of every research, reflection and virtual screening query,
+# "find_protein_and_molecule" plans the virtual screening queries
+# of begin_virtual_screening_if_intended
+RoutedNode = Literal[
+    "relevancy",
+    "summarize_sources",
+    "reflect_on_summary",
+    "finalize_summary",
+    "begin_virtual_screening_if_intended",
+    "find_protein_and_molecule",
+    "combine_virtual_screening_info_into_summary",
+]
+
+
+class ModelRoute(NamedTuple):
+    """
+    The LLM of a step and whether it should reason.
+    reasoning None keeps the behaviour of the step when no route is configured.
+    """
+    llm: Any
+    reasoning: bool | None = None
+
+
+def route_model(config: RunnableConfig, node: RoutedNode, default_llm: Any = None) -> ModelRoute:
+    """
+    The route of a step from the model_routes of the graph config.
+    Steps without a route use `default_llm`, or the llm of the request.
+    """
+    route = (config["configurable"].get("model_routes") or {}).get(node)
+    if route is not None:
+        return route
+    return ModelRoute(default_llm if default_llm is not None else config["configurable"].get("llm"))
+
+
+def expects_thinking(llm: Any, reasoning: bool | None = None) -> bool:
+    """
+    True if the call is made with thinking switched on, so its output starts with thinking
+    (see stream_utils.ThinkTagFilter thinking_first).
+    """
+    return update_system_prompt("", llm, reasoning) == "detailed thinking on"
+
+
+def with_reasoning(prompt: str, route: ModelRoute):
+    """
+    The input of a single prompt call on a route: chat messages switching the reasoning if the route
+    sets it, otherwise the prompt itself.
+    """
+    system_prompt = ""
+    if route.reasoning is not None:
+        system_prompt = update_system_prompt("", route.llm, route.reasoning)
+    if not system_prompt:
+        return prompt
+    return [("system", system_prompt), ("human", prompt)]
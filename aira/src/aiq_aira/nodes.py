@@ -18,8 +18,9 @@ import aiohttp
 import json
 import os
 import logging
+import time
 import xml.etree.ElementTree as ET
-from typing import List
+from typing import Callable, List
 import re
 import requests
 import datetime
@@ -27,10 +28,10 @@ import csv
 import pubchempy as pcp
 from rcsbapi.search import TextQuery, AttributeQuery
 from langchain_core.runnables import RunnableConfig
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.utils.json import parse_json_markdown
 from langchain_core.stores import InMemoryByteStore
 from langgraph.types import StreamWriter
+from pydantic import ValidationError
 from aiq_aira.schema import  GeneratedQuery
 
 from aiq_aira.schema import AIRAState
@@ -43,15 +44,115 @@ from aiq_aira.prompts import (
     combine_virtual_screening_info_into_report_prompt
 )
 
-from aiq_aira.utils import async_gen, format_sources, update_system_prompt
+from aiq_aira.utils import update_system_prompt
+from aiq_aira.model_routing import ModelRoute, expects_thinking, route_model, with_reasoning
+from aiq_aira.stream_utils import JsonArrayStreamParser
+from aiq_aira.llm_gateway import chat_messages, invoke_llm, stream_llm
+from aiq_aira.token_budget import make_token_budget
+from aiq_aira.compression import compress_sources
+from aiq_aira.dedup import dedupe_sources, merge_duplicate_sources
+from aiq_aira.sources import (
+    cited_sources,
+    format_source_block,
+    number_sources,
+    render_sources,
+    store_sources
+)
+from aiq_aira.source_encoding import resolve_source_handles
+from aiq_aira.novelty import NoveltyTracker
+from aiq_aira.telemetry import call_span
+from aiq_aira.usage import record_usage
 from aiq_aira.constants import ASYNC_TIMEOUT
+from aiq_aira.deadline import (
+    FINALIZE_STEPS,
+    RESEARCH_STEPS,
+    RESPONSE_MARGIN,
+    VIRTUAL_SCREENING_STEPS,
+    has_time_for,
+    step_timeout
+)
 
 from aiq_aira.search_utils import process_single_query, deduplicate_and_format_sources
-from aiq_aira.report_gen_utils import summarize_report
+from aiq_aira.report_gen_utils import IncompleteReportError, summarize_by_section, summarize_report
 
 logger = logging.getLogger(__name__)
 store = InMemoryByteStore()
 
+async def generate_query_plan(
+        llm,
+        topic: str,
+        report_organization: str,
+        number_of_queries: int,
+        writer: StreamWriter,
+        on_query: Callable[[GeneratedQuery], None] | None = None
+) -> list[dict]:
+    """
+    Streams the research plan from the LLM and parses the JSON array incrementally.
+    Each query is handed to `on_query` as soon as its JSON object is complete,
+    so research on it can start while the remaining queries are still being generated.
+    Returns the list of query objects, or an empty list on timeout or parse failure.
+    """
+    system_prompt = ""
+    system_prompt = update_system_prompt(system_prompt, llm)
+
+    messages = chat_messages(
+        system_prompt,
+        input=query_writer_instructions.format(
+            topic=topic,
+            report_organization=report_organization,
+            number_of_queries=number_of_queries
+        )
+    )
+
+    queries = []
+    plan_parser = JsonArrayStreamParser()
+
+    def _add_queries(parsed: list):
+        for query in parsed:
+            queries.append(query)
+            if on_query is None:
+                continue
+            try:
+                on_query(GeneratedQuery.model_validate(query))
+            except ValidationError as e:
+                logger.warning(f"Skipping invalid query in research plan: {e}")
+
+    try: 
+        think_filter = await stream_llm(
+            llm, messages, "query_writer_instructions",
+            on_thinking=lambda text: writer({"generating_questions": text}),
+            on_answer=lambda text: _add_queries(plan_parser.feed(text)),
+            thinking_first=expects_thinking(llm)
+        )
+    except asyncio.TimeoutError as e: 
+        writer({"generating_questions": " \n \n ---------------- \n \n "
+                                        "Timeout error from reasoning LLM, please try again"})
+        return []
+
+    if queries:
+        return queries
+
+    # The final JSON follows the </think> tag
+    json_str = think_filter.answer.strip()
+    if not json_str:
+        writer({"generating_questions": " \n \n ---------------- \n \n "
+                                        "Timeout error from reasoning LLM, please try again"})
+        logger.info(
+            "Error processing query response. No answer after </think> tag. "
+            f"Response: {think_filter.thinking}"
+        )
+        return []
+
+    # Fall back to the lenient markdown JSON parser if the stream was not a plain array
+    try:
+        parsed = parse_json_markdown(json_str)
+        _add_queries(parsed if isinstance(parsed, list) else [parsed])
+    except Exception as e:
+        logger.error(f"Error parsing queries as JSON: {e}")
+
+    return queries
+
+
 async def generate_query(state: AIRAState, config: RunnableConfig, writer: StreamWriter):
     """
     Node for generating a research plan as a list of queries. 
@@ -67,60 +168,86 @@ async def generate_query(state: AIRAState, config: RunnableConfig, writer: Strea
     report_organization = config["configurable"].get("report_organization")
     topic = config["configurable"].get("topic")
 
-    system_prompt = ""
-    system_prompt = update_system_prompt(system_prompt, llm)
+    queries = await generate_query_plan(llm, topic, report_organization, number_of_queries, writer)
+    return {"queries": queries}
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system", system_prompt
-            ),
-            (
-                "human", "{input}"
-            ),
-        ]
+
+def collect_research_results(
+        state_queries: List[GeneratedQuery],
+        results: list,
+        stored_sources: int = 0
+) -> dict:
+    """
+    Formats the per-query (rag_answer, rag_source, relevancy, web_answer, web_sources) results
+    into the aggregated XML sources and the new records of the source store,
+    numbered after the `stored_sources` records already in the store.
+    """
+    # Unpack results.
+    generated_answers = [result[0] for result in results]
+    rag_sources = [result[1] for result in results]
+    relevancy_list = [result[2] for result in results]
+    web_results = [result[3] for result in results]
+    web_sources = [result[4] for result in results]
+
+    # store the cited sources first, so every source of the XML refers to the ids of its records
+    cited = [
+        cited_sources(*query_sources)
+        for query_sources in zip(rag_sources, relevancy_list, web_sources)
+    ]
+    sources, cited = store_sources(cited, stored_sources)
+
+    # Format the sources (producing a combined XML <sources> structure).
+    search_str = deduplicate_and_format_sources(
+        cited, generated_answers, relevancy_list, web_results, state_queries
     )
-    chain = prompt | llm
+    return {"sources": sources, "web_research_results": [search_str]}
 
-    input = {
-        "topic": topic,
-        "report_organization": report_organization,
-        "number_of_queries": number_of_queries,
-        "input": query_writer_instructions.format(topic=topic, report_organization=report_organization, number_of_queries=number_of_queries)
-    }
 
-    answer_agg = ""
-    stop = False
+def prepare_research_sources(
+        search_str: str,
+        queries: List[GeneratedQuery],
+        config: RunnableConfig,
+        previous: List[str] | None = None
+) -> str:
+    """
+    Removes passages that near-duplicate earlier research of the run (`previous`) and applies
+    extractive compression to the research results, as enabled for the request.
+    """
+    if config["configurable"].get("dedupe_sources"):
+        search_str = dedupe_sources(search_str, previous)
+    if config["configurable"].get("compress_sources"):
+        max_tokens = config["configurable"].get("compressed_source_tokens") or 512
+        sections = {q.query: q.report_section for q in queries}
+        search_str = compress_sources(search_str, max_tokens, sections)
+    return search_str
 
-    try: 
-        async with asyncio.timeout(ASYNC_TIMEOUT):
-            async for chunk in chain.astream(input, stream_usage=True):
-                answer_agg += chunk.content
-                if "</think>" in chunk.content:
-                    stop = True
-                if not stop:
-                    writer({"generating_questions": chunk.content})
-    except asyncio.TimeoutError as e: 
-        writer({"generating_questions": " \n \n ---------------- \n \n Timeout error from reasoning LLM, please try again"})
-        queries = []
-        return {"queries": queries}
-
-    # Split to get the final JSON after </think>
-    splitted = answer_agg.split("</think>")
-    if len(splitted) < 2:
-        writer({"generating_questions": " \n \n ---------------- \n \n Timeout error from reasoning LLM, please try again"})
-        logger.info(f"Error processing query response. No </think> tag. Response: {answer_agg}")
-        queries = []
-        return {"queries": queries}
-
-    json_str = splitted[1].strip()
-    try:
-        queries = parse_json_markdown(json_str)
-    except Exception as e:
-        logger.error(f"Error parsing queries as JSON: {e}")
-        queries = []
 
-    return {"queries": queries}
+async def compress_research(
+        state: AIRAState,
+        config: RunnableConfig,
+        writer: StreamWriter
+):
+    """
+    Node between web_research and summarize_sources that removes near-duplicate passages and shrinks
+    every research answer to its sentences most relevant to the query and report section,
+    so less prompt reaches the reasoning LLM.
+    """
+    enabled = (
+        config["configurable"].get("compress_sources")
+        or config["configurable"].get("dedupe_sources")
+    )
+    if not enabled or not state.web_research_results:
+        return
+
+    logger.info("COMPRESSING SOURCES")
+    most_recent_web_research = state.web_research_results[-1]
+    compressed = prepare_research_sources(
+        most_recent_web_research, state.queries, config, state.web_research_results[:-1]
+    )
+    writer({"compress_research": "\n Compressed research results from "
+                                 f"{len(most_recent_web_research)} to {len(compressed)} "
+                                 "characters \n"})
+    return {"web_research_results": [*state.web_research_results[:-1], compressed]}
 
 
 async def web_research(
@@ -133,9 +260,13 @@ async def web_research(
     Research is performed deterministically by running RAG (and optionally a web search) on each query.
     The function extracts the queries from the state, processes each one via process_single_query,
     and finally formats the sources into an aggregated XML structure.
-    A separate list of source citations is also maintained, tracking the query, answer, and sources for each query.
+    The cited sources of each query (query, answer, documents and URLs)
+    are added to the source store of the state.
     """
 
+    if config["configurable"].get("incremental_research"):
+        return await incremental_web_research(state, config, writer)
+
     logger.info("STARTING WEB RESEARCH")
     llm = config["configurable"].get("llm")
     search_web = config["configurable"].get("search_web")
@@ -153,28 +284,147 @@ async def web_research(
         for query in queries
     ])
 
-    # Unpack results.
-    generated_answers = [result[0] for result in results]
-    citations = [result[1] if result[1] is not None else "" for result in results]
-    relevancy_list = [result[2] for result in results]
-    web_results = [result[3] for result in results]
-    citations_web = [result[4] if result[4] is not None else "" for result in results]
+    return collect_research_results(state_queries, results, len(state.sources))
 
-    # Format the sources (producing a combined XML <sources> structure).
-    search_str = deduplicate_and_format_sources(
-        citations, generated_answers, relevancy_list, web_results, state_queries
+
+async def incremental_web_research(
+        state: AIRAState,
+        config: RunnableConfig,
+        writer: StreamWriter
+):
+    """
+    Incremental variant of web_research that overlaps research and summarization.
+    Query results are consumed with as_completed and streamed as soon as they land.
+    The report draft starts once the first `summary_first_k` sources are available (default: half)
+    and is extended with the sources that arrived while the previous draft was being written.
+    Queries still running after `research_deadline` seconds are cancelled and left out of the
+    report. Sources are stored in the order they arrived, so the handles in the draft match the
+    source store.
+    """
+    logger.info("STARTING INCREMENTAL WEB RESEARCH")
+    llm = config["configurable"].get("llm")
+    search_web = config["configurable"].get("search_web")
+    collection = config["configurable"].get("collection")
+    report_organization = config["configurable"].get("report_organization")
+    # queries still running when the research deadline or the request deadline
+    # (less the reserve for the report) is reached are skipped
+    research_deadline = step_timeout(
+        config, config["configurable"].get("research_deadline") or None, RESEARCH_STEPS
     )
+    report_extension = config["configurable"].get("report_extension", "rewrite")
+    summarizer = route_model(config, "summarize_sources")
+    budget = make_token_budget(config, summarizer.llm)
 
-    all_citations = []
-    for idx, citation in enumerate(citations):
-        if relevancy_list[idx]["score"] == "yes":
-            all_citations.append(citation)
-        if relevancy_list[idx]["score"] != "yes" and citations_web[idx] not in ["N/A", ""]:
-            all_citations.append(citations_web[idx])
+    state_queries = state.queries
+    first_k = config["configurable"].get("summary_first_k") or (len(state_queries) + 1) // 2
+    first_k = min(first_k, len(state_queries))
 
-    all_citations = set(all_citations) # remove duplicates
-    citation_str = "\n".join(all_citations)
-    return {"citations": citation_str, "web_research_results": [search_str]}
+    async def _research(idx: int):
+        return idx, await process_single_query(
+            state_queries[idx].query, config, writer, collection, llm, search_web
+        )
+
+    results = {}
+    arrived: asyncio.Queue[int | None] = asyncio.Queue()
+    stored_sources = []
+    summarized = []
+    dropped = []
+
+    async def _collect():
+        tasks = [asyncio.create_task(_research(idx)) for idx in range(len(state_queries))]
+        try:
+            for next_result in asyncio.as_completed(tasks, timeout=research_deadline):
+                idx, result = await next_result
+                results[idx] = result
+                writer({"web_research": f"\n Research finished for {len(results)}/"
+                                        f"{len(state_queries)} queries: "
+                                        f"{state_queries[idx].query} \n"})
+                arrived.put_nowait(idx)
+        except asyncio.TimeoutError:
+            stragglers = [q.query for i, q in enumerate(state_queries) if i not in results]
+            dropped.extend(stragglers)
+            logger.info(f"Research deadline reached, skipping {len(stragglers)} queries")
+            writer({
+                "web_research": f"\n Research deadline reached, continuing without: {stragglers} \n"
+            })
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            arrived.put_nowait(None)
+
+    timed_out = False
+
+    async def _summarize():
+        nonlocal timed_out
+        summary = ""
+        batch = []
+        finished = False
+        while not finished:
+            idx = await arrived.get()
+            finished = idx is None
+            if not finished:
+                batch.append(idx)
+            # take everything that arrived while the previous draft was being written
+            while not finished and not arrived.empty():
+                idx = arrived.get_nowait()
+                finished = idx is None
+                if not finished:
+                    batch.append(idx)
+
+            if not batch or (not summary and len(batch) < first_k and not finished):
+                continue
+
+            batch_queries = [state_queries[i] for i in batch]
+            batch_sources = collect_research_results(
+                batch_queries, [results[i] for i in batch], len(state.sources) + len(stored_sources)
+            )
+            stored_sources.extend(batch_sources["sources"])
+            try:
+                summary = await summarize_report(
+                    existing_summary=summary,
+                    new_source=prepare_research_sources(
+                        batch_sources["web_research_results"][0], batch_queries, config, summarized
+                    ),
+                    report_organization=report_organization,
+                    llm=summarizer.llm,
+                    writer=writer,
+                    extension_mode=report_extension,
+                    budget=budget,
+                    source_encoding=config["configurable"].get("source_encoding", "xml"),
+                    reasoning=summarizer.reasoning,
+                    timeout=step_timeout(config, ASYNC_TIMEOUT, FINALIZE_STEPS)
+                )
+            except IncompleteReportError as e:
+                summary = e.report
+                timed_out = True
+            writer({"running_summary": summary})
+            summarized.append(batch_sources["web_research_results"][0])
+            batch = []
+        return summary
+
+    collecting = asyncio.create_task(_collect())
+    summarizing = asyncio.create_task(_summarize())
+    try:
+        _, summary = await asyncio.gather(collecting, summarizing)
+    finally:
+        # if one side fails (or the node is cancelled) the other is cancelled too,
+        # so no research or LLM call outlives the node
+        for task in (collecting, summarizing):
+            task.cancel()
+        await asyncio.gather(collecting, summarizing, return_exceptions=True)
+
+    research = ET.Element("sources")
+    for batch_research in summarized:
+        research.extend(ET.fromstring(batch_research))
+    update = {
+        "sources": stored_sources,
+        "web_research_results": [ET.tostring(research, encoding="unicode")],
+        "running_summary": summary
+    }
+    if dropped or timed_out:
+        update["degraded"] = True
+    return update
 
 
 async def summarize_sources(
@@ -186,26 +436,58 @@ async def summarize_sources(
     Node for summarizing or extending an existing summary. Takes the web research report and writes a report draft.
     """
     logger.info("SUMMARIZE")
-    llm = config["configurable"].get("llm")
+    llm, reasoning = route_model(config, "summarize_sources")
     report_organization = config["configurable"].get("report_organization")
 
+    if config["configurable"].get("incremental_research") and state.running_summary:
+        # the draft was already written while the research results arrived
+        writer({"running_summary": state.running_summary})
+        return {"running_summary": state.running_summary}
+
     # The most recent web research
     most_recent_web_research = state.web_research_results[-1]
     existing_summary = state.running_summary
 
-    # -- Call the helper function here --
-    updated_report = await summarize_report(
-        existing_summary=existing_summary,
-        new_source=most_recent_web_research,
-        report_organization=report_organization,
-        llm=llm,
-        writer=writer
-    )
+    updated_report = None
+    degraded = {}
+    try:
+        if config["configurable"].get("summary_mode") == "map_reduce" and not existing_summary:
+            # draft every report section from its own sources in parallel, then stitch them together
+            updated_report = await summarize_by_section(
+                sources=most_recent_web_research,
+                queries=state.queries,
+                report_organization=report_organization,
+                llm=llm,
+                writer=writer,
+                budget=make_token_budget(config, llm),
+                source_encoding=config["configurable"].get("source_encoding", "xml"),
+                reasoning=reasoning,
+                timeout=step_timeout(config, ASYNC_TIMEOUT, FINALIZE_STEPS)
+            )
+
+        # -- Call the helper function here --
+        if updated_report is None:
+            updated_report = await summarize_report(
+                existing_summary=existing_summary,
+                new_source=most_recent_web_research,
+                report_organization=report_organization,
+                llm=llm,
+                writer=writer,
+                extension_mode=config["configurable"].get("report_extension", "rewrite"),
+                budget=make_token_budget(config, llm),
+                source_encoding=config["configurable"].get("source_encoding", "xml"),
+                reasoning=reasoning,
+                timeout=step_timeout(config, ASYNC_TIMEOUT, FINALIZE_STEPS)
+            )
+    except IncompleteReportError as e:
+        # the draft is incomplete, the report is finished from it but not cached
+        updated_report = e.report
+        degraded = {"degraded": True}
 
     state.running_summary = updated_report
 
     writer({"running_summary": updated_report})
-    return {"running_summary": updated_report}
+    return {"running_summary": updated_report, **degraded}
 
 
 async def reflect_on_summary(state: AIRAState, config: RunnableConfig, writer: StreamWriter):
@@ -214,56 +496,85 @@ async def reflect_on_summary(state: AIRAState, config: RunnableConfig, writer: S
     Identified gaps are added as new queries.
     Number of new queries is determined by the num_reflections parameter.
     For each new query, the node performs web research and report extension.
-    The extended report and additional citations are added to the state.
+    The extended report and the sources of the new queries are added to the state.
+    With a reflection_novelty_threshold the loop stops early once a reflection query repeats an
+    earlier query, or its research adds too little that is not already in the earlier sources and
+    the report.
+    With a request deadline the remaining reflections are skipped once the time left would not cover
+    another reflection and the steps after it.
     """
     logger.info("REFLECTING")
-    llm = config["configurable"].get("llm")
+    llm, reasoning = route_model(config, "reflect_on_summary")
     num_reflections = config["configurable"].get("num_reflections")
     report_organization = config["configurable"].get("report_organization")
     search_web = config["configurable"].get("search_web")
     collection = config["configurable"].get("collection")
 
     logger.info(f"REFLECTING {num_reflections} TIMES")
+    new_sources = []
+
+    novelty_threshold = config["configurable"].get("reflection_novelty_threshold") or 0
+    query_similarity = config["configurable"].get("reflection_query_similarity") or 1
+    tracker = None
+    if novelty_threshold > 0:
+        tracker = NoveltyTracker()
+        tracker.add_text(state.running_summary)
+        for research in state.web_research_results or []:
+            tracker.add_sources(research)
+        for query in state.queries or []:
+            tracker.add_query(
+                query.query if isinstance(query, GeneratedQuery) else query.get("query", "")
+            )
 
+    # the virtual screening results are combined into the report after the reflection
+    later_steps = FINALIZE_STEPS + (1 if state.do_virtual_screening else 0)
+    last_duration = 0.0
+    degraded = {}
     for i in range(num_reflections):
-        input = {
-            "input": reflection_instructions.format(report_organization=report_organization, topic=config["configurable"].get("topic"), report=state.running_summary)
+        if not has_time_for(config, later_steps, last_duration):
+            writer({"reflect_on_summary": f"\n Skipping the remaining {num_reflections - i} "
+                                          "reflections to finish the report before the deadline "
+                                          "\n"})
+            degraded = {"degraded": True}
+            break
+        started = time.monotonic()
 
-        }
         system_prompt = ""
-        system_prompt = update_system_prompt(system_prompt, llm)
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system", system_prompt
-                ),
-                (
-                    "human", "Using report organization as a guide identify a knowledge gap and generate a follow-up web search query based on our existing knowledge. \n \n {input}"
-                ),
-            ]
+        system_prompt = update_system_prompt(system_prompt, llm, reasoning)
+
+        messages = chat_messages(
+            system_prompt,
+            "Using report organization as a guide identify a knowledge gap and generate a "
+            "follow-up web search query based on our existing knowledge. \n \n {input}",
+            input=reflection_instructions.format(
+                report_organization=report_organization,
+                topic=config["configurable"].get("topic"),
+                report=state.running_summary
+            )
         )
-        chain = prompt | llm
 
         writer({"reflect_on_summary": "\n Starting reflection \n"})
-        async for i in async_gen(1):
-            result = ""
-            stop = False
-            async for chunk in chain.astream(input, stream_usage=True):
-                result = result + chunk.content
-                if chunk.content == "</think>":
-                    stop = True
-                if not stop:
-                    writer({"reflect_on_summary": chunk.content})
-
-        splitted = result.split("</think>")
-        if len(splitted) < 2:
+        try:
+            think_filter = await stream_llm(
+                llm, messages, "reflection_instructions",
+                on_thinking=lambda text: writer({"reflect_on_summary": text}),
+                timeout=step_timeout(config, ASYNC_TIMEOUT, later_steps),
+                thinking_first=expects_thinking(llm, reasoning)
+            )
+        except asyncio.TimeoutError:
+            writer({"reflect_on_summary": " \n \n ---------------- \n \n Timeout error from "
+                                          "reasoning LLM during reflection. "
+                                          "Keeping the current report. \n \n "})
+            degraded = {"degraded": True}
+            break
+
+        reflection_json = think_filter.answer.strip()
+        if not reflection_json:
             # If we can't parse anything, just fallback
             running_summary = state.running_summary
             writer({"running_summary": running_summary})
-            return {"running_summary": running_summary}
+            return {"running_summary": running_summary, "sources": new_sources}
 
-        reflection_json = splitted[1].strip()
         try:
             reflection_obj = parse_json_markdown(reflection_json)
             gen_query = GeneratedQuery(
@@ -280,8 +591,14 @@ async def reflect_on_summary(state: AIRAState, config: RunnableConfig, writer: S
                 rationale="Reflection-based query"
             )
 
+        if tracker is not None:
+            if tracker.duplicate_query(gen_query.query, query_similarity):
+                writer({"reflect_on_summary": f"\n Reflection {i + 1}: query repeats an earlier "
+                                              f"query, stopping reflection: {gen_query.query} \n"})
+                break
+            tracker.add_query(gen_query.query)
 
-        rag_answer, rag_citation, relevancy, web_answer, web_citation = await process_single_query(
+        rag_answer, rag_source, relevancy, web_answer, web_sources = await process_single_query(
             query=gen_query.query,
             config=config,
             writer=writer,
@@ -291,143 +608,156 @@ async def reflect_on_summary(state: AIRAState, config: RunnableConfig, writer: S
         )
 
 
+        stored, cited = store_sources(
+            [cited_sources(rag_source, relevancy, web_sources)],
+            len(state.sources) + len(new_sources)
+        )
+
         search_str = deduplicate_and_format_sources(
-            [rag_citation], [rag_answer], [relevancy], [web_answer], [gen_query]
+            cited, [rag_answer], [relevancy], [web_answer], [gen_query]
+        )
+        search_str = prepare_research_sources(
+            search_str, [gen_query], config, state.web_research_results
         )
 
-        state.web_research_results.append(search_str)
-        
-        if relevancy['score'] == "yes" and rag_citation is not None:
-            state.citations = "\n".join([state.citations, rag_citation])
+        if tracker is not None:
+            novelty = tracker.sources_novelty(search_str)
+            writer({"reflect_on_summary": f"\n Reflection {i + 1} novelty: {novelty:.2f} "
+                                          f"(threshold {novelty_threshold:.2f}) \n"})
+            if novelty < novelty_threshold:
+                # the report already covers this research, skip the rewrite and stop reflecting
+                logger.info(f"Stopping reflection after {i} iterations, novelty {novelty:.2f}")
+                break
+            tracker.add_sources(search_str)
 
-        if relevancy['score'] != "yes" and web_citation not in ["N/A", ""] and web_citation is not None:
-            state.citations = "\n".join([state.citations, web_citation])
+        new_sources.extend(stored)
+        state.web_research_results.append(search_str)
 
         # Most recent web research
         existing_summary = state.running_summary
         most_recent_web_research = state.web_research_results[-1]
 
-        updated_report = await summarize_report(
-            existing_summary=existing_summary,
-            new_source=most_recent_web_research,
-            report_organization=report_organization,
-            llm=llm,
-            writer=writer
-        )
-
+        try:
+            updated_report = await summarize_report(
+                existing_summary=existing_summary,
+                new_source=most_recent_web_research,
+                report_organization=report_organization,
+                llm=llm,
+                writer=writer,
+                extension_mode=config["configurable"].get("report_extension", "rewrite"),
+                budget=make_token_budget(config, llm),
+                source_encoding=config["configurable"].get("source_encoding", "xml"),
+                reasoning=reasoning,
+                timeout=step_timeout(config, ASYNC_TIMEOUT, later_steps)
+            )
+        except IncompleteReportError as e:
+            # the report was not extended with this research, keep it and stop reflecting
+            state.running_summary = e.report
+            degraded = {"degraded": True}
+            break
 
         state.running_summary = updated_report
+        if tracker is not None:
+            tracker.add_text(updated_report)
 
         writer({"running_summary": updated_report})
+        last_duration = time.monotonic() - started
 
     running_summary = state.running_summary
     writer({"running_summary": running_summary})
-    return {"running_summary": running_summary, "citations": state.citations}
+    return {"running_summary": running_summary, "sources": new_sources, **degraded}
 
 async def finalize_summary(state: AIRAState, config: RunnableConfig, writer: StreamWriter):
     """
     Node for double checking the final summary is valid markdown
     and manually adding the sources list to the end of the report.
+    The finalizer gets the time left before the request deadline,
+    without it the report draft is used as is.
     """
     logger.info("FINALZING REPORT")
-    llm = config["configurable"].get("llm")
+    route = route_model(config, "finalize_summary")
     report_organization = config["configurable"].get("report_organization")
 
     
     writer({"final_report": "\n Starting finalization \n"})
 
-    sources_formatted = format_sources(state.citations)
+    sources, merged = state.sources, {}
+    if config["configurable"].get("dedupe_sources"):
+        sources, merged = merge_duplicate_sources(state.sources)
+    sources_formatted = render_sources(sources)
+    # number of every stored source in the sources list,
+    # merged sources are cited by the one they were merged into
+    source_numbers = {source.id: number for number, source in enumerate(sources, start=1)}
+    source_numbers.update({
+        source_id: source_numbers[kept_id] for source_id, kept_id in merged.items()
+    })
+
+    budget = make_token_budget(config, route.llm)
+    if budget is not None:
+        # the draft cannot be shortened without losing content, only report the utilization
+        budget.report("finalize_report", finalize_report.format(
+            report=state.running_summary, report_organization=report_organization
+        ))
     
     # Final report creation, used to remove any remaing model commentary from the report draft
-    finalizer = PromptTemplate.from_template(finalize_report) | llm
-    final_buf = ""
+    finalizer_input = with_reasoning(
+        finalize_report.format(
+            report=state.running_summary, report_organization=report_organization
+        ),
+        route
+    )
     try:
-        async with asyncio.timeout(ASYNC_TIMEOUT*3):
-            async for chunk in finalizer.astream({
-                "report": state.running_summary,
-                "report_organization": report_organization,
-            }, stream_usage=True):
-                final_buf += chunk.content
-                writer({"final_report": chunk.content})
+        think_filter = await stream_llm(
+            route.llm, finalizer_input, "finalize_report",
+            on_thinking=lambda text: writer({"final_report": text}),
+            on_answer=lambda text: writer({"final_report": text}),
+            timeout=step_timeout(config, ASYNC_TIMEOUT*3, margin=RESPONSE_MARGIN)
+        )
     except asyncio.TimeoutError as e:
         writer({"final_report": " \n \n --------------- \n Timeout error from reasoning LLM during final report creation. Consider restarting report generation. \n \n "})
-        state.running_summary = f"{state.running_summary} \n\n ---- \n\n {sources_formatted}"
+        draft = resolve_source_handles(state.running_summary, source_numbers)
+        state.running_summary = f"{draft} \n\n ---- \n\n {sources_formatted}"
         writer({"finalized_summary": state.running_summary})
-        return {"final_report": state.running_summary, "citations": sources_formatted}
-    
-    # Strip out <think> sections
-    while "<think>" in final_buf and "</think>" in final_buf:
-        start = final_buf.find("<think>")
-        end = final_buf.find("</think>") + len("</think>")
-        final_buf = final_buf[:start] + final_buf[end:]
+        return {
+            "final_report": state.running_summary,
+            "citations": sources_formatted,
+            "degraded": True
+        }
     
-    # Handle case where opening <think> tag might be missing
-    while "</think>" in final_buf:
-        end = final_buf.find("</think>") + len("</think>")
-        final_buf = final_buf[end:]
-        
+    # source handles cited in the report (see source_encoding) are resolved locally,
+    # not by the finalizer
+    final_buf = resolve_source_handles(think_filter.answer, source_numbers)
     state.running_summary = f"{final_buf} \n\n ## Sources \n\n{sources_formatted}"    
     writer({"finalized_summary": state.running_summary})
     return {"final_report": state.running_summary, "citations": sources_formatted}
 
-def format_sources(sources: str) -> str:
-    try:
-        # Split sources into individual entries
-        source_entries = re.split(r'(?=---\nQUERY:)', sources)
-        formatted_sources = []
-        src_count = 1
-        
-        for idx, entry in enumerate(source_entries):
-            if not entry.strip():
-                continue
-                
-            # Split into query, answer, and citations using a more precise pattern
-            # This pattern looks for newlines followed by QUERY:, ANSWER:, or CITATION(S):
-            # but only if they're not preceded by a pipe (|) character (markdown table)
-            src_parts = re.split(r'(?<!\|)\n(?=QUERY:|ANSWER:|CITATION(?:S)?:)', entry.strip())
-            
-            if len(src_parts) >= 4:
-                source_num = src_count
-                # Remove the prefix from each part
-                query = re.sub(r'^QUERY:', '', src_parts[1]).strip()
-                answer = re.sub(r'^ANSWER:', '', src_parts[2]).strip()
-                
-                # Handle multiple citations
-                citations = ''.join(src_parts[3:]) 
-
-                formatted_entry = f"""
----
-**Source** {source_num}
-
-**Query:** {query}
-
-**Answer:**
-{answer}
-
-{citations}
-"""
-                formatted_sources.append(formatted_entry)
-                src_count += 1
-            else:
-                logger.info(f"Failed to clean up {entry} because it failed to parse")
-                formatted_sources.append(entry)
-                src_count += 1
-                
-        # Combine main content with formatted sources
-        return "\n".join(formatted_sources)
-    except Exception as e:
-        logger.warning(f"Error formatting sources: {e}")
-        return sources
-    
 # The following nodes are biomed aira nodes
 
-async def check_virtual_screening_intended(llm, writer, report_organization: str, topic : str) -> bool:
+async def check_virtual_screening_intended(
+        llm,
+        writer,
+        report_organization: str,
+        topic : str,
+        reasoning: bool | None = None,
+        timeout: float | None = ASYNC_TIMEOUT
+) -> bool:
     """
     Check the report_organization to determine if virtual screening is intended to happen.
     Returns True or False.
     """
     
-    response = await llm.ainvoke(check_whether_virtual_screening.format(report_organization=report_organization, topic = topic))
+    try:
+        response = await invoke_llm(llm, with_reasoning(
+            check_whether_virtual_screening.format(
+                report_organization=report_organization, topic = topic
+            ),
+            ModelRoute(llm, reasoning)
+        ), "check_whether_virtual_screening", timeout=timeout)
+    except asyncio.TimeoutError:
+        writer({"check_virtual_screening_intended": "Timeout error from LLM checking the intention "
+                                                    "of virtual screening, "
+                                                    "skipping virtual screening"})
+        return False
     intention = parse_json_markdown(response.content)
     writer({"check_virtual_screening_intended": "Intention of virtual screening: " + intention["intention"].lower()})
     if intention["intention"].lower() == "yes":
@@ -436,7 +766,16 @@ async def check_virtual_screening_intended(llm, writer, report_organization: str
         return False
     
 
-async def find_protein_and_molecule( llm, topic, writer, config, collection, search_web, num_iterations = 3):
+async def find_protein_and_molecule(
+        llm,
+        topic,
+        writer,
+        config,
+        collection,
+        search_web,
+        num_iterations = 3,
+        reasoning: bool | None = None
+):
     """
     This function creates and sends queries sent to the RAG/web to find the two items needed to kick off virtual screening: 
     target protein, and recent small molecule therapy.
@@ -444,51 +783,47 @@ async def find_protein_and_molecule( llm, topic, writer, config, collection, sea
     logger.info("FIND TARGET PROTEIN and SMALL MOLECULE THERAPY FROM KNOWLEDGE BASE")
     vs_additional_queries = []
     vs_queries_results = []
-    vs_citations = ""
+    vs_sources = []
     target_prot, sml_molecule = "", ""
 
     for i in range(num_iterations):
+        if not has_time_for(config, VIRTUAL_SCREENING_STEPS):
+            writer({"find_protein_and_molecule": "\n Not enough time left before the deadline, "
+                                                 "stopping the search. \n "})
+            break
         writer({"find_protein_and_molecule": f"\n Iteration: {str(i)} \n"})
         if len(vs_queries_results) == 0:
             knowledge_sources = "Not existing knowledge found. "
         else:
             knowledge_sources = "\n".join(vs_queries_results)
-        input = {
-            "input": check_protein_molecule_found.format(topic = topic, knowledge_sources=knowledge_sources)
-
-        }
         system_prompt = ""
-        system_prompt = update_system_prompt(system_prompt, llm)
+        system_prompt = update_system_prompt(system_prompt, llm, reasoning)
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system", system_prompt
-                ),
-                (
-                    "human", "{input}"
-                ),
-            ]
+        messages = chat_messages(
+            system_prompt,
+            input=check_protein_molecule_found.format(
+                topic = topic, knowledge_sources=knowledge_sources
+            )
         )
-        chain = prompt | llm
 
         writer({"find_protein_and_molecule": "\n Starting the check among existing virtual screening query results. \n "})
-        async for i in async_gen(1):
-            result = ""
-            stop = False
-            async for chunk in chain.astream(input, stream_usage=True):
-                result = result + chunk.content
-                if chunk.content == "</think>":
-                    stop = True
-                if not stop:
-                    writer({"find_protein_and_molecule": chunk.content})
-
-        splitted = result.split("</think>")
-        if len(splitted) < 2:
-            # If we can't parse anything
+        try:
+            think_filter = await stream_llm(
+                llm, messages, "check_protein_molecule_found",
+                on_thinking=lambda text: writer({"find_protein_and_molecule": text}),
+                timeout=step_timeout(config, ASYNC_TIMEOUT, VIRTUAL_SCREENING_STEPS),
+                thinking_first=expects_thinking(llm, reasoning)
+            )
+        except asyncio.TimeoutError:
+            writer({"find_protein_and_molecule": "\n Timeout error from reasoning LLM, "
+                                                 "skipping this iteration. \n "})
             continue
+
         # get the remaining queries needed to have both of the ingredients for virtual screening
-        response_json = splitted[1].strip()
+        response_json = think_filter.answer.strip()
+        if not response_json:
+            # If we can't parse anything
+            continue
         writer({"find_protein_and_molecule": f"\n Returned result: {response_json} \n "})
         try:
             response_obj = parse_json_markdown(response_json)
@@ -499,7 +834,9 @@ async def find_protein_and_molecule( llm, topic, writer, config, collection, sea
                     rationale="Remaining query needed for gathering the two ingredients needed for virtual screening"
                 )
                 vs_additional_queries.append(gen_query)
-                rag_answer, rag_citation, relevancy, web_answer, web_citation = await process_single_query(
+                (
+                    rag_answer, rag_source, relevancy, web_answer, web_sources
+                ) = await process_single_query(
                     query=gen_query.query,
                     config=config,
                     writer=writer,
@@ -507,17 +844,14 @@ async def find_protein_and_molecule( llm, topic, writer, config, collection, sea
                     llm=llm,
                     search_web=search_web
                 )
+                cited = cited_sources(rag_source, relevancy, web_sources)
                 vs_search_str = deduplicate_and_format_sources(
-                    [rag_citation], [rag_answer], [relevancy], [web_answer], [gen_query]
+                    [cited], [rag_answer], [relevancy], [web_answer], [gen_query]
                 )
 
                 vs_queries_results.append(vs_search_str)
                 writer({"find_protein_and_molecule": f"\n This query's search results: {vs_search_str} \n "})
-                if relevancy['score'] == "yes" and rag_citation is not None:
-                    vs_citations = "\n".join([vs_citations, rag_citation])
-
-                if relevancy['score'] != "yes" and web_citation not in ["N/A", ""] and web_citation is not None:
-                    vs_citations = "\n".join([vs_citations, web_citation])
+                vs_sources.extend(cited)
                 
             elif "target_protein" in response_obj and "recent_small_molecule_therapy" in response_obj:
                 target_prot, sml_molecule = response_obj["target_protein"],  response_obj["recent_small_molecule_therapy"]
@@ -526,12 +860,13 @@ async def find_protein_and_molecule( llm, topic, writer, config, collection, sea
             logger.warning(f"Error parsing reflection JSON: {e}")
             
        
+    vs_citations = "\n".join(format_source_block(source) for source in vs_sources)
     writer({"find_protein_and_molecule": f"\nCitations: {vs_citations} \n "})
     
     writer({"find_protein_and_molecule": f"\nTarget protein is {target_prot} \n "})
     writer({"find_protein_and_molecule": f"\nSmall molecule therapy is {sml_molecule} \n "})
     writer({"find_protein_and_molecule": "\nNow leaving the checking function."})
-    return target_prot, sml_molecule, vs_additional_queries, vs_queries_results, vs_citations
+    return target_prot, sml_molecule, vs_additional_queries, vs_queries_results, vs_sources
 
 
 async def begin_virtual_screening_if_intended(
@@ -545,14 +880,27 @@ async def begin_virtual_screening_if_intended(
     Check if virtual screening is intended, and check if the two items needed for virtual screening are 
     present in the web_research results.
     """
-    llm = config["configurable"].get("llm")
+    llm, reasoning = route_model(config, "begin_virtual_screening_if_intended")
     report_organization = config["configurable"].get("report_organization")
     num_reflections = config["configurable"].get("num_reflections")
     topic = config["configurable"].get("topic")
     collection = config["configurable"].get("collection")
     search_web = config["configurable"].get("search_web")
 
-    vs_intended = await check_virtual_screening_intended(llm, writer, report_organization, topic)
+    if not has_time_for(config, VIRTUAL_SCREENING_STEPS + 1):
+        writer({"check_virtual_screening_intended": "Not enough time left before the deadline, "
+                                                    "skipping virtual screening"})
+        state.do_virtual_screening = False
+        return {"do_virtual_screening": False, "degraded": True}
+
+    vs_intended = await check_virtual_screening_intended(
+        llm,
+        writer,
+        report_organization,
+        topic,
+        reasoning,
+        step_timeout(config, ASYNC_TIMEOUT, VIRTUAL_SCREENING_STEPS)
+    )
     if not vs_intended:
         logger.info("VIRTUAL SCREENING IS NOT INTENDED")
         # Virtual Screening is not intended, no need to start virtual screening
@@ -562,11 +910,29 @@ async def begin_virtual_screening_if_intended(
         # Virtual Screening is intended, next, check whether the last web_research contained 
         # the necessary info for starting VS: target protein and recent small molecule therapy
         most_recent_web_research = state.web_research_results[-1] 
-        state.target_protein, state.recent_sml_molecule, state.vs_queries, state.vs_queries_results, state.vs_citations = await find_protein_and_molecule(llm, topic, writer, config, collection, search_web)
+        # the search is a planning loop with its own route,
+        # by default the reasoning model of the request
+        search_llm, search_reasoning = route_model(config, "find_protein_and_molecule")
+        (
+            state.target_protein,
+            state.recent_sml_molecule,
+            state.vs_queries,
+            state.vs_queries_results,
+            state.vs_sources
+        ) = await find_protein_and_molecule(
+            search_llm, topic, writer, config, collection, search_web, reasoning=search_reasoning
+        )
         logger.info("TARGET PROTEIN AND RECENT SML MOLECULE HAVE BEEN FOUND")
         
     state.do_virtual_screening = vs_intended
-    return {"do_virtual_screening": state.do_virtual_screening, "target_protein": state.target_protein, "recent_sml_molecule": state.recent_sml_molecule, "vs_queries_results": state.vs_queries_results, "vs_citations": state.vs_citations, "vs_additional_queries": state.vs_queries}
+    return {
+        "do_virtual_screening": state.do_virtual_screening,
+        "target_protein": state.target_protein,
+        "recent_sml_molecule": state.recent_sml_molecule,
+        "vs_queries_results": state.vs_queries_results,
+        "vs_sources": state.vs_sources,
+        "vs_additional_queries": state.vs_queries
+    }
 
 def pdb_to_string(pdb_filepath: str):
     """
@@ -589,7 +955,33 @@ def pdb_to_string(pdb_filepath: str):
          logger.info(f"An error occurred: {e}")
          return None
 
-async def generate_molecule(molecule: str, molmim_invoke_url: str ) -> str:
+async def post_nim(
+        url: str,
+        payload: dict,
+        headers: dict | None = None,
+        timeout: float | None = None
+) -> dict:
+    """
+    POST a request to a virtual screening NIM and return the JSON response.
+    The request is aborted if the run is cancelled, e.g. when the client disconnects,
+    and raises asyncio.TimeoutError after `timeout` seconds (None: no limit).
+    """
+    if timeout is not None and timeout <= 0:
+        # aiohttp would treat a total timeout of 0 as no limit
+        raise asyncio.TimeoutError(f"No time left for the request to {url}")
+    record_usage(nim_calls=1)
+    with call_span("nim", url=url) as span:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            async with session.post(url, headers=headers, json=payload) as response:
+                response.raise_for_status()
+                span.set_attribute("response_bytes", response.content_length)
+                return await response.json(content_type=None)
+
+async def generate_molecule(
+        molecule: str,
+        molmim_invoke_url: str,
+        timeout: float | None = None
+) -> str:
     """Run a molecular generation model to generate molecules similar to a target molecule. 
     This returns generated ligands in SMILES format.
     If using self hosted url, make sure the url includes /generate at the end
@@ -612,24 +1004,24 @@ async def generate_molecule(molecule: str, molmim_invoke_url: str ) -> str:
         'min_similarity': 0.7, # Ignored if algorithm is not "CMA-ES".
         'iterations': 10,
     }
-    session = requests.Session()
-
     if molmim_invoke_url == "https://health.api.nvidia.com/v1/biology/nvidia/molmim/generate":
         # if using public endpoint, need to pass in NVIDIA_API_KEY
-        response = session.post(molmim_invoke_url, headers=headers, json=payload)
-        response.raise_for_status()
-        response_body = response.json()
+        response_body = await post_nim(molmim_invoke_url, payload, headers, timeout)
         molecules = json.loads(response_body['molecules'])
         generated_ligands = '\n'.join([v['sample'] for v in molecules])
     else:
         # self hosting NIM, no need for NVIDIA_API_KEY. This has been tested with version nvcr.io/nim/nvidia/molmim:1.0.0
-        response = session.post(molmim_invoke_url, json=payload)
-        response.raise_for_status()
-        response_body = response.json()
+        response_body = await post_nim(molmim_invoke_url, payload, timeout=timeout)
         generated_ligands = '\n'.join(v["smiles"] for v in response_body['generated'])
     return(generated_ligands)
 
-async def dock_molecule(curr_out_dir: str, folded_protein: str, generated_ligands: str, diffdock_invoke_url: str ):
+async def dock_molecule(
+        curr_out_dir: str,
+        folded_protein: str,
+        generated_ligands: str,
+        diffdock_invoke_url: str,
+        timeout: float | None = None
+):
         """Run a molecular docking to generate the docking poses and scores for generated_ligands. Return true if docking is successful, false otherwise."""
         logger.info("STARTING TO CALL DIFFDOCK NIM")
         NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
@@ -653,12 +1045,12 @@ async def dock_molecule(curr_out_dir: str, folded_protein: str, generated_ligand
         try:
             if diffdock_invoke_url == "https://health.api.nvidia.com/v1/biology/mit/diffdock":
                 # if using public endpoint, need the pass in the NVIDIA_API_KEY
-                response = requests.post(diffdock_invoke_url, headers=headers, json=payload)
+                response_body = await post_nim(diffdock_invoke_url, payload, headers, timeout)
             else:
                 # self hosted URL, no need for NVIDIA_API_KEY. This has been tested with version nvcr.io/nim/mit/diffdock:2.1.0
-                response = requests.post(diffdock_invoke_url, headers={"Accept": "application/json"}, json=payload)
-            response.raise_for_status()
-            response_body = response.json()
+                response_body = await post_nim(
+                    diffdock_invoke_url, payload, {"Accept": "application/json"}, timeout
+                )
             
             diffdock_position_confidence = response_body["position_confidence"] 
             ret_conf_scores = []
@@ -699,7 +1091,9 @@ async def dock_molecule(curr_out_dir: str, folded_protein: str, generated_ligand
 
 
 def get_smiles_from_molecule_name(compound_name: str, writer: StreamWriter):
-    compounds = pcp.get_compounds(compound_name, 'name')
+    with call_span("pubchem", query=compound_name) as span:
+        compounds = pcp.get_compounds(compound_name, 'name')
+        span.set_attribute("results", len(compounds))
     writer_info = ""
     if len(compounds) == 0:
         # no compound has been found with the name, try with a different name
@@ -739,7 +1133,8 @@ def get_protein_id_from_name(protein_name: str, writer: StreamWriter):
     writer({"call_virtual_screening_nims": writer_info_new})
 
     # Execute the query by running it as a function
-    results = query()
+    with call_span("rcsb", name="rcsb_search", query=protein_name):
+        results = list(query())
 
     # Results are returned as an iterator of result identifiers.
     first_id = None
@@ -766,7 +1161,9 @@ def get_protein_id_from_name(protein_name: str, writer: StreamWriter):
 
 def download_pdb_from_protein_id(protein_id: str, output_dir: str, writer: StreamWriter):
     url = f"https://files.rcsb.org/download/{protein_id}.pdb"
-    response = requests.get(url)
+    with call_span("rcsb", name="rcsb_download", url=url) as span:
+        response = requests.get(url)
+        span.set_attribute("response_bytes", len(response.content))
     writer_info = ""
     if response.status_code == 200:
         filename = os.path.join(output_dir, f"{protein_id}.pdb")
@@ -797,6 +1194,11 @@ async def call_virtual_screening_nims(
     if not state.do_virtual_screening:
         logger.info("ABANDONING VIRTUAL SCREENING: State's do_virtual_screening is FALSE")
         return
+    if not has_time_for(config, VIRTUAL_SCREENING_STEPS):
+        writer_info = (" \n Not enough time left before the deadline, "
+                       "not proceeding with Virtual Screening.")
+        writer({"call_virtual_screening_nims": writer_info})
+        return {"do_virtual_screening": False, "vs_steps_info": writer_info, "degraded": True}
     # proceed if there is intention to do virtual screening
     # first get the target protein's pdb format
     # secondly get the small molecule therapy's SMILES string
@@ -861,7 +1263,10 @@ async def call_virtual_screening_nims(
         logger.info(f"An error occurred in pdb_to_string: {e}")
     try:
         molmim_endpoint_url = os.getenv("MOLMIM_ENDPOINT_URL")
-        generated_ligands =  await generate_molecule(molecule=molecule, molmim_invoke_url=molmim_endpoint_url)
+        generated_ligands =  await generate_molecule(
+            molecule=molecule, molmim_invoke_url=molmim_endpoint_url,
+            timeout=step_timeout(config, None, VIRTUAL_SCREENING_STEPS)
+        )
        
         writer_info_new =  "\nThe generated ligands from MolMIM are: \n " + generated_ligands.replace("\n", " \n ") + " \n "
         writer_info += writer_info_new
@@ -870,7 +1275,10 @@ async def call_virtual_screening_nims(
         logger.info(f"An error occurred in generate_molecule: {e}")
     try:
         diffdock_endpoint_url = os.getenv("DIFFDOCK_ENDPOINT_URL")
-        add_writer_info =  await dock_molecule(curr_out_dir, protein_structure, generated_ligands, diffdock_endpoint_url)
+        add_writer_info =  await dock_molecule(
+            curr_out_dir, protein_structure, generated_ligands, diffdock_endpoint_url,
+            timeout=step_timeout(config, None, VIRTUAL_SCREENING_STEPS)
+        )
         writer_info += add_writer_info
         writer({"call_virtual_screening_nims": add_writer_info})
     except Exception as e:
@@ -888,71 +1296,72 @@ async def combine_virtual_screening_info_into_summary(state: AIRAState, config:
     if not state.do_virtual_screening:
         logger.info("No need to combine virtual screening info into summary since virtual screening was not performed.")
         return
+    if not has_time_for(config, FINALIZE_STEPS):
+        writer({"add_virtual_screening_info_into_report": "\n Not enough time left before the "
+                                                          "deadline, the virtual screening info is "
+                                                          "not added to the report \n"})
+        return {"degraded": True}
     logger.info("COMBINING VIRTUAL SCREENING PROCESS AND RESULTS INTO THE SUMMARY")
-    llm = config["configurable"].get("llm")
+    llm, reasoning = route_model(config, "combine_virtual_screening_info_into_summary")
     report_organization = config["configurable"].get("report_organization")
 
 
     
-    input = {
-        "input": combine_virtual_screening_info_into_report_prompt.format(report_organization=report_organization, 
-                                                                          report=state.running_summary, 
-                                                                          vs_info=state.vs_steps_info,
-                                                                          vs_queries = state.vs_queries,
-                                                                          vs_queries_results = state.vs_queries_results)
-
-    }
+    vs_queries_results = state.vs_queries_results
+    budget = make_token_budget(config, llm)
+    if budget is not None and vs_queries_results:
+        # keep the query results that fit next to the report,
+        # the earliest results are the most targeted
+        available = budget.available(combine_virtual_screening_info_into_report_prompt.format(
+            report_organization=report_organization,
+            report=state.running_summary,
+            vs_info=state.vs_steps_info,
+            vs_queries=state.vs_queries,
+            vs_queries_results=[]
+        ))
+        vs_queries_results = budget.fit_texts(vs_queries_results, available)
+
+    user_input = combine_virtual_screening_info_into_report_prompt.format(
+        report_organization=report_organization,
+        report=state.running_summary,
+        vs_info=state.vs_steps_info,
+        vs_queries = state.vs_queries,
+        vs_queries_results = vs_queries_results
+    )
+    if budget is not None:
+        budget.report("combine_virtual_screening_info_into_report_prompt", user_input)
     system_prompt = ""
-    system_prompt = update_system_prompt(system_prompt, llm)
+    system_prompt = update_system_prompt(system_prompt, llm, reasoning)
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system", system_prompt
-            ),
-            (
-                "human", "Add virtual screening steps and info into the existing report draft. {input}"
-            ),
-        ]
+    messages = chat_messages(
+        system_prompt,
+        "Add virtual screening steps and info into the existing report draft. {input}",
+        input=user_input
     )
-    chain = prompt | llm
 
     
-    result = ""
-    stop = False
-
-
     try: 
         writer({"add_virtual_screening_info_into_report": "\n Starting to combine virtual screening info into exising report draft \n"})
-        async with asyncio.timeout(ASYNC_TIMEOUT*3):
-            async for chunk in chain.astream(input, stream_usage=True):
-                result += chunk.content
-                if chunk.content == "</think>":
-                    stop = True
-                if not stop:
-                    writer({"add_virtual_screening_info_into_report": chunk.content})
+        think_filter = await stream_llm(
+            llm, messages, "combine_virtual_screening_info_into_report_prompt",
+            on_thinking=lambda text: writer({"add_virtual_screening_info_into_report": text}),
+            timeout=step_timeout(config, ASYNC_TIMEOUT*3, FINALIZE_STEPS),
+            thinking_first=expects_thinking(llm, reasoning)
+        )
     except asyncio.TimeoutError as e:
         writer({"add_virtual_screening_info_into_report": " \n \n ---------------- \n \n Timeout error from reasoning LLM. Consider running report combination again. \n \n "})
-        # update nothing and just return
-        return 
-
-    # Remove <think>...</think> sections
-    while "<think>" in result and "</think>" in result:
-        start = result.find("<think>")
-        end = result.find("</think>") + len("</think>")
-        result = result[:start] + result[end:]
-        state.running_summary = result
-    
-    # Handle case where opening <think> tag might be missing
-    while "</think>" in result:
-        end = result.find("</think>") + len("</think>")
-        result = result[end:]
-        state.running_summary = result
+        # keep the report, but do not cache it
+        return {"degraded": True}
+
+    if think_filter.answer:
+        state.running_summary = think_filter.answer
 
     # Return the final updated summary
     writer({"running_summary_with_virtual_screening_info": state.running_summary})
-    if state.vs_citations != None :
-        state.citations = "\n".join([state.citations, state.vs_citations])
+    vs_sources = []
+    if state.vs_sources != None :
+        # the virtual screening sources are stored after the research and reflection sources
+        vs_sources = number_sources(state.vs_sources, len(state.sources))
     else:
         writer({"running_summary_with_virtual_screening_info": " \n VIRTUAL SCREENING QUERIES CITATIONS ARE EMPTY \n "})
-    return {"running_summary": state.running_summary, "citations": state.citations}
+    return {"running_summary": state.running_summary, "sources": vs_sources}
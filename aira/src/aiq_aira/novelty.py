@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import xml.etree.ElementTree as ET
+
+from aiq_aira.compression import tokenize
+from aiq_aira.dedup import MinHashDeduplicator
+
+logger = logging.getLogger(__name__)
+
+
+def source_answers(sources_xml: str) -> str:
+    """
+    The answers of the <sources> XML written by deduplicate_and_format_sources, as one text.
+    """
+    try:
+        root = ET.fromstring(sources_xml)
+    except ET.ParseError:
+        return sources_xml
+    return "\n\n".join(answer.text for answer in root.iter("answer") if answer.text)
+
+
+class NoveltyTracker:
+    """
+    Tracks the content a report already covers, to score how much a new research result adds.
+    Novelty is the share of word shingles of the new text that appear in none of the known texts
+    (earlier research results and the report). Queries are compared by the overlap of their terms.
+    """
+
+    def __init__(self, shingle_size: int = 3):
+        self._shingler = MinHashDeduplicator(shingle_size=shingle_size)
+        self._known: set[str] = set()
+        self._queries: list[set[str]] = []
+
+    def add_text(self, text: str):
+        self._known |= self._shingler.shingles(text or "")
+
+    def add_sources(self, sources_xml: str):
+        self.add_text(source_answers(sources_xml))
+
+    def novelty(self, text: str) -> float:
+        shingles = self._shingler.shingles(text or "")
+        if not shingles:
+            return 0.0
+        return len(shingles - self._known) / len(shingles)
+
+    def sources_novelty(self, sources_xml: str) -> float:
+        return self.novelty(source_answers(sources_xml))
+
+    def add_query(self, query: str):
+        self._queries.append(set(tokenize(query)))
+
+    def duplicate_query(self, query: str, threshold: float) -> bool:
+        """
+        True if the Jaccard similarity of the query terms with an earlier query
+        is at least threshold.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return True
+        return any(
+            len(terms & known) / len(terms | known) >= threshold
+            for known in self._queries if known
+        )
@@ -64,6 +64,46 @@ summarizer_instructions="""Generate a high-quality report from the given sources
 """
 
 
+section_writer_instructions = """Write one section of a report from the given sources.
+
+# Report organization
+{report_organization}
+
+# Section to write
+{section}
+
+# Knowledge Sources
+{source}
+
+# Instructions
+1. Only write the "{section}" section, other sections are written separately.
+2. Start the section with a level two markdown heading (## {section}).
+3. Highlight the most relevant and significant information from the sources for this section.
+4. You should use proper markdown syntax when appropriate, as the text you generate will be
+rendered in markdown. Do NOT wrap the section in markdown blocks (e.g triple backticks).
+5. Do not include any source citations, as these will be added to the report in post processing.
+"""
+
+
+report_stitcher_instructions = """Write the title and abstract for a report whose sections have
+already been written.
+
+# Report organization
+{report_organization}
+
+# Report sections
+{sections}
+
+# Instructions
+1. Start with the report title as a level one markdown heading.
+2. Follow with a level two "Abstract" heading and a short abstract summarizing the key findings
+across all sections.
+3. Do NOT repeat or rewrite the report sections, they are added after the abstract in post
+processing.
+4. Do not include any source citations, as these will be added to the report in post processing.
+"""
+
+
 report_extender = """Add to the existing report additional sources preserving the current report structure (sections, headings etc).
 
 # Draft Report
@@ -80,6 +120,50 @@ report_extender = """Add to the existing report additional sources preserving th
 """
 
 
+report_patch_extender = """Add information from new knowledge sources to an existing report by
+returning patches to its sections.
+
+# Draft Report
+Each section of the draft report is wrapped in a <section> tag with a numeric id.
+{report}
+
+# New Knowledge Sources
+{source}
+
+# Instructions
+1. Only return patches for the sections the new sources add information to. Do not repeat
+unchanged sections.
+2. Prefer appending new paragraphs. Only replace a section if the new sources contradict or
+substantially change it.
+3. Add a new section only if the new information does not fit in any existing section.
+4. Keep the style of the report and use proper markdown syntax.
+Do not include any source citations, as these will be added to the report in post processing.
+5. If the new sources add nothing to the report, return an empty list.
+6. Format your response as a JSON list of patches, each with the following keys:
+- op: "append" to add paragraphs to the end of a section, "replace" to rewrite the body of a
+section, or "insert_after" to add a new section after the given one
+- section: the numeric id of the section the patch applies to
+- heading: the markdown heading of the new section (only for "insert_after")
+- content: the markdown text to append, the new body of the section, or the body of the new section
+
+**Output example**
+```json
+[
+    {{
+        "op": "append",
+        "section": 2,
+        "content": "Recent trials report a 10% improvement in lung function."
+    }},
+    {{
+        "op": "insert_after",
+        "section": 4,
+        "heading": "## Safety Profile",
+        "content": "The most common adverse events were headache and nausea."
+    }}
+]
+```"""
+
+
 reflection_instructions = """Using report organization as a guide identify knowledge gaps and/or areas that have not been addressed comprehensively in the report.
 
 # Report topic
@@ -109,6 +193,17 @@ reflection_instructions = """Using report organization as a guide identify knowl
 ```"""
 
 
+relevancy_grader = """Determine if the Context contains proper information to answer the Question.
+
+# Question
+{query}
+
+# Context
+{document}
+
+Answer with a single word, yes or no.
+Does the Context contain proper information to answer the Question?"""
+
 relevancy_checker = """Determine if the Context contains proper information to answer the Question.
 
 # Question
@@ -133,7 +228,8 @@ Given the report draft below, format a final report according to the report stru
 
 You are to format the report draft only, do not edit down / shorten the report draft. Do not omit content from the report draft. Keep the content of each section the same as before when formatting the final report. 
 
-Do not add a sources section, sources are added in post processing. 
+Do not add a sources section, sources are added in post processing.
+Keep source handles such as [S3] exactly where they are in the report draft.
 
 You should use proper markdown syntax when appropriate, as the text you generate will be rendered in markdown. Do NOT wrap the report in markdown blocks (e.g triple backticks).
 
@@ -28,6 +28,16 @@ from aiq.data_models.function import FunctionBaseConfig
 from aiq.builder.function_info import FunctionInfo
 from aiq.data_models.api_server import AIQChatResponseChunk
 from aiq_aira.functions import generate_summary, generate_queries, artifact_qa
+from aiq_aira.functions.generate_summary import acquire_routed_llms, summary_graph_config
+from aiq_aira.nodes import generate_query_plan, collect_research_results
+from aiq_aira.search_utils import process_single_query
+from aiq_aira.schema import GeneratedQuery, GenerateSummaryStateInput
+from aiq_aira.deadline import RESPONSE_MARGIN, remaining_time
+from aiq_aira.cancellation import run_metrics
+from aiq_aira.llm_gateway import llm_metrics
+from aiq_aira.relevancy import relevancy_stats
+from aiq_aira.scheduler import scheduler
+from aiq_aira.telemetry import configure_telemetry
 from aiq.builder.framework_enum import LLMFrameworkEnum
 from aiq.plugins.langchain import register
 
@@ -79,6 +89,39 @@ async def health_check(config: HealthCheckConfig, builder: Builder):
         description="Health check for the AIQ AIRA service"
     )
 
+################################################
+# Telemetry
+################################################
+class TelemetryConfig(FunctionBaseConfig, name="aira_telemetry"):
+    """
+    Spans for the graph nodes, the RAG, Tavily, NIM, PubChem and RCSB calls and the cache lookups,
+    exported by the OpenTelemetry tracer of the AIQ telemetry config (e.g. Phoenix).
+    Prometheus metrics served at http://<host>:<metrics_port>/metrics. Both are off by default.
+    """
+    tracing: bool = False
+    metrics: bool = False
+    metrics_port: int = 9464
+
+@register_function(config_type=TelemetryConfig)
+async def aira_telemetry(config: TelemetryConfig, builder: Builder):
+    """
+    Enables the pipeline telemetry and returns the in-process counters of the pipeline
+    """
+    configure_telemetry(config.tracing, config.metrics, config.metrics_port)
+
+    async def _pipeline_stats(request: None = None) -> dict:
+        return {
+            "llm": llm_metrics.as_dict(),
+            "runs": run_metrics.as_dict(),
+            "scheduler": scheduler.as_dict(),
+            "relevancy": relevancy_stats.as_dict(),
+        }
+
+    yield FunctionInfo.from_fn(
+        _pipeline_stats,
+        description="LLM, run, scheduler and relevancy counters of the AIQ AIRA service"
+    )
+
 ################################################
 # Additional Data Models
 ################################################
@@ -89,6 +132,7 @@ class AIResearcherInput(BaseModel):
     rag_collection: str
     num_queries: int
     llm_name: str
+    reflection_count: int = 2
 
 ################################################
 # End to end research workflow
@@ -110,13 +154,81 @@ async def ai_researcher(config: AIResearcherWorkflowConfig, builder: Builder):
     """
     Orchestrates:
       1) Generate queries
-      2) Generate summary
+      2) Research each query as soon as it is parsed from the query stream
+      3) Summarize, reflect and finalize the report
 
     So the user only has to call one endpoint to get from raw topic -> final report.
+    RAG lookups for the first queries overlap with the generation of the remaining queries.
     """
 
-    generate_queries = builder.get_function(name="generate_query")  
-    generate_summary = builder.get_function(name="generate_summary") 
+    generate_summary = builder.get_function(name="generate_summary")
+    # the research uses the settings of generate_summary, which then writes the report from it
+    summary_config = builder.get_function_config(name="generate_summary")
+    grader_llm, routed_llms = await acquire_routed_llms(summary_config, builder)
+
+    def writer(message):
+        """
+        The pipeline nodes expect a stream writer function.
+        Intermediate steps are not shown by this workflow, so they are only logged.
+        """
+        logger.debug(f"Writing message: {message}")
+
+    async def _run_pipeline(data: AIResearcherInput) -> AsyncGenerator[str, None]:
+        """
+        Runs the pipelined research,
+        yielding the queries once they are planned and finally the report.
+        """
+        llm = await builder.get_llm(llm_name=data.llm_name, wrapper_type=LLMFrameworkEnum.LANGCHAIN)
+        message = GenerateSummaryStateInput(
+            topic=data.topic,
+            report_organization=data.report_organization,
+            queries=[],
+            search_web=data.search_web,
+            rag_collection=data.rag_collection,
+            reflection_count=data.reflection_count,
+            llm_name=data.llm_name
+        )
+        research_config = {
+            "configurable": summary_graph_config(
+                summary_config, message, llm, None, grader_llm, routed_llms
+            )
+        }
+
+        planned_queries: list[GeneratedQuery] = []
+        research_tasks: list[asyncio.Task] = []
+
+        def _start_research(query: GeneratedQuery):
+            planned_queries.append(query)
+            research_tasks.append(asyncio.create_task(process_single_query(
+                query.query, research_config, writer, data.rag_collection, llm, data.search_web
+            )))
+
+        try:
+            # Stage 1: Generate queries, starting the research on each one as soon as it is parsed
+            await generate_query_plan(llm,
+                                      data.topic,
+                                      data.report_organization,
+                                      data.num_queries,
+                                      writer,
+                                      on_query=_start_research)
+            yield f"Queries: {json.dumps([query.model_dump() for query in planned_queries])}"
+
+            # Stage 2: Wait for the remaining research and generate the summary from it
+            results = await asyncio.gather(*research_tasks)
+        except BaseException:
+            for task in research_tasks:
+                task.cancel()
+            raise
+
+        research = collect_research_results(planned_queries, results)
+        # the report gets the time the research left of the request deadline
+        remaining = remaining_time(research_config)
+        summary_result = await generate_summary.ainvoke(message.model_copy(update={
+            "queries": planned_queries,
+            "request_timeout": None if remaining is None else max(remaining, RESPONSE_MARGIN),
+            **research
+        }))
+        yield summary_result.final_report
 
     async def _response_stream_fn(input_message: str) -> AsyncGenerator[AIQChatResponseChunk, None]:
         """
@@ -128,31 +240,9 @@ async def ai_researcher(config: AIResearcherWorkflowConfig, builder: Builder):
         user_input = json.loads(input_message)
         data = AIResearcherInput.model_validate(user_input)
 
-        # Stage 1: Generate queries
-        queries_result = await generate_queries.ainvoke({
-            "topic": data.topic,
-            "report_organization": data.report_organization,
-            "search_web": data.search_web,
-            "num_queries": data.num_queries,
-            "llm_name": data.llm_name
-        })
-        # Streams from generate_queries are not shown unless you stream them directly
-        # We'll yield a chunk with the queries
-        yield AIQChatResponseChunk.from_string(f"Queries: {json.dumps(queries_result.queries)}")
-
-        # Stage 2: Generate summary
-        summary_result = await generate_summary.ainvoke({
-            "topic": data.topic,
-            "report_organization": data.report_organization,
-            "queries": queries_result.queries,
-            "search_web": data.search_web,
-            "rag_collection": data.rag_collection,
-            "llm_name": data.llm_name
-        })
-
-        # yield final
-        final_report = summary_result.final_report
-        yield AIQChatResponseChunk.from_string(final_report)
+        # The first chunk holds the queries, the last one the final report
+        async for output in _run_pipeline(data):
+            yield AIQChatResponseChunk.from_string(output)
 
         logger.debug("Finished ai_researcher orchestrated pipeline (stream)")
 
@@ -166,25 +256,9 @@ async def ai_researcher(config: AIResearcherWorkflowConfig, builder: Builder):
         user_input = json.loads(input_message)
         data = AIResearcherInput.model_validate(user_input)
 
-        # Stage 1
-        queries_result = await generate_queries.ainvoke({
-            "topic": data.topic,
-            "report_organization": data.report_organization,
-            "search_web": data.search_web,
-            "num_queries": data.num_queries,
-            "llm_name": data.llm_name
-        })
-        # Stage 2
-        summary_result = await generate_summary.ainvoke({
-            "topic": data.topic,
-            "report_organization": data.report_organization,
-            "queries": queries_result.queries,
-            "search_web": data.search_web,
-            "rag_collection": data.rag_collection,
-            "llm_name": data.llm_name
-        })
-
-        final_report = summary_result.final_report
+        final_report = ""
+        async for output in _run_pipeline(data):
+            final_report = output
 
         logger.debug("Finished ai_researcher orchestrated pipeline (single)")
         return final_report
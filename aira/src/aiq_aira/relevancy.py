@@ -0,0 +1,168 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+
+from aiq_aira.compression import tokenize
+from aiq_aira.constants import ASYNC_TIMEOUT
+from aiq_aira.llm_gateway import invoke_llm
+
+logger = logging.getLogger(__name__)
+
+# answers returned by search_rag when the RAG server could not be reached
+ERROR_PREFIXES = ("Timeout fetching", "Error fetching")
+# canned replies of the RAG server when the collection has nothing on the query
+REFUSAL_PATTERN = re.compile(
+    r"\b(i (do not|don't|cannot|can't|could not|couldn't) (have|find|provide|answer)"
+    r"|(there is |there's )?no (relevant |specific )?(information|data|context|documents?) "
+    r"(is |was )?"
+    r"(available|found|provided|about|on|regarding|related)"
+    r"|(is|are) not (mentioned|provided|available|included|discussed) in the (provided |given )?"
+    r"(context|documents?|sources?|knowledge base)"
+    r"|i('m| am) (sorry|unable|not able))",
+    re.IGNORECASE
+)
+# refusals are only looked for at the start of an answer,
+# a long answer may still add relevant content
+REFUSAL_WINDOW_CHARS = 200
+REFUSAL_MAX_TERMS = 60
+# answers need at least this many terms to be settled as relevant by query term coverage
+MIN_COVERAGE_TERMS = 20
+# share of query terms an answer must contain when the LLM grade is not available
+FALLBACK_COVERAGE = 0.5
+
+LOG_EVERY = 100
+
+GRADE_CHOICES = ("yes", "no")
+# room for a leading whitespace or quote token before the verdict
+GRADE_MAX_TOKENS = 2
+GRADE_TOP_LOGPROBS = 5
+
+
+def query_coverage(query: str, answer: str) -> float:
+    """
+    Share of the distinct query terms (stopwords removed) that appear in the answer.
+    """
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(tokenize(answer))) / len(query_terms)
+
+
+def prefilter_relevancy(query: str,
+                        answer: str,
+                        coverage_threshold: float = 0.8) -> tuple[str | None, str]:
+    """
+    Settles the obvious relevancy cases without the LLM.
+    Returns the score ("yes", "no", or None if the LLM has to grade the answer) and the rule that
+    decided it.
+    """
+    text = (answer or "").strip()
+    if not text:
+        return "no", "empty"
+    if text.startswith(ERROR_PREFIXES):
+        return "no", "error"
+
+    answer_terms = tokenize(text)
+    if (len(answer_terms) <= REFUSAL_MAX_TERMS
+            and REFUSAL_PATTERN.search(text[:REFUSAL_WINDOW_CHARS])):
+        return "no", "refusal"
+    if (len(answer_terms) >= MIN_COVERAGE_TERMS
+            and query_coverage(query, text) >= coverage_threshold):
+        return "yes", "coverage"
+    return None, "llm"
+
+
+def _grade_token(token: str) -> str:
+    return token.strip().strip("\"'.").lower()
+
+
+def parse_grade(message) -> tuple[str, float | None]:
+    """
+    The yes/no verdict of a grading response and its confidence.
+    The confidence is the probability of the verdict among the yes/no candidates of the first
+    verdict token, or None if the server returned no log probabilities.
+    """
+    logprobs = (getattr(message, "response_metadata", None) or {}).get("logprobs") or {}
+    for position in logprobs.get("content") or []:
+        if _grade_token(position.get("token", "")) not in GRADE_CHOICES:
+            continue
+        probs = dict.fromkeys(GRADE_CHOICES, 0.0)
+        for candidate in position.get("top_logprobs") or [position]:
+            token = _grade_token(candidate["token"])
+            if token in probs:
+                probs[token] += math.exp(candidate["logprob"])
+        p_yes = probs["yes"] / sum(probs.values())
+        return ("yes", p_yes) if p_yes >= 0.5 else ("no", 1 - p_yes)
+
+    verdict = _grade_token(message.content)
+    for choice in GRADE_CHOICES:
+        if verdict.startswith(choice):
+            return choice, None
+    raise ValueError(f"Unexpected grade: {message.content!r}")
+
+
+async def grade_yes_no(llm,
+                       prompt: str,
+                       guided_choice: bool = False,
+                       timeout: float | None = ASYNC_TIMEOUT) -> tuple[str, float | None]:
+    """
+    Grades with at most GRADE_MAX_TOKENS output tokens and reads the verdict from the log
+    probabilities. Should be given a non-reasoning (instruct) model, a reasoning model would spend
+    the tokens thinking.
+    guided_choice additionally restricts the output to yes/no on NIM deployments that support
+    guided decoding.
+    """
+    params = {
+        "max_tokens": GRADE_MAX_TOKENS,
+        "temperature": 0,
+        "logprobs": True,
+        "top_logprobs": GRADE_TOP_LOGPROBS,
+    }
+    if guided_choice:
+        params["extra_body"] = {"nvext": {"guided_choice": list(GRADE_CHOICES)}}
+    response = await invoke_llm(llm, prompt, "relevancy_grader", timeout=timeout, **params)
+    return parse_grade(response)
+
+
+class RelevancyStats:
+    """
+    Counts which rule (or the LLM) decided each relevancy grade, to tune the pre-filter thresholds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def record(self, decided_by: str, score: str):
+        with self._lock:
+            self._counts[(decided_by, score)] += 1
+            total = sum(self._counts.values())
+        if total % LOG_EVERY == 0:
+            logger.info(f"Relevancy decisions after {total} grades: {self.as_dict()}")
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                f"{decided_by}:{score}": count
+                for (decided_by, score), count in sorted(self._counts.items())
+            }
+
+
+relevancy_stats = RelevancyStats()
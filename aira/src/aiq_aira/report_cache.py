@@ -0,0 +1,165 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import orjson
+
+from aiq_aira.stream_utils import _orjson_default
+
+logger = logging.getLogger(__name__)
+
+# attributes of the langchain chat model that change the generated report
+LLM_FINGERPRINT_FIELDS = ("model_name", "temperature", "top_p", "max_tokens", "openai_api_base")
+
+
+@dataclass
+class CachedReport:
+    """
+    A finished report and the intermediate steps that were streamed while it was written.
+    Each step is stored with its offset in seconds from the start of the run.
+    The collection version the report was written from is kept for eviction.
+    """
+    final_report: str
+    citations: str | None = None
+    intermediate_steps: list[tuple[float, str]] = field(default_factory=list)
+    collection: str = ""
+    collection_version: str = ""
+    created_at: float = field(default_factory=time.time)
+
+
+def llm_fingerprint(llm: Any) -> dict:
+    """
+    The model settings of an LLM client that are part of the cache key.
+    """
+    return {name: getattr(llm, name, None) for name in LLM_FINGERPRINT_FIELDS}
+
+
+def report_cache_key(*parts: Any) -> str:
+    """
+    Canonical hash of the request parts, independent of dict ordering.
+    """
+    canonical = orjson.dumps(parts, default=_orjson_default, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(canonical).hexdigest()
+
+
+class ReportCache:
+    """
+    Disk-backed cache of finished reports with a TTL, one JSON file per key.
+    Expired entries are removed when they are read.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _expired(self, entry: CachedReport) -> bool:
+        return self.ttl_seconds > 0 and time.time() - entry.created_at > self.ttl_seconds
+
+    def get(self, key: str) -> CachedReport | None:
+        path = self._path(key)
+        try:
+            data = orjson.loads(path.read_bytes())
+            entry = CachedReport(
+                final_report=data["final_report"],
+                citations=data.get("citations"),
+                intermediate_steps=[tuple(step) for step in data.get("intermediate_steps", [])],
+                collection=data.get("collection", ""),
+                collection_version=data.get("collection_version", ""),
+                created_at=data["created_at"],
+            )
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Dropping unreadable report cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if self._expired(entry):
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    def put(self, key: str, entry: CachedReport):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(orjson.dumps(entry.__dict__))
+        # atomic, concurrent readers never see a partial entry
+        os.replace(tmp_path, path)
+
+    def evict_expired(self) -> int:
+        """
+        Remove all expired entries. Returns the number of entries removed.
+        """
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            key = path.stem
+            if path.exists() and self.get(key) is None:
+                removed += 1
+        return removed
+
+    def evict_collection(self, collection: str, current_version: str) -> int:
+        """
+        Remove the entries written from an older version of a collection.
+        Returns the number of entries removed.
+        """
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            entry = self.get(path.stem)
+            if (entry is not None and entry.collection == collection
+                    and entry.collection_version != current_version):
+                path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached reports of collection {collection}")
+        return removed
+
+
+def make_report_cache(directory: str, ttl_hours: float) -> ReportCache | None:
+    """
+    Build the report cache from endpoint config. An empty directory disables caching.
+    """
+    if not directory:
+        return None
+    cache = ReportCache(directory, ttl_hours * 3600)
+    removed = cache.evict_expired()
+    if removed:
+        logger.info(f"Evicted {removed} expired reports from the report cache")
+    return cache
+
+
+async def replay_intermediate_steps(entry: CachedReport, speedup: float) -> AsyncIterator[str]:
+    """
+    Re-stream the stored intermediate steps, `speedup` times faster than they were produced.
+    A non-positive speedup sends all of them at once.
+    """
+    start = time.monotonic()
+    for offset, step in entry.intermediate_steps:
+        if speedup > 0:
+            delay = offset / speedup - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield step
@@ -1,83 +1,292 @@
 from langchain_openai import ChatOpenAI
 from langgraph.types import StreamWriter
-from langchain_core.prompts import ChatPromptTemplate
+
+from langchain_core.utils.json import parse_json_markdown
 
 from aiq_aira.prompts import (
     report_extender,
+    report_patch_extender,
+    report_stitcher_instructions,
+    section_writer_instructions,
     summarizer_instructions
 )
+from aiq_aira.schema import GeneratedQuery
 
 from aiq_aira.constants import ASYNC_TIMEOUT
 from aiq_aira.utils import update_system_prompt
+from aiq_aira.llm_gateway import chat_messages, stream_llm
+from aiq_aira.model_routing import expects_thinking
+from aiq_aira.stream_utils import ThinkTagFilter
+from aiq_aira.token_budget import TokenBudget, format_with_sources
+from aiq_aira.report_sections import (
+    apply_report_patches,
+    format_sections_for_prompt,
+    group_sources_by_section,
+    parse_report,
+    render_report,
+    sources_report
+)
 import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+
+class IncompleteReportError(Exception):
+    """
+    A report writing call did not write the report. `report` is the report to continue with, the
+    existing report, the part drafted before a timeout or a report of the sources, so the run can
+    finish but is marked degraded.
+    """
+
+    def __init__(self, report: str, message: str = "Report writing returned no report"):
+        super().__init__(message)
+        self.report = report
+
+
+class ReportTimeoutError(IncompleteReportError, asyncio.TimeoutError):
+    """
+    A report writing call ran out of time, see IncompleteReportError.
+    """
+
+    def __init__(self, report: str):
+        super().__init__(report, "Report writing timed out")
+
+
+def report_messages(llm: ChatOpenAI, user_input: str, reasoning: bool | None = None):
+    """
+    The chat messages of a report writing call,
+    switching reasoning on (or off) if the model supports it.
+    """
+    system_prompt = ""
+    system_prompt = update_system_prompt(system_prompt, llm, reasoning)
+    return chat_messages(system_prompt, input=user_input)
+
 async def summarize_report(
         existing_summary: str,
         new_source: str,
         report_organization: str,
         llm: ChatOpenAI,
-        writer: StreamWriter
+        writer: StreamWriter,
+        extension_mode: str = "rewrite",
+        budget: TokenBudget | None = None,
+        source_encoding: str = "xml",
+        reasoning: bool | None = None,
+        timeout: float | None = ASYNC_TIMEOUT
 ) -> str:
     """
     Takes the web research results and writes a report draft.
     If an existing summary is provided, the report is extended.
+    With extension_mode="patch" the LLM only returns patches for the affected sections,
+    which are applied locally instead of having the entire report rewritten.
+    With a token budget the sources are packed into the context window left by the prompt and
+    report.
+    With source_encoding="compact" the sources are written with handles the report cites,
+    see format_with_sources.
+    If the report is not written within `timeout` seconds ReportTimeoutError is raised with the
+    existing summary, or for a first draft the part that was written before the timeout.
+    An empty first draft raises IncompleteReportError with a report of the sources instead, an
+    empty extension with the existing summary.
     """
+    start = time.monotonic()
+    if existing_summary and extension_mode == "patch":
+        patched = await extend_report_with_patches(
+            existing_summary, new_source, llm, writer, budget, source_encoding, reasoning, timeout
+        )
+        if patched is not None:
+            return patched
+        logger.info("Falling back to rewriting the entire report")
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - start), 0.0)
+
     # Decide which prompt to use
     if existing_summary:
         # We have an existing summary; use the 'report_extender' prompt
-        user_input = report_extender.format(report=existing_summary, source=new_source)
+        user_input = format_with_sources(
+            budget, "report_extender", report_extender, new_source, source_encoding,
+            report=existing_summary
+        )
     else:
         # No existing summary; use the 'summarizer_instructions' prompt
-        user_input = summarizer_instructions.format(
-            report_organization=report_organization,
-            source=new_source
+        user_input = format_with_sources(
+            budget, "summarizer_instructions", summarizer_instructions, new_source, source_encoding,
+            report_organization=report_organization
         )
-    system_prompt = ""
-    system_prompt = update_system_prompt(system_prompt, llm)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system", system_prompt
-            ),
-            (
-                "human", "{input}"
-            ),
-        ]
-    )
-    chain = prompt | llm
-
-    # Stream the result
-    result = ""
-    stop = False
-    input_payload = {"input": user_input}
+    # Stream the result, only the reasoning tokens are shown while the report is drafted
+    think_filter = ThinkTagFilter(thinking_first=expects_thinking(llm, reasoning))
     try: 
         writer({"summarize_sources": "\n Starting summary \n"})
-        async with asyncio.timeout(ASYNC_TIMEOUT):
-            async for chunk in chain.astream(input_payload, stream_usage=True):
-                result += chunk.content
-                if chunk.content == "</think>":
-                    stop = True
-                if not stop:
-                    writer({"summarize_sources": chunk.content})
+        await stream_llm(llm,
+                         report_messages(llm, user_input, reasoning),
+                         "report_extender" if existing_summary else "summarizer_instructions",
+                         on_thinking=lambda text: writer({"summarize_sources": text}),
+                         think_filter=think_filter,
+                         timeout=timeout)
     except asyncio.TimeoutError as e:
-        writer({"summarize_sources": " \n \n ---------------- \n \n Timeout error from reasoning LLM. Consider running report generation again. \n \n "})
-
-        return user_input
+        writer({
+            "summarize_sources": " \n \n ---------------- \n \n Timeout error from reasoning LLM. "
+                                 "Keeping the report written so far. \n \n "
+        })
+        # a partial rewrite would drop content of the existing report, a draft still in its
+        # thinking has no text yet
+        draft = think_filter.answer if think_filter.answer.strip() else sources_report(new_source)
+        raise ReportTimeoutError(existing_summary or draft) from e
 
-    # Remove <think>...</think> sections
-    while "<think>" in result and "</think>" in result:
-        start = result.find("<think>")
-        end = result.find("</think>") + len("</think>")
-        result = result[:start] + result[end:]
-    
-    # Handle case where opening <think> tag might be missing
-    while "</think>" in result:
-        end = result.find("</think>") + len("</think>")
-        result = result[end:]
+    if not think_filter.answer.strip():
+        # e.g. a reasoning model that used up its output tokens thinking
+        writer({
+            "summarize_sources": " \n \n ---------------- \n \n The reasoning LLM returned no "
+                                 "report. Keeping the report written so far. \n \n "
+        })
+        raise IncompleteReportError(existing_summary or sources_report(new_source))
 
     # Return the final updated summary
-    return result
\ No newline at end of file
+    return think_filter.answer
+
+
+
+async def extend_report_with_patches(
+        existing_summary: str,
+        new_source: str,
+        llm: ChatOpenAI,
+        writer: StreamWriter,
+        budget: TokenBudget | None = None,
+        source_encoding: str = "xml",
+        reasoning: bool | None = None,
+        timeout: float | None = ASYNC_TIMEOUT
+) -> str | None:
+    """
+    Extends the report by asking the LLM for section patches only
+    (see report_sections.apply_report_patches).
+    Returns None if the patches could not be parsed, raises ReportTimeoutError with the unchanged
+    report on timeout.
+    """
+    sections = parse_report(existing_summary)
+    user_input = format_with_sources(
+        budget, "report_patch_extender", report_patch_extender, new_source, source_encoding,
+        report=format_sections_for_prompt(sections)
+    )
+
+    try:
+        writer({"summarize_sources": "\n Starting report extension \n"})
+        think_filter = await stream_llm(
+            llm, report_messages(llm, user_input, reasoning), "report_patch_extender",
+            on_thinking=lambda text: writer({"summarize_sources": text}),
+            timeout=timeout,
+            thinking_first=expects_thinking(llm, reasoning)
+        )
+        patches = parse_json_markdown(think_filter.answer)
+    except asyncio.TimeoutError as e:
+        writer({
+            "summarize_sources": " \n \n ---------------- \n \n Timeout error from reasoning LLM "
+                                 "while extending the report. Keeping the current report. \n \n "
+        })
+        raise ReportTimeoutError(existing_summary) from e
+    except Exception as e:
+        logger.warning(f"Error parsing report patches: {e}")
+        return None
+
+    if not isinstance(patches, list):
+        patches = [patches]
+
+    writer({"summarize_sources": f"\n Applying {len(patches)} report patches \n"})
+    return render_report(apply_report_patches(sections, patches))
+
+
+
+async def summarize_by_section(
+        sources: str,
+        queries: list[GeneratedQuery],
+        report_organization: str,
+        llm: ChatOpenAI,
+        writer: StreamWriter,
+        budget: TokenBudget | None = None,
+        source_encoding: str = "xml",
+        reasoning: bool | None = None,
+        timeout: float | None = ASYNC_TIMEOUT
+) -> str | None:
+    """
+    Map-reduce variant of the first report draft.
+    Sources are grouped by the report_section of their query and each section is drafted
+    concurrently from its own sources only. Sections are streamed as they finish.
+    A short reduce pass then writes the title and abstract, and the report is assembled locally in
+    query plan order.
+    Returns None if there are fewer than two sections or no section could be drafted.
+    Raises ReportTimeoutError with the sections that were drafted if a section or the abstract
+    timed out.
+    """
+    start = time.monotonic()
+    grouped_sources = group_sources_by_section(sources, queries)
+    if len(grouped_sources) < 2:
+        return None
+
+    async def _draft_section(section: str, section_sources: str):
+        user_input = format_with_sources(budget,
+                                         f"section_writer_instructions ({section})",
+                                         section_writer_instructions,
+                                         section_sources,
+                                         source_encoding,
+                                         report_organization=report_organization,
+                                         section=section)
+        try:
+            think_filter = await stream_llm(
+                llm, report_messages(llm, user_input, reasoning), "section_writer_instructions",
+                timeout=timeout, thinking_first=expects_thinking(llm, reasoning)
+            )
+        except asyncio.TimeoutError as e:
+            writer({
+                "summarize_sources": " \n \n ---------------- \n \n Timeout error from reasoning "
+                                     f"LLM drafting section {section}. \n \n "
+            })
+            timed_out.append(section)
+            return section, None
+
+        draft = think_filter.answer.strip()
+        if not draft.startswith("#"):
+            draft = f"## {section}\n\n{draft}"
+        return section, draft
+
+    writer({
+        "summarize_sources": f"\n Drafting {len(grouped_sources)} report sections in parallel \n"
+    })
+    drafts = {}
+    timed_out = []
+    for next_draft in asyncio.as_completed([
+            _draft_section(section, section_sources)
+            for section, section_sources in grouped_sources.items()
+    ]):
+        section, draft = await next_draft
+        if draft:
+            drafts[section] = draft
+            writer({"summarize_sources": f"\n{draft}\n"})
+
+    if not drafts:
+        return None
+
+    body = "\n\n".join(drafts[section] for section in grouped_sources if section in drafts)
+    if timeout is not None:
+        timeout = max(timeout - (time.monotonic() - start), 0.0)
+    user_input = report_stitcher_instructions.format(report_organization=report_organization,
+                                                     sections=body)
+    try:
+        writer({"summarize_sources": "\n Writing title and abstract \n"})
+        think_filter = await stream_llm(
+            llm, report_messages(llm, user_input, reasoning), "report_stitcher_instructions",
+            on_thinking=lambda text: writer({"summarize_sources": text}),
+            timeout=timeout,
+            thinking_first=expects_thinking(llm, reasoning)
+        )
+        header = think_filter.answer.strip()
+    except asyncio.TimeoutError as e:
+        writer({
+            "summarize_sources": " \n \n ---------------- \n \n Timeout error from reasoning LLM "
+                                 "writing the abstract. \n \n "
+        })
+        header = ""
+        timed_out.append("abstract")
+
+    report = f"{header}\n\n{body}" if header else body
+    if timed_out:
+        raise ReportTimeoutError(report)
+    return report
@@ -0,0 +1,176 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+\S")
+
+
+@dataclass
+class ReportSection:
+    """
+    A Markdown report section:
+    the heading line (empty for the text before the first heading) and its body.
+    """
+    heading: str
+    body: str
+
+    @property
+    def level(self) -> int:
+        match = HEADING_PATTERN.match(self.heading)
+        return len(match.group(1)) if match else 0
+
+    def render(self) -> str:
+        if not self.heading:
+            return self.body
+        return f"{self.heading}\n{self.body}" if self.body else self.heading
+
+
+def parse_report(report: str) -> list[ReportSection]:
+    """
+    Split a Markdown report into sections on ATX headings, ignoring headings inside code fences.
+    The first section holds the text before the first heading and may be empty.
+    """
+    sections = [ReportSection(heading="", body="")]
+    body_lines: list[str] = []
+    in_fence = False
+
+    for line in report.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        if not in_fence and HEADING_PATTERN.match(line):
+            sections[-1].body = "\n".join(body_lines).strip("\n")
+            sections.append(ReportSection(heading=line.rstrip(), body=""))
+            body_lines = []
+        else:
+            body_lines.append(line)
+
+    sections[-1].body = "\n".join(body_lines).strip("\n")
+    return sections
+
+
+def render_report(sections: list[ReportSection]) -> str:
+    """
+    Join the sections back into a Markdown report.
+    """
+    return "\n\n".join(section.render() for section in sections if section.heading or section.body)
+
+
+def sources_report(sources_xml: str) -> str:
+    """
+    A plain report of the research answers in the <sources> XML, one section per query,
+    for when the LLM did not write a draft.
+    """
+    try:
+        sources = ET.fromstring(sources_xml).findall("source")
+    except ET.ParseError as e:
+        logger.warning(f"Could not parse the sources of the fallback report: {e}")
+        return ""
+    return render_report([
+        ReportSection(heading=f"## {(source.findtext('query') or '').strip()}", body=answer)
+        for source in sources if (answer := (source.findtext("answer") or "").strip())
+    ])
+
+
+def format_sections_for_prompt(sections: list[ReportSection]) -> str:
+    """
+    Render the report with a numeric id per section, so the LLM can address its patches.
+    """
+    parts = []
+    for idx, section in enumerate(sections):
+        if not section.heading and not section.body:
+            continue
+        parts.append(f"<section id=\"{idx}\">\n{section.render()}\n</section>")
+    return "\n".join(parts)
+
+
+def apply_report_patches(sections: list[ReportSection], patches: list[dict]) -> list[ReportSection]:
+    """
+    Apply LLM patches to the report sections and return the new section list.
+
+    Supported patches, addressed by the section ids used in `format_sections_for_prompt`:
+      - {"op": "append", "section": id, "content": "..."}: add paragraphs to the end of a section
+      - {"op": "replace", "section": id, "content": "..."}: replace the body of a section
+      - {"op": "insert_after", "section": id, "heading": "## ...", "content": "..."}:
+        add a new section
+    Patches with an unknown op or section id are skipped.
+    """
+    bodies = [section.body for section in sections]
+    inserts: dict[int, list[ReportSection]] = {}
+
+    for patch in patches:
+        if not isinstance(patch, dict):
+            continue
+        op = patch.get("op")
+        content = str(patch.get("content") or "").strip("\n")
+        try:
+            idx = int(patch.get("section"))
+        except (TypeError, ValueError):
+            idx = -1
+        if not 0 <= idx < len(sections):
+            logger.info(f"Skipping report patch for unknown section: {patch}")
+            continue
+
+        if op == "append" and content:
+            bodies[idx] = f"{bodies[idx]}\n\n{content}" if bodies[idx] else content
+        elif op == "replace":
+            bodies[idx] = content
+        elif op == "insert_after" and patch.get("heading"):
+            heading = str(patch["heading"]).strip()
+            if not HEADING_PATTERN.match(heading):
+                heading = f"{'#' * max(sections[idx].level, 2)} {heading}"
+            inserts.setdefault(idx, []).append(ReportSection(heading=heading, body=content))
+        else:
+            logger.info(f"Skipping unsupported report patch: {patch}")
+
+    patched = []
+    for idx, section in enumerate(sections):
+        patched.append(ReportSection(heading=section.heading, body=bodies[idx]))
+        patched.extend(inserts.get(idx, []))
+    return patched
+
+
+def group_sources_by_section(sources_xml: str, queries: list) -> dict[str, str]:
+    """
+    Split the <sources> XML written by deduplicate_and_format_sources into one <sources> document
+    per report section, using the `report_section` of the query each source answers.
+    Sections keep the order in which they first appear in the query plan.
+    """
+    section_of_query = {}
+    section_names = {}
+    for query in queries:
+        key = query.report_section.strip().lower()
+        section_names.setdefault(key, query.report_section.strip())
+        section_of_query.setdefault(query.query, key)
+
+    groups: dict[str, ET.Element] = {key: ET.Element("sources") for key in section_names}
+    for source in ET.fromstring(sources_xml).findall("source"):
+        key = section_of_query.get(source.findtext("query"))
+        if key is None:
+            # sources that do not match a planned query are kept in a section of their own
+            key = "additional findings"
+            section_names.setdefault(key, "Additional Findings")
+            groups.setdefault(key, ET.Element("sources"))
+        groups[key].append(source)
+
+    return {
+        section_names[key]: ET.tostring(root, encoding="unicode")
+        for key, root in groups.items() if len(root)
+    }
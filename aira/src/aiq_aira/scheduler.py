@@ -0,0 +1,220 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Literal, NamedTuple
+
+from aiq_aira.telemetry import observe_queue_wait, set_in_flight
+
+logger = logging.getLogger(__name__)
+
+# interactive chat (artifact Q&A), full reports and batch reports
+# share the LLM NIMs and the RAG server
+Priority = Literal["interactive", "report", "batch"]
+
+# share of the LLM and RAG capacity a tenant gets in each priority class while others are waiting,
+# an interactive call is served before the calls a report tenant queued earlier
+PRIORITY_WEIGHTS: dict[str, float] = {"interactive": 8.0, "report": 2.0, "batch": 1.0}
+
+DEFAULT_TENANT = "default"
+
+
+class Lane(NamedTuple):
+    """
+    The flow a request is scheduled in: its priority class and tenant (or session).
+    """
+    priority: Priority = "report"
+    tenant: str = DEFAULT_TENANT
+
+
+_lane: contextvars.ContextVar[Lane | None] = contextvars.ContextVar("aira_lane", default=None)
+
+
+def current_lane() -> Lane:
+    return _lane.get() or Lane()
+
+
+def lane_context(lane: Lane) -> contextvars.Context:
+    """
+    A copy of the current context in which the calls are scheduled in `lane`.
+    Run the request in a task with this context,
+    e.g. asyncio.create_task(coro, context=lane_context(lane)),
+    the tasks of the graph nodes inherit it.
+    """
+    context = contextvars.copy_context()
+    context.run(_lane.set, lane)
+    return context
+
+
+async def run_in_lane(lane: Lane, coro):
+    """
+    Runs `coro` with its LLM and RAG calls scheduled in `lane`.
+    """
+    return await asyncio.create_task(coro, context=lane_context(lane))
+
+
+@dataclass(order=True)
+class _Ticket:
+    finish: float
+    seq: int
+    start: float = field(compare=False)
+    lane: Lane = field(compare=False)
+    granted: asyncio.Future = field(compare=False)
+    queued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class FairQueue:
+    """
+    Admits at most `capacity` holders at a time (0: unlimited)
+    with weighted fair queuing of the waiters:
+    every (priority, tenant) flow gets a share of the capacity proportional to the weight of its
+    priority, so a tenant with many queued calls does not hold up the others.
+    """
+
+    def __init__(self, capacity: int = 0, name: str = "queue"):
+        self.capacity = capacity
+        self.name = name
+        self.active = 0
+        self._waiting: list[_Ticket] = []
+        self._vtime = 0.0
+        self._finish: dict[Lane, float] = {}
+        self._seq = itertools.count()
+        self._watchers: list[asyncio.Future] = []
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def enqueue(self, lane: Lane) -> _Ticket:
+        start = max(self._vtime, self._finish.get(lane, 0.0))
+        finish = start + 1.0 / PRIORITY_WEIGHTS.get(lane.priority, 1.0)
+        self._finish[lane] = finish
+        ticket = _Ticket(
+            finish, next(self._seq), start, lane, asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._waiting, ticket)
+        self._dispatch()
+        return ticket
+
+    def leave(self, ticket: _Ticket):
+        """
+        Releases the capacity of a granted ticket, or withdraws a waiting one.
+        """
+        if ticket.granted.done() and not ticket.granted.cancelled():
+            self.active -= 1
+            set_in_flight(self.name, self.active)
+            self._dispatch()
+            return
+        ticket.granted.cancel()
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+        self._notify()
+
+    def position(self, ticket: _Ticket) -> int:
+        """
+        1-based position of a waiting ticket, 0 once it is granted.
+        """
+        if ticket.granted.done():
+            return 0
+        return 1 + sum(1 for other in self._waiting if other < ticket)
+
+    async def wait(self, ticket: _Ticket) -> AsyncIterator[int]:
+        """
+        Yields the position of the ticket whenever it changes, until the ticket is granted.
+        """
+        last = None
+        while not ticket.granted.done():
+            position = self.position(ticket)
+            if position != last:
+                last = position
+                yield position
+            moved = asyncio.get_running_loop().create_future()
+            self._watchers.append(moved)
+            await asyncio.wait([ticket.granted, moved], return_when=asyncio.FIRST_COMPLETED)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, lane: Lane):
+        ticket = self.enqueue(lane)
+        try:
+            await ticket.granted
+            yield
+        finally:
+            self.leave(ticket)
+
+    def _dispatch(self):
+        granted = False
+        while self._waiting and (not self.capacity or self.active < self.capacity):
+            ticket = heapq.heappop(self._waiting)
+            if ticket.granted.done():
+                continue
+            self.active += 1
+            self._vtime = max(self._vtime, ticket.start)
+            ticket.granted.set_result(None)
+            observe_queue_wait(self.name, ticket.lane.priority, time.monotonic() - ticket.queued_at)
+            granted = True
+        if granted:
+            set_in_flight(self.name, self.active)
+            self._notify()
+            if len(self._finish) > 1024:
+                self._finish = {
+                    lane: finish for lane, finish in self._finish.items() if finish > self._vtime
+                }
+
+    def _notify(self):
+        watchers, self._watchers = self._watchers, []
+        for moved in watchers:
+            if not moved.done():
+                moved.set_result(None)
+
+
+class Scheduler:
+    """
+    In-process scheduler in front of the LLM and RAG calls.
+    `calls` bounds the concurrent LLM and RAG calls,
+    `reports` the concurrent full reports (the admission queue).
+    """
+
+    def __init__(self, max_concurrent_calls: int = 0, max_concurrent_reports: int = 0):
+        self.calls = FairQueue(max_concurrent_calls, "calls")
+        self.reports = FairQueue(max_concurrent_reports, "reports")
+
+    def configure(self, max_concurrent_calls: int, max_concurrent_reports: int):
+        self.calls.capacity = max_concurrent_calls
+        self.reports.capacity = max_concurrent_reports
+
+    def call_slot(self):
+        """
+        Context manager holding a slot for one LLM or RAG call of the current lane.
+        """
+        return self.calls.slot(current_lane())
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "active_calls": self.calls.active,
+            "queued_calls": self.calls.waiting,
+            "active_reports": self.reports.active,
+            "queued_reports": self.reports.waiting,
+        }
+
+
+scheduler = Scheduler()
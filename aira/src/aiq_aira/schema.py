@@ -20,15 +20,35 @@ from enum import Enum
 from pydantic import BaseModel, Field
 from typing_extensions import Annotated, TypedDict
 from langchain_openai import ChatOpenAI
-from typing import Dict
+from typing import Dict, Literal
 from dataclasses import dataclass
 
+from aiq_aira.usage import merge_usage
+
 class GeneratedQuery(BaseModel):
     query: str = Field(..., description="The actual text of the search query")
     report_section: str = Field(..., description="Section of the report this query addresses")
     rationale: str = Field(..., description="Why this query is relevant")
 
 
+class SourceRecord(BaseModel):
+    """
+    One cited research result: the answer to a query and the documents or web pages it came from.
+    """
+    id: int = Field(
+        0, description="Position of the source in the source store of the run, 0 until stored"
+    )
+    kind: Literal["rag", "web"] = Field(
+        ..., description="Whether the answer came from the RAG collection or a web search"
+    )
+    query: str = Field(..., description="The query that was researched")
+    answer: str = Field(..., description="The answer returned for the query")
+    documents: list[str] = Field(
+        default_factory=list, description="Names of the cited collection documents"
+    )
+    urls: list[str] = Field(default_factory=list, description="URLs of the cited web pages")
+
+
 ##
 # For Stage 1: GenerateQueries
 ##
@@ -41,6 +61,10 @@ class GenerateQueryStateInput(BaseModel):
 class GenerateQueryStateOutput(BaseModel):
     queries: list[Dict] | None = None
     intermediate_step: str | None = None
+    usage: Dict | None = Field(
+        None,
+        description="Token, call and wall time accounting of the request, in total and per step"
+    )
 
 
 ##
@@ -55,12 +79,61 @@ class GenerateSummaryStateInput(BaseModel):
     rag_collection: str = Field(..., description="Collection to search for information from")
     reflection_count: int = Field(2, description="Number of reflection loops to run")
     llm_name: str = Field(..., description="LLM model to use")
+    thread_id: str | None = Field(
+        None, description="Id of the checkpointed run, required to resume a run"
+    )
+    resume: Literal["no", "last_checkpoint", "finalize_summary"] = Field(
+        "no",
+        description="Resume the run from its last completed step, "
+                    "or re-run only the final report step"
+    )
+    force_refresh: bool = Field(
+        False, description="Ignore a cached report and run the full pipeline"
+    )
+    compress_sources: bool | None = Field(
+        None,
+        description="Compress research answers to their most relevant sentences, "
+                    "defaults to the endpoint config"
+    )
+    request_timeout: float | None = Field(
+        None,
+        description="Seconds the report may take, a partial report is returned before then. "
+                    "Defaults to the endpoint config"
+    )
+    priority: Literal["report", "batch"] | None = Field(
+        None, description="Scheduling class of the report, defaults to the endpoint config"
+    )
+    tenant: str | None = Field(
+        None,
+        description="Tenant or session the report is scheduled for, LLM and RAG capacity is shared "
+                    "fairly across tenants. Defaults to the thread_id"
+    )
+    web_research_results: list[str] | None = Field(
+        None,
+        description="Research results of the queries done beforehand, "
+                    "the research step is skipped if set"
+    )
+    sources: list[SourceRecord] | None = Field(
+        None, description="Cited sources of the research done beforehand"
+    )
     # You can add other metadata flags here, e.g. search_web, max_web_research_loops, etc.
 
 class GenerateSummaryStateOutput(BaseModel):
     citations: str | None = Field(None, description="The final list of citations formatted as a string")
     final_report: str | None = Field(None, description="The final summarized report after the entire pipeline (web_research, summarize, reflection, finalize)")
     intermediate_step: str | None = None
+    thread_id: str | None = Field(
+        None, description="Id of the checkpointed run, pass it back to resume the run"
+    )
+    partial: bool | None = Field(
+        None,
+        description="True if steps of the report were skipped or cut short by the deadline "
+                    "or a timeout"
+    )
+    usage: Dict | None = Field(
+        None,
+        description="Token, call and wall time accounting of the request, in total and per step"
+    )
 
 ##
 # For ArtifactQA
@@ -80,6 +153,11 @@ class ArtifactQAInput(BaseModel):
     rewrite_mode: ArtifactRewriteMode | None = Field(None, description="Rewrite mode for the LLM")
     additional_context: str | None = Field(None, description="Additional context to provide to the LLM")
     rag_collection: str = Field(..., description="Collection to search for information from")
+    tenant: str | None = Field(
+        None,
+        description="Tenant or session of the chat, "
+                    "LLM and RAG capacity is shared fairly across tenants"
+    )
 
 class ArtifactQAOutput(BaseModel):
     """Output data for artifact-based Q&A."""
@@ -93,6 +171,8 @@ class ArtifactQAOutput(BaseModel):
 class AIRAState:
     queries: list[Dict] | None = None    
     web_research_results: list[str] | None = None
+    # append-only store of the cited sources, nodes return only the records they add
+    sources: Annotated[list[SourceRecord], operator.add] = field(default_factory=list)
     citations: str | None = None
     running_summary: str | None = field(default=None) 
     final_report: str | None = field(default=None)
@@ -101,8 +181,12 @@ class AIRAState:
     recent_sml_molecule: str | None = None
     vs_queries: list[Dict] | None = None 
     vs_queries_results: list[str] | None = None
-    vs_citations: str | None = None
+    vs_sources: list[SourceRecord] | None = None
     vs_steps_info: str | None = None
+    # set by steps cut short by the deadline or an LLM timeout, such partial reports are not cached
+    degraded: bool = False
+    # per node counters of the LLM, RAG, web search and NIM calls, see usage.py
+    usage: Annotated[Dict[str, Dict[str, float]], merge_usage] = field(default_factory=dict)
 
 
 ##
@@ -117,3 +201,24 @@ class ConfigSchema(TypedDict):
     num_reflections: int
     search_web: bool
     topic: str
+    incremental_research: bool
+    summary_first_k: int
+    research_deadline: float
+    report_extension: str
+    summary_mode: str
+    context_window: int
+    token_counter: str
+    compress_sources: bool
+    compressed_source_tokens: int
+    dedupe_sources: bool
+    source_encoding: str
+    reflection_novelty_threshold: float
+    reflection_query_similarity: float
+    relevancy_prefilter: bool
+    relevancy_coverage_threshold: float
+    relevancy_grading: str
+    relevancy_guided_choice: bool
+    grader_llm: ChatOpenAI
+    model_routes: dict
+    deadline: float
+    deadline_reserve: float
@@ -5,12 +5,23 @@ import xml.etree.ElementTree as ET
 from typing import List
 from langchain_openai import ChatOpenAI
 from langchain_core.runnables import RunnableConfig
-from aiq_aira.constants import ASYNC_TIMEOUT
 from langgraph.types import StreamWriter
 import logging
 from langchain_core.utils.json import parse_json_markdown
-from aiq_aira.schema import GeneratedQuery
-from aiq_aira.prompts import relevancy_checker
+from aiq_aira.schema import GeneratedQuery, SourceRecord
+from aiq_aira.sources import format_source_block
+from aiq_aira.constants import ASYNC_TIMEOUT
+from aiq_aira.deadline import RESEARCH_STEPS, step_timeout
+from aiq_aira.llm_gateway import invoke_llm
+from aiq_aira.model_routing import ModelRoute, route_model, with_reasoning
+from aiq_aira.prompts import relevancy_checker, relevancy_grader
+from aiq_aira.relevancy import (
+    FALLBACK_COVERAGE,
+    grade_yes_no,
+    prefilter_relevancy,
+    query_coverage,
+    relevancy_stats
+)
 from aiq_aira.tools import search_rag, search_tavily
 from aiq_aira.utils import dummy, _escape_markdown
 import html
@@ -18,29 +29,75 @@ import html
 logger = logging.getLogger(__name__)
 
 
-async def check_relevancy(llm: ChatOpenAI, query: str, answer: str, writer: StreamWriter):
+async def check_relevancy(
+        llm: ChatOpenAI,
+        query: str,
+        answer: str,
+        writer: StreamWriter,
+        prefilter: bool = True,
+        coverage_threshold: float = 0.8,
+        grading: str = "json",
+        grader_llm: ChatOpenAI | None = None,
+        guided_choice: bool = False,
+        reasoning: bool | None = None,
+        timeout: float | None = ASYNC_TIMEOUT
+):
     """
     Checks if an answer is relevant to the query using the 'relevancy_checker' prompt, returning JSON
     like { "score": "yes" } or { "score": "no" }.
+    With the pre-filter, errors, empty answers, refusals and answers covering most query terms are
+    graded by rules (see relevancy.prefilter_relevancy) and only the remaining answers are sent to
+    the LLM. The rule or "llm" that decided the grade is returned as "decided_by".
+    With grading="constrained" the LLM answers with a single yes/no token of `grader_llm`
+    (an instruct model, the report LLM if not set) and the probability of the verdict is returned as
+    "confidence".
+    reasoning switches the thinking of the LLM on or off (see model_routing),
+    None sends the bare prompt.
     """
     logger.info("CHECK RELEVANCY")    
     writer({"relevancy_checker": "\n Starting relevancy check \n"})
     processed_answer_for_display = html.escape(_escape_markdown(answer))
 
+    if prefilter:
+        score, decided_by = prefilter_relevancy(query, answer, coverage_threshold)
+        if score is not None:
+            relevancy_stats.record(decided_by, score)
+            writer({"relevancy_checker": f""" =
+    ---
+    Relevancy score: {score} (rule: {decided_by})
+    Query: {query}
+    Answer: {processed_answer_for_display}
+    """})
+            return {"score": score, "decided_by": decided_by}
+
     try:
-        async with asyncio.timeout(ASYNC_TIMEOUT):
-            response = await llm.ainvoke(
-                relevancy_checker.format(document=answer, query=query)
+        if grading == "constrained":
+            verdict, confidence = await grade_yes_no(
+                grader_llm or llm,
+                relevancy_grader.format(document=answer, query=query),
+                guided_choice,
+                timeout
+            )
+            score = {"score": verdict, "confidence": confidence}
+        else:
+            response = await invoke_llm(
+                llm,
+                with_reasoning(
+                    relevancy_checker.format(document=answer, query=query),
+                    ModelRoute(llm, reasoning)
+                ),
+                "relevancy_checker",
+                timeout=timeout
             )
             score = parse_json_markdown(response.content)
-            writer({"relevancy_checker": f""" =
+        writer({"relevancy_checker": f""" =
     ---
     Relevancy score: {score.get("score")}  
     Query: {query}
     Answer: {processed_answer_for_display}
     """})
-
-            return score
+        relevancy_stats.record("llm", score.get("score"))
+        return {**score, "decided_by": "llm"}
     
     except asyncio.TimeoutError as e:
              writer({"relevancy_checker": f""" 
@@ -56,28 +113,32 @@ Error checking relevancy. Query: {query} \n \n Answer: {processed_answer_for_dis
 """})
         logger.debug(f"Error parsing relevancy JSON: {e}")
 
-    # default if fails
-    return {"score": "yes"}
+    # if the LLM could not grade the answer, fall back to the query term coverage,
+    # so answers without the information still trigger the web search
+    score = "yes" if query_coverage(query, answer) >= FALLBACK_COVERAGE else "no"
+    relevancy_stats.record("llm_failure", score)
+    return {"score": score, "decided_by": "llm_failure"}
 
 
 async def fetch_query_results(
     rag_url: str,
     prompt: str,
     writer: StreamWriter,
-    collection: str
+    collection: str,
+    timeout: float | None = ASYNC_TIMEOUT
 ):
     """
     Calls the search_rag tool in parallel for each prompt in parallel.
-    Returns a list of tuples (answer, citations).
+    Returns a tuple (answer, documents).
     """
     async with aiohttp.ClientSession() as session:
-        result =  await search_rag(session, rag_url, prompt, writer, collection)
+        result =  await search_rag(session, rag_url, prompt, writer, collection, timeout)
         return result
 
 
 
 def deduplicate_and_format_sources(
-    sources: List[str],
+    sources: List[List[SourceRecord]],
     generated_answers: List[str],
     relevant_list: List[dict],
     web_results: List[str],
@@ -85,8 +146,11 @@ def deduplicate_and_format_sources(
 ):
     """
     Convert RAG and fallback results into an XML structure <sources><source>...</source></sources>.
-    Each <source> has <query> and <answer>.
+    Each <source> has <query> and <answer>,
+    and a type attribute ("rag" or "web") used to prioritize sources.
     If 'relevant_list' says "score": "no", we fallback to 'web_results' if present.
+    'sources' holds the cited source records of each query, the ids of stored records are kept
+    in a refs attribute so the source can be cited by handle (see source_encoding).
     """
     logger.info("DEDUPLICATE RESULTS")
     root = ET.Element("sources")
@@ -102,8 +166,14 @@ def deduplicate_and_format_sources(
         # If the RAG doc was relevant, use gen_ans; else fallback to 'fallback_ans'
         if relevant_info["score"] == "yes" or fallback_ans is None:
             answer_elem.text = gen_ans
+            source_elem.set("type", "rag")
         else:
             answer_elem.text = fallback_ans
+            source_elem.set("type", "web")
+
+        refs = [str(record.id) for record in src if record.id]
+        if refs:
+            source_elem.set("refs", " ".join(refs))
 
     return ET.tostring(root, encoding="unicode")
 
@@ -125,24 +195,43 @@ async def process_single_query(
       - Optionally performs a web search.
       - Writes the web answer and citation.
     Returns a tuple of:
-      (rag_answer, rag_citation, relevancy, web_answer, web_citation)
+      (rag_answer, rag_source, relevancy, web_answer, web_sources)
+    where rag_source is the SourceRecord of the RAG answer (None if the search failed)
+    and web_sources holds one SourceRecord per relevant web result.
     """
 
     rag_url = config["configurable"].get("rag_url")
     # Process RAG search
-    rag_answer, rag_citation = await fetch_query_results(rag_url, query, writer, collection)
-    
-    writer({"rag_answer": rag_citation}) # citation includes the answer
+    rag_answer, rag_documents = await fetch_query_results(
+        rag_url, query, writer, collection, step_timeout(config, ASYNC_TIMEOUT, RESEARCH_STEPS)
+    )
+    rag_source = None
+    if rag_documents is not None:
+        rag_source = SourceRecord(
+            kind="rag", query=query, answer=rag_answer, documents=rag_documents
+        )
+        writer({"rag_answer": format_source_block(rag_source)}) # citation includes the answer
 
-    # Check relevancy for this query's answer.
-    relevancy = await check_relevancy(llm, query, rag_answer, writer)
+    # Check relevancy for this query's answer,
+    # on the model routed to relevancy grading if one is configured
+    route = route_model(config, "relevancy", llm)
+    relevancy = await check_relevancy(
+        route.llm, query, rag_answer, writer,
+        prefilter=config["configurable"].get("relevancy_prefilter", True),
+        coverage_threshold=config["configurable"].get("relevancy_coverage_threshold") or 0.8,
+        grading=config["configurable"].get("relevancy_grading", "json"),
+        grader_llm=config["configurable"].get("grader_llm"),
+        guided_choice=config["configurable"].get("relevancy_guided_choice", False),
+        reasoning=route.reasoning,
+        timeout=step_timeout(config, ASYNC_TIMEOUT, RESEARCH_STEPS)
+    )
 
     # Optionally run a web search if the query is not relevant.
-    web_answer, web_citation = None, None
+    web_answer, web_sources = None, []
     if search_web:
         
         if relevancy["score"] == "no":
-            result = await search_tavily(query, writer)
+            result = await search_tavily(query, writer, step_timeout(config, None, RESEARCH_STEPS))
         else:
             result = await dummy()
         if result is not None:
@@ -152,38 +241,29 @@ async def process_single_query(
                 for res in result
             ]
 
-            web_citations = [
-                f"""
----
-QUERY: 
-{query}
-
-ANSWER: 
-{res['content']}
-
-CITATION:
-{res['url'].strip()}
-
-"""
-                if 'score' in res and float(res['score']) > 0.6 else "" 
-                for res in result
+            web_sources = [
+                SourceRecord(
+                    kind="web", query=query, answer=res['content'], urls=[res['url'].strip()]
+                )
+                for res in result if 'score' in res and float(res['score']) > 0.6
             ]
 
             web_answer = "\n".join(web_answers)
-            web_citation = "\n".join(web_citations)
 
             # guard against the case where no relevant answers are found
             if bool(re.fullmatch(r"\n*", web_answer)):
                 web_answer = "No relevant result found in web search"
-                web_citation = ""
+                web_sources = []
 
         else:
             web_answer = "Web not searched since RAG provided relevant answer for query"
-            web_citation = ""
 
         # citation includes the answer
-        web_result_to_stream = web_citation if web_citation != "" else f"--- \n {web_answer} \n "
+        web_result_to_stream = (
+            "\n".join(format_source_block(source) for source in web_sources)
+            or f"--- \n {web_answer} \n "
+        )
         
         writer({"web_answer": web_result_to_stream})
 
-    return rag_answer, rag_citation, relevancy, web_answer, web_citation
\ No newline at end of file
+    return rag_answer, rag_source, relevancy, web_answer, web_sources
\ No newline at end of file
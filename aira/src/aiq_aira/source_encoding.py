@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+# the citation instruction of the report writing prompts, replaced when the sources carry handles
+NO_CITATIONS_INSTRUCTION = (
+    "Do not include any source citations, as these will be added to the report in post processing."
+)
+HANDLE_CITATIONS_INSTRUCTION = (
+    "Cite the knowledge sources you use by their handle in square brackets "
+    "right after the statement, e.g. [S3]. "
+    "Do not include any other source citations, "
+    "the handles are replaced with the full references in post processing."
+)
+COMPACT_SOURCES_HEADER = "Each source starts with its handle and query, followed by its answer."
+
+# [S3], [S3, S5] or [S3; S5]
+SOURCE_HANDLE = re.compile(r"\[\s*(S\d+(?:\s*[,;]\s*S\d+)*)\s*\]")
+HANDLE_ID = re.compile(r"S(\d+)")
+HORIZONTAL_SPACE = re.compile(r"[ \t]+")
+BLANK_LINES = re.compile(r"\s*\n\s*")
+
+
+def source_refs(source: ET.Element) -> list[int]:
+    """
+    Ids of the stored source records a <source> element was written from,
+    see deduplicate_and_format_sources.
+    """
+    return [int(ref) for ref in source.get("refs", "").split()]
+
+
+def condense(text: str) -> str:
+    """
+    Collapse runs of spaces and blank lines, single line breaks are kept for lists and tables.
+    """
+    return BLANK_LINES.sub("\n", HORIZONTAL_SPACE.sub(" ", text)).strip()
+
+
+def encode_source(source: ET.Element) -> str:
+    handle = ", ".join(f"S{ref}" for ref in source_refs(source))
+    prefix = f"[{handle}] " if handle else ""
+    query = condense(source.findtext("query") or "")
+    answer = condense(source.findtext("answer") or "")
+    return f"{prefix}Q: {query}\n{answer}"
+
+
+def encode_sources(sources_xml: str) -> str:
+    """
+    Compact prompt encoding of the <sources> XML:
+    one block per source with its handle, query and condensed answer.
+    """
+    try:
+        root = ET.fromstring(sources_xml)
+    except ET.ParseError:
+        return sources_xml
+    blocks = [encode_source(source) for source in root.findall("source")]
+    return "\n\n".join([COMPACT_SOURCES_HEADER, *blocks]) if blocks else ""
+
+
+def use_source_handles(template: str) -> str:
+    """
+    Ask for handle citations instead of no citations in a report writing prompt.
+    """
+    return template.replace(NO_CITATIONS_INSTRUCTION, HANDLE_CITATIONS_INSTRUCTION)
+
+
+def resolve_source_handles(report: str, numbers: dict[int, int]) -> str:
+    """
+    Replace the source handles cited in the report with the numbers of the sources list,
+    e.g. [S3, S7] -> [2, 5].
+    `numbers` maps source record ids to their number in the list.
+    Handles of unknown sources are removed.
+    """
+    unknown = set()
+
+    def _resolve(match: re.Match) -> str:
+        ids = [int(i) for i in HANDLE_ID.findall(match.group(1))]
+        unknown.update(i for i in ids if i not in numbers)
+        resolved = sorted({numbers[i] for i in ids if i in numbers})
+        return f"[{', '.join(str(n) for n in resolved)}]" if resolved else ""
+
+    resolved_report = SOURCE_HANDLE.sub(_resolve, report)
+    if unknown:
+        logger.info(f"Removed citations of unknown sources {sorted(unknown)}")
+    return resolved_report
@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from aiq_aira.schema import SourceRecord
+
+
+def cited_sources(rag_source: SourceRecord | None,
+                  relevancy: dict,
+                  web_sources: list[SourceRecord] | None) -> list[SourceRecord]:
+    """
+    The sources of one query result that are cited in the report:
+    the RAG answer if it was relevant, otherwise the web results.
+    """
+    if relevancy["score"] == "yes":
+        return [rag_source] if rag_source is not None else []
+    return list(web_sources or [])
+
+
+def store_sources(cited_per_query: list[list[SourceRecord]],
+                  stored: int) -> tuple[list[SourceRecord], list[list[SourceRecord]]]:
+    """
+    Number the cited sources of each query for a store already holding `stored` records.
+    Exact repeats of a source are stored once and cited by the id of the first one.
+    Returns the new records of the store and the numbered sources of each query.
+    """
+    ids = {}
+    new_records = []
+    numbered = []
+    for cited in cited_per_query:
+        query_records = []
+        for record in cited:
+            key = (record.kind,
+                   record.query,
+                   record.answer,
+                   tuple(record.documents),
+                   tuple(record.urls))
+            if key not in ids:
+                ids[key] = stored + len(new_records) + 1
+                new_records.append(record.model_copy(update={"id": ids[key]}))
+            query_records.append(new_records[ids[key] - stored - 1])
+        numbered.append(query_records)
+    return new_records, numbered
+
+
+def number_sources(records: list[SourceRecord], stored: int) -> list[SourceRecord]:
+    """
+    Assign the ids of new records that are appended to a store already holding `stored` records.
+    """
+    return [
+        record.model_copy(update={"id": stored + idx})
+        for idx, record in enumerate(records, start=1)
+    ]
+
+
+def _citation_text(record: SourceRecord) -> str:
+    lines = [", ".join(record.documents)] if record.documents else []
+    return "\n".join(lines + record.urls)
+
+
+def format_source_block(record: SourceRecord) -> str:
+    """
+    Plain text of a source as it is streamed while the research runs.
+    """
+    return f"""
+---
+QUERY:
+{record.query}
+
+ANSWER:
+{record.answer}
+
+CITATION:
+{_citation_text(record)}
+
+"""
+
+
+def render_sources(records: list[SourceRecord]) -> str:
+    """
+    Render the sources list appended to the final report as markdown.
+    """
+    blocks = []
+    for number, record in enumerate(records, start=1):
+        blocks.append(f"""
+---
+**Source** {number}
+
+**Query:** {record.query.strip()}
+
+**Answer:**
+{record.answer.strip()}
+
+CITATION:
+{_citation_text(record)}
+""")
+    return "\n".join(blocks)
@@ -0,0 +1,421 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import logging
+import time
+import typing
+from typing import Any, AsyncIterator, Callable
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class ThinkTagFilter:
+    """
+    Incremental filter that splits streamed LLM output into thinking and answer text.
+
+    Chunks are consumed with `feed`, which returns the (thinking, answer) text that
+    became known with that chunk. Tags split across chunks are held back until they
+    can be resolved, so `<think>` / `</think>` are never emitted as text.
+
+    The final `answer` matches the historic post-processing of the nodes:
+      - `<think>...</think>` blocks are removed
+      - a `</think>` without an opening tag discards everything before it
+      - an unterminated `<think>` block is treated as thinking
+
+    With `thinking_first` the output is expected to start with thinking, for reasoning models whose
+    chat template already opens the `<think>` block:
+    text before the first `</think>` streams as thinking.
+    An output without any think tag is the answer, it is returned as answer by `flush`.
+    """
+
+    def __init__(self, thinking_first: bool = False):
+        self._thinking_parts: list[str] = []
+        self._answer_parts: list[str] = []
+        self._pending = ""
+        self._in_think = thinking_first
+        # a leading <think> is still accepted (and dropped) until the thinking_first block is closed
+        self._leading_think = thinking_first
+        self._tag_seen = False
+
+    @property
+    def thinking(self) -> str:
+        return "".join(self._thinking_parts)
+
+    @property
+    def answer(self) -> str:
+        return "".join(self._answer_parts)
+
+    def feed(self, text: str) -> tuple[str, str]:
+        """
+        Consume one chunk of LLM output. Returns the (thinking, answer) deltas.
+        """
+        if not text:
+            return "", ""
+
+        data = self._pending + text
+        self._pending = ""
+        thinking, answer = [], []
+        start = 0
+        search = 0
+
+        while True:
+            idx = data.find("<", search)
+            if idx == -1:
+                break
+
+            if self._in_think and not self._leading_think:
+                tags = (THINK_CLOSE,)
+            else:
+                tags = (THINK_OPEN, THINK_CLOSE)
+            tag = next((t for t in tags if data.startswith(t, idx)), None)
+
+            if tag is None:
+                tail = data[idx:]
+                if any(t.startswith(tail) for t in tags):
+                    # possible tag split across chunks, resolve on the next feed
+                    self._pending = tail
+                    data = data[:idx]
+                    break
+                search = idx + 1
+                continue
+
+            self._emit(data[start:idx], thinking, answer)
+            self._tag_seen = True
+            if tag == THINK_OPEN:
+                self._in_think = True
+            else:
+                self._leading_think = False
+                if not self._in_think:
+                    # closing tag without an opening tag: everything so far was thinking
+                    self._thinking_parts.extend(self._answer_parts)
+                    self._answer_parts.clear()
+                self._in_think = False
+            start = search = idx + len(tag)
+
+        self._emit(data[start:], thinking, answer)
+        return "".join(thinking), "".join(answer)
+
+    def flush(self) -> tuple[str, str]:
+        """
+        Release any text held back as a possible partial tag at the end of the stream.
+        """
+        thinking, answer = [], []
+        self._emit(self._pending, thinking, answer)
+        self._pending = ""
+        if self._leading_think and not self._tag_seen:
+            # the model did not think (e.g. thinking switched off), everything was the answer
+            self._answer_parts, self._thinking_parts = self._thinking_parts, []
+            return "", self.answer
+        return "".join(thinking), "".join(answer)
+
+    def _emit(self, text: str, thinking: list[str], answer: list[str]):
+        if not text:
+            return
+        if self._in_think:
+            self._thinking_parts.append(text)
+            thinking.append(text)
+        else:
+            self._answer_parts.append(text)
+            answer.append(text)
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON array of objects, e.g. the query plan.
+    Each top-level object is returned by `feed` as soon as its closing brace arrives,
+    so work on it can start while the rest of the array is still being generated.
+    Any text before the opening bracket (such as a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf: list[str] = []
+
+    def feed(self, text: str) -> list[dict]:
+        """
+        Consume more of the stream. Returns the objects completed by this chunk.
+        """
+        objects = []
+        for ch in text:
+            if self._finished:
+                break
+            if not self._started:
+                self._started = ch == "["
+                continue
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                elif ch == "]":
+                    self._finished = True
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    obj_str = "".join(self._buf)
+                    self._buf = []
+                    try:
+                        objects.append(json.loads(obj_str))
+                    except ValueError as e:
+                        logger.warning(f"Skipping malformed object in JSON array stream: {e}")
+        return objects
+
+
+def remove_think_tags(text: str) -> str:
+    """
+    Remove any text in a string that is wrapped in <think> tags.
+    """
+    think_filter = ThinkTagFilter()
+    think_filter.feed(text)
+    think_filter.flush()
+    return think_filter.answer
+
+
+async def filter_think_stream(
+    stream: AsyncIterator[Any],
+    on_thinking: Callable[[str], None] | None = None,
+    on_answer: Callable[[str], None] | None = None,
+    think_filter: ThinkTagFilter | None = None,
+) -> ThinkTagFilter:
+    """
+    Consume an LLM chunk stream through a ThinkTagFilter, routing thinking and answer
+    deltas to the given callbacks (usually a StreamWriter for the calling node).
+    Pass in a `think_filter` to keep the partial output if the stream is cancelled.
+    """
+    think_filter = think_filter if think_filter is not None else ThinkTagFilter()
+
+    def _route(thinking: str, answer: str):
+        if thinking and on_thinking is not None:
+            on_thinking(thinking)
+        if answer and on_answer is not None:
+            on_answer(answer)
+
+    async for chunk in stream:
+        content = chunk.content if hasattr(chunk, "content") else chunk
+        _route(*think_filter.feed(content))
+
+    _route(*think_filter.flush())
+    return think_filter
+
+
+class StreamCoalescer:
+    """
+    Coalesces the per-token custom events written by the nodes into larger frames.
+
+    String values are buffered per key and emitted as a single `{key: text}` frame once
+    `max_frame_chars` is reached or `flush_interval` seconds have passed since the oldest
+    buffered text. Ordering is preserved per key. Non-string values are never merged,
+    they flush the pending text of their key and are passed through as-is.
+    """
+
+    def __init__(self,
+                 flush_interval: float = 0.05,
+                 max_frame_chars: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.flush_interval = flush_interval
+        self.max_frame_chars = max_frame_chars
+        self._clock = clock
+        self._buffers: dict[str, list[str]] = {}
+        self._sizes: dict[str, int] = {}
+        self._oldest: float | None = None
+
+    def add(self, event: dict) -> list[dict]:
+        """
+        Buffer one custom event. Returns the frames that are ready to be sent.
+        """
+        frames = []
+        for key, value in event.items():
+            if not isinstance(value, str):
+                frames.extend(self._flush_key(key))
+                frames.append({key: value})
+                continue
+
+            self._buffers.setdefault(key, []).append(value)
+            self._sizes[key] = self._sizes.get(key, 0) + len(value)
+            if self._oldest is None:
+                self._oldest = self._clock()
+            if self._sizes[key] >= self.max_frame_chars:
+                frames.extend(self._flush_key(key))
+
+        if self.time_until_due() == 0:
+            frames.extend(self.flush())
+        return frames
+
+    def time_until_due(self) -> float | None:
+        """
+        Seconds until the buffered text must be flushed, or None if nothing is buffered.
+        """
+        if self._oldest is None:
+            return None
+        return max(0.0, self._oldest + self.flush_interval - self._clock())
+
+    def flush(self) -> list[dict]:
+        """
+        Emit all buffered text, one frame per key in first-seen order.
+        """
+        frames = []
+        for key in list(self._buffers):
+            frames.extend(self._flush_key(key))
+        return frames
+
+    def _flush_key(self, key: str) -> list[dict]:
+        parts = self._buffers.pop(key, None)
+        self._sizes.pop(key, None)
+        if not self._buffers:
+            self._oldest = None
+        if not parts:
+            return []
+        return [{key: "".join(parts)}]
+
+
+def make_stream_coalescer(flush_interval_ms: int, max_frame_chars: int) -> StreamCoalescer | None:
+    """
+    Build a per-request coalescer from endpoint config. A non-positive interval disables coalescing.
+    """
+    if flush_interval_ms <= 0:
+        return None
+    return StreamCoalescer(flush_interval=flush_interval_ms / 1000, max_frame_chars=max_frame_chars)
+
+
+async def coalesce_stream(
+    stream: AsyncIterator[tuple[str, Any]],
+    coalescer: StreamCoalescer | None
+) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Wrap a multi-mode LangGraph `astream` so that `custom` events are coalesced into frames.
+    Any other event (e.g. `values`) marks a node boundary and flushes the pending frames first.
+    Frames are also flushed on the interval while the graph is idle, e.g. during a slow RAG call.
+    """
+    if coalescer is None:
+        async for item in stream:
+            yield item
+        return
+
+    iterator = stream.__aiter__()
+    next_item = None
+    try:
+        while True:
+            if next_item is None:
+                next_item = asyncio.ensure_future(iterator.__anext__())
+
+            done, _ = await asyncio.wait({next_item}, timeout=coalescer.time_until_due())
+            if not done:
+                for frame in coalescer.flush():
+                    yield "custom", frame
+                continue
+
+            item, next_item = next_item, None
+            try:
+                mode, value = item.result()
+            except StopAsyncIteration:
+                break
+
+            if mode == "custom" and isinstance(value, dict):
+                for frame in coalescer.add(value):
+                    yield "custom", frame
+            else:
+                for frame in coalescer.flush():
+                    yield "custom", frame
+                yield mode, value
+
+        for frame in coalescer.flush():
+            yield "custom", frame
+    finally:
+        if next_item is not None:
+            next_item.cancel()
+
+
+def _orjson_default(obj: Any):
+    if hasattr(obj, "model_dump"):  # Pydantic v2
+        return obj.model_dump()
+    if hasattr(obj, "dict"):  # Pydantic v1
+        return obj.dict()
+    return str(obj)
+
+
+def dumps_event(obj: Any) -> str:
+    """
+    Serialize a stream event or state snapshot (including nested pydantic models) to JSON.
+    """
+    return orjson.dumps(obj, default=_orjson_default).decode("utf-8")
+
+
+def state_reducers(state_schema: type) -> dict[str, Callable[[Any, Any], Any]]:
+    """
+    The reducers of the graph state fields, e.g. {"sources": operator.add} for
+    `sources: Annotated[list[SourceRecord], operator.add]`.
+    """
+    hints = typing.get_type_hints(state_schema, include_extras=True)
+    return {
+        key: hint.__metadata__[-1]
+        for key, hint in hints.items()
+        if typing.get_origin(hint) is typing.Annotated and callable(hint.__metadata__[-1])
+    }
+
+
+def merge_state_updates(state: dict,
+                        updates: dict,
+                        reducers: dict[str, Callable[[Any, Any], Any]] | None = None) -> dict:
+    """
+    Apply a LangGraph `updates` event ({node: {field: value}}) to a local copy of the state.
+    Returns only the fields whose value changed since the last event.
+    Fields with a reducer (see state_reducers) are reduced into the local state like the graph does,
+    their delta is what the nodes added, e.g. the new sources to append rather than the whole list.
+    """
+    reducers = reducers or {}
+    delta = {}
+    for node_update in updates.values():
+        if not isinstance(node_update, dict):
+            # nodes that return None, or interrupts
+            continue
+        for key, value in node_update.items():
+            if key in reducers:
+                if not value:
+                    continue
+                if state.get(key) is not None:
+                    state[key] = reducers[key](state.get(key), value)
+                else:
+                    state[key] = value
+                delta[key] = reducers[key](delta[key], value) if key in delta else value
+                continue
+            if key in state and state[key] == value:
+                continue
+            state[key] = value
+            delta[key] = value
+    return delta
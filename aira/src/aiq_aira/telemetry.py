@@ -0,0 +1,216 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+# attribute values are cut to this many characters, queries can be long
+MAX_ATTRIBUTE_CHARS = 256
+# seconds, from a cache lookup to a full report
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+# set by configure_telemetry, both None (disabled) by default
+_tracer = None
+_metrics = None
+# metrics can only be registered once per registry and a port served once per process,
+# the workflow may be built (and telemetry configured) more than once
+_registry_metrics: dict = {}
+_served_ports: set[int] = set()
+
+
+class _Metrics:
+    """
+    The Prometheus metrics of the pipeline.
+    """
+
+    def __init__(self, registry):
+        self.stage_latency = prometheus_client.Histogram(
+            "aira_stage_latency_seconds", "Latency of the graph nodes", ["stage"],
+            buckets=LATENCY_BUCKETS, registry=registry)
+        self.call_latency = prometheus_client.Histogram(
+            "aira_call_latency_seconds",
+            "Latency of the LLM, RAG, web search, NIM, PubChem and RCSB calls and cache lookups",
+            ["endpoint"], buckets=LATENCY_BUCKETS, registry=registry)
+        self.ttft = prometheus_client.Histogram(
+            "aira_llm_ttft_seconds", "Time to the first token of streamed LLM calls", ["stage"],
+            buckets=TTFT_BUCKETS, registry=registry)
+        self.queue_wait = prometheus_client.Histogram(
+            "aira_queue_wait_seconds", "Time waited for a slot of the scheduler",
+            ["queue", "priority"], buckets=LATENCY_BUCKETS, registry=registry)
+        self.in_flight = prometheus_client.Gauge(
+            "aira_in_flight", "Calls and reports holding a slot of the scheduler", ["queue"],
+            registry=registry)
+        self.errors = prometheus_client.Counter(
+            "aira_errors_total", "Failed and timed out calls", ["endpoint", "kind"],
+            registry=registry)
+        self.runs = prometheus_client.Counter(
+            "aira_runs_total", "Report runs by outcome", ["outcome"], registry=registry)
+
+
+def configure_telemetry(tracing: bool = False,
+                        metrics: bool = False,
+                        metrics_port: int = 0,
+                        registry=None):
+    """
+    Enables the spans (exported by the OpenTelemetry tracer provider of the process, e.g. the
+    Phoenix exporter of the AIQ telemetry config) and the Prometheus metrics.
+    With metrics_port the metrics are served at http://<host>:<metrics_port>/metrics.
+    Missing packages only disable their part, with a warning.
+    Calling it again reuses the metrics of the registry and the server of the port.
+    """
+    global _tracer, _metrics
+    if tracing and trace is None:
+        logger.warning("opentelemetry is not installed, spans are disabled")
+    _tracer = trace.get_tracer("aiq_aira") if tracing and trace is not None else None
+
+    if metrics and prometheus_client is None:
+        logger.warning("prometheus_client is not installed, metrics are disabled")
+    if not metrics or prometheus_client is None:
+        _metrics = None
+        return
+    registry = registry or prometheus_client.REGISTRY
+    if registry not in _registry_metrics:
+        _registry_metrics[registry] = _Metrics(registry)
+    _metrics = _registry_metrics[registry]
+    if metrics_port and metrics_port not in _served_ports:
+        prometheus_client.start_http_server(metrics_port, registry=registry)
+        _served_ports.add(metrics_port)
+
+
+class _NoopSpan:
+    """
+    Stands in for the span when tracing is disabled.
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _AttributeSpan:
+    """
+    Sets span attributes the way the pipeline passes them: None is skipped, strings are cut.
+    """
+
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key, value):
+        if self._span is None or value is None:
+            return
+        if isinstance(value, str):
+            value = value[:MAX_ATTRIBUTE_CHARS]
+        self._span.set_attribute(f"aira.{key}", value)
+
+
+def call_span(endpoint: str, name: str | None = None, **attributes):
+    """
+    Context manager around one call to `endpoint` (llm, rag, tavily, nim, pubchem, rcsb,
+    report_cache): a span with the given attributes (query, collection, payload sizes) and the
+    latency and error metrics.
+    Set further attributes with `set_attribute` on the returned object.
+    A shared no-op when disabled.
+    """
+    if _tracer is None and _metrics is None:
+        return _NOOP_SPAN
+    return _instrumented(endpoint, name or endpoint, attributes, "call")
+
+
+def stage_span(stage: str):
+    """
+    Context manager around one run of a graph node, a no-op when telemetry is disabled.
+    """
+    if _tracer is None and _metrics is None:
+        return _NOOP_SPAN
+    return _instrumented(stage, stage, {}, "stage")
+
+
+@contextlib.contextmanager
+def _instrumented(endpoint: str, name: str, attributes: dict, kind: str):
+    start = time.monotonic()
+    span_context = (_tracer.start_as_current_span(f"aira.{name}")
+                    if _tracer is not None else contextlib.nullcontext())
+    with span_context as span:
+        attribute_span = _AttributeSpan(span)
+        for key, value in attributes.items():
+            attribute_span.set_attribute(key, value)
+        try:
+            yield attribute_span
+        except asyncio.TimeoutError:
+            _record_error(endpoint, "timeout", kind)
+            raise
+        except Exception:
+            _record_error(endpoint, "error", kind)
+            raise
+        finally:
+            if _metrics is not None:
+                histogram = _metrics.stage_latency if kind == "stage" else _metrics.call_latency
+                histogram.labels(endpoint).observe(time.monotonic() - start)
+
+
+def _record_error(endpoint: str, error: str, kind: str):
+    if _metrics is not None and kind == "call":
+        _metrics.errors.labels(endpoint, error).inc()
+
+
+def observe_llm_call(stage: str, outcome: str, latency: float, ttft: float | None):
+    """
+    Records an LLM call of the gateway, which measures the call itself.
+    """
+    if _metrics is None:
+        return
+    _metrics.call_latency.labels("llm").observe(latency)
+    if ttft is not None:
+        _metrics.ttft.labels(stage).observe(ttft)
+    if outcome in ("timeout", "error"):
+        _metrics.errors.labels("llm", outcome).inc()
+
+
+def observe_queue_wait(queue: str, priority: str, seconds: float):
+    if _metrics is not None:
+        _metrics.queue_wait.labels(queue, priority).observe(seconds)
+
+
+def set_in_flight(queue: str, active: int):
+    if _metrics is not None:
+        _metrics.in_flight.labels(queue).set(active)
+
+
+def observe_run(outcome: str):
+    if _metrics is not None:
+        _metrics.runs.labels(outcome).inc()
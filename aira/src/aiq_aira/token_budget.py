@@ -0,0 +1,301 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import math
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from functools import lru_cache
+
+from langchain_core.runnables import RunnableConfig
+
+from aiq_aira.source_encoding import (
+    COMPACT_SOURCES_HEADER,
+    encode_source,
+    encode_sources,
+    use_source_handles,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# output space reserved when the LLM client does not set max_tokens
+DEFAULT_OUTPUT_TOKENS = 4096
+# chat template and system prompt tokens that are not part of the formatted prompt
+PROMPT_OVERHEAD_TOKENS = 64
+# a source is only truncated if at least this many tokens are left for it, otherwise it is dropped
+MIN_TRUNCATED_TOKENS = 64
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [...]"
+
+# lower number = packed first
+SOURCE_PRIORITY = {"rag": 0, "web": 1}
+
+
+@lru_cache(maxsize=None)
+def _tiktoken_encoding(model_name: str | None):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name or "")
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # the encoding files are downloaded on first use, which fails on air-gapped deployments
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts instead: {e}")
+        return None
+
+
+class TokenCounter:
+    """
+    Counts tokens for a model. Uses tiktoken when `use_tokenizer` is set and the encoding is
+    available, otherwise a fast estimate of CHARS_PER_TOKEN characters per token.
+    """
+
+    def __init__(self, model_name: str | None = None, use_tokenizer: bool = False):
+        self.model_name = model_name
+        self._encoding = _tiktoken_encoding(model_name) if use_tokenizer else None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut the text to at most max_tokens tokens.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+@dataclass
+class BudgetUsage:
+    """
+    Token usage of one LLM call relative to the context window of the model.
+    """
+    call: str
+    prompt_tokens: int
+    output_tokens: int
+    context_window: int
+    sources_kept: int = 0
+    sources_truncated: int = 0
+    sources_dropped: int = 0
+
+    @property
+    def utilization(self) -> float:
+        return (self.prompt_tokens + self.output_tokens) / self.context_window
+
+
+class TokenBudget:
+    """
+    Budgets the prompt of an LLM call against the context window of the model.
+    The output tokens of the call are reserved first, the prompt template and report take what they
+    need, and the knowledge sources are packed into the remaining space by priority (relevant RAG
+    answers first, then web results).
+    """
+
+    def __init__(self,
+                 context_window: int,
+                 output_tokens: int = DEFAULT_OUTPUT_TOKENS,
+                 counter: TokenCounter | None = None):
+        self.context_window = context_window
+        self.output_tokens = output_tokens
+        self.counter = counter or TokenCounter()
+
+    def available(self, *prompt_parts: str) -> int:
+        """
+        Tokens left for sources once the output space and the given prompt parts are accounted for.
+        """
+        used = sum(self.counter.count(part) for part in prompt_parts)
+        return max(0, self.context_window - self.output_tokens - PROMPT_OVERHEAD_TOKENS - used)
+
+    def pack_sources(self,
+                     sources_xml: str,
+                     max_tokens: int,
+                     encoding: str = "xml") -> tuple[str, BudgetUsage]:
+        """
+        Fit the <sources> XML written by deduplicate_and_format_sources into max_tokens.
+        Sources are admitted by priority, a source that does not fit is truncated if enough space is
+        left and dropped otherwise. Admitted sources keep their original order.
+        With encoding="compact" the cost of a source is its size in the compact prompt encoding.
+        """
+        compact = encoding == "compact"
+        render = (encode_source
+                  if compact else lambda source: ET.tostring(source, encoding="unicode"))
+        usage = BudgetUsage(call="",
+                            prompt_tokens=0,
+                            output_tokens=self.output_tokens,
+                            context_window=self.context_window)
+        if self.counter.count(
+                encode_sources(sources_xml) if compact else sources_xml) <= max_tokens:
+            usage.sources_kept = sources_xml.count("<source>") + sources_xml.count("<source ")
+            return sources_xml, usage
+        try:
+            root = ET.fromstring(sources_xml)
+        except ET.ParseError:
+            # not produced by deduplicate_and_format_sources, budget it as plain text
+            return self.counter.truncate(sources_xml, max_tokens), usage
+
+        sources = root.findall("source")
+        order = sorted(range(len(sources)),
+                       key=lambda i: (SOURCE_PRIORITY.get(sources[i].get("type"), 0), i))
+        remaining = max_tokens - self.counter.count(
+            COMPACT_SOURCES_HEADER if compact else "<sources></sources>")
+        kept = set()
+
+        for idx in order:
+            source = sources[idx]
+            cost = self.counter.count(render(source))
+            if cost <= remaining:
+                kept.add(idx)
+                remaining -= cost
+                continue
+
+            answer = source.find("answer")
+            answer_text = answer.text if answer is not None and answer.text else ""
+            # tokens of the source without its answer (tags and query)
+            frame_cost = cost - self.counter.count(answer_text)
+            answer_budget = remaining - frame_cost - self.counter.count(TRUNCATION_MARKER)
+            if answer is not None and answer_budget >= MIN_TRUNCATED_TOKENS:
+                answer.text = self.counter.truncate(answer_text, answer_budget) + TRUNCATION_MARKER
+                kept.add(idx)
+                remaining -= self.counter.count(render(source))
+                usage.sources_truncated += 1
+            else:
+                usage.sources_dropped += 1
+
+        packed = ET.Element("sources")
+        for idx, source in enumerate(sources):
+            if idx in kept:
+                packed.append(source)
+        usage.sources_kept = len(kept)
+        return ET.tostring(packed, encoding="unicode"), usage
+
+    def fit_texts(self, texts: list[str], max_tokens: int) -> list[str]:
+        """
+        Keep texts in order while they fit into max_tokens, truncating the first one that does not.
+        """
+        fitted = []
+        remaining = max_tokens
+        for text in texts:
+            cost = self.counter.count(text)
+            if cost <= remaining:
+                fitted.append(text)
+                remaining -= cost
+                continue
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                fitted.append(
+                    self.counter.truncate(text, remaining - self.counter.count(TRUNCATION_MARKER)) +
+                    TRUNCATION_MARKER)
+            break
+        if len(fitted) < len(texts):
+            logger.info(f"Token budget: kept {len(fitted)} of {len(texts)} texts")
+        return fitted
+
+    def report(self, call: str, prompt: str, pack_usage: BudgetUsage | None = None) -> BudgetUsage:
+        """
+        Log the utilization of the context window for one call.
+        """
+        usage = BudgetUsage(
+            call=call,
+            prompt_tokens=self.counter.count(prompt) + PROMPT_OVERHEAD_TOKENS,
+            output_tokens=self.output_tokens,
+            context_window=self.context_window,
+        )
+        if pack_usage is not None:
+            usage.sources_kept = pack_usage.sources_kept
+            usage.sources_truncated = pack_usage.sources_truncated
+            usage.sources_dropped = pack_usage.sources_dropped
+
+        message = (
+            f"Token budget for {call}: {usage.prompt_tokens} prompt + {usage.output_tokens} "
+            f"output tokens of {usage.context_window} ({usage.utilization:.0%}), "
+            f"sources kept {usage.sources_kept}, "
+            f"truncated {usage.sources_truncated}, dropped {usage.sources_dropped}"
+        )
+        if usage.utilization > 1:
+            logger.warning(f"{message}. The prompt exceeds the context window")
+        else:
+            logger.info(message)
+        return usage
+
+
+def format_with_sources(
+        budget: TokenBudget | None,
+        call: str,
+        template: str,
+        sources: str,
+        source_encoding: str = "xml",
+        **kwargs
+) -> str:
+    """
+    Format a prompt template whose {source} field holds the knowledge sources.
+    With a budget the sources are packed into the space the rest of the prompt leaves, and the
+    utilization is logged.
+    With source_encoding="compact" the sources are written with short handles (e.g. [S3]) that the
+    LLM cites, see source_encoding.encode_sources.
+    """
+    compact = source_encoding == "compact"
+    if compact:
+        template = use_source_handles(template)
+    if budget is None:
+        return template.format(source=encode_sources(sources) if compact else sources, **kwargs)
+
+    space = budget.available(template.format(source="", **kwargs))
+    packed, usage = budget.pack_sources(sources, space, source_encoding)
+    if compact:
+        encoded = encode_sources(packed)
+        logger.info(
+            f"Compact sources for {call}: {budget.counter.count(encoded)} tokens "
+            f"instead of {budget.counter.count(packed)} tokens as XML"
+        )
+        packed = encoded
+    prompt = template.format(source=packed, **kwargs)
+    budget.report(call, prompt, usage)
+    return prompt
+
+
+def make_token_budget(config: RunnableConfig, llm=None) -> TokenBudget | None:
+    """
+    Build the token budget of a request from the graph config.
+    A context_window of 0 disables budgeting.
+    The output tokens are reserved for `llm` (the model of the step), or the llm of the request.
+    """
+    context_window = config["configurable"].get("context_window") or 0
+    if context_window <= 0:
+        return None
+    llm = llm if llm is not None else config["configurable"].get("llm")
+    counter = TokenCounter(
+        model_name=getattr(llm, "model_name", None),
+        use_tokenizer=config["configurable"].get("token_counter") == "tiktoken"
+    )
+    return TokenBudget(
+        context_window=context_window,
+        output_tokens=getattr(llm, "max_tokens", None) or DEFAULT_OUTPUT_TOKENS,
+        counter=counter
+    )
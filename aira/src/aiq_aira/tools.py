@@ -2,10 +2,14 @@
 import aiohttp
 import asyncio
 import json
+import time
 from urllib.parse import urljoin
 from aiq_aira.constants import ASYNC_TIMEOUT, RAG_API_KEY, TAVILY_INCLUDE_DOMAINS
 from langgraph.types import StreamWriter
 from aiq_aira.utils import get_domain
+from aiq_aira.scheduler import scheduler
+from aiq_aira.telemetry import call_span
+from aiq_aira.usage import record_usage
 from langchain_community.tools import TavilySearchResults
 from urllib.parse import urljoin
 import logging
@@ -17,12 +21,14 @@ async def search_rag(
     url: str,
     prompt: str,
     writer: StreamWriter,
-    collection: str
+    collection: str,
+    timeout: float | None = ASYNC_TIMEOUT
 ):
     """
     Calls a RAG endpoint at `url`, passing `prompt` and referencing `collection`.
-    Returns a tuple (content, citations).
-    """ 
+    Returns a tuple (content, documents) with the names of the cited documents,
+    documents is None if the search failed or did not finish within `timeout` seconds.
+    """
     writer({"rag_answer": "\n Performing RAG search \n"})
     logger.info("RAG SEARCH")
     headers = {
@@ -39,68 +45,64 @@ async def search_rag(
         "collection_name": collection
     }
     req_url = urljoin(url, "generate")
+    record_usage(rag_calls=1)
     try:
-        citations = ""
-        async with asyncio.timeout(ASYNC_TIMEOUT):
-            async with session.post(req_url, headers=headers, json=data) as response:
-                logger.info(f"RAG SEARCH with {req_url} and {data}")
-                response.raise_for_status()
-                raw_result = await response.text()
-                content = ""
-                # Parse line-by-line, as RAG might stream
-                for line in raw_result.splitlines():
-                    if line.startswith("data: "):
-                        event_data = line[6:]  # Remove "data: "
-                        full_result = json.loads(event_data)
-                        content += full_result["choices"][0]["message"]["content"]
-                        if "citations" in full_result:
-                            if "results" in full_result["citations"]:
-                                citations_raw = full_result["citations"]["results"]
-                                cited_docs = [
-                                    (
-                                        f"{c['document_name']}"
-                                        if c['document_type'] == 'text'
-                                        else ""
+        documents = []
+        with call_span("rag", query=prompt, collection=collection) as span:
+            async with asyncio.timeout(timeout), scheduler.call_slot():
+                async with session.post(req_url, headers=headers, json=data) as response:
+                    logger.info(f"RAG SEARCH with {req_url} and {data}")
+                    response.raise_for_status()
+                    raw_result = await response.text()
+                    span.set_attribute("response_bytes", len(raw_result))
+                    content = ""
+                    # Parse line-by-line, as RAG might stream
+                    for line in raw_result.splitlines():
+                        if line.startswith("data: "):
+                            event_data = line[6:]  # Remove "data: "
+                            full_result = json.loads(event_data)
+                            content += full_result["choices"][0]["message"]["content"]
+                            if "citations" in full_result:
+                                if "results" in full_result["citations"]:
+                                    citations_raw = full_result["citations"]["results"]
+                                    documents.extend(
+                                        c["document_name"] for c in citations_raw
+                                        if c["document_type"] == "text"
                                     )
-                                    for c in citations_raw
-                                ]
-                                citations += ",".join(cited_docs)
-                citations = f"""
----
-QUERY: 
-{prompt}
-
-ANSWER: 
-{content}
-
-CITATION:
-{citations}
-
-"""                
-                return (content, citations)
+                    # every cited document once, in the order it was first cited
+                    return (content, list(dict.fromkeys(documents)))
     except asyncio.TimeoutError:
         writer({"rag_answer": f"""
 -------------
 Timeout getting RAG answer for question {prompt} 
 """
                 })
-        return (f"Timeout fetching {req_url}:", "")        
+        return (f"Timeout fetching {req_url}:", None)        
     except Exception as e:
         writer({"rag_answer": f"""
 -------------
 Error getting RAG answer for question {prompt} 
 """
                 })
-        return (f"Error fetching {req_url}: {e}", "")
+        return (f"Error fetching {req_url}: {e}", None)
     
 
 
-async def search_tavily(prompt: str, writer: StreamWriter):
+async def search_tavily(prompt: str, writer: StreamWriter, timeout: float | None = ASYNC_TIMEOUT):
     """
     Example of a fallback web search using Tavily Search Tool
+    Each request is given ASYNC_TIMEOUT seconds,
+    the requests of all domain sets together `timeout` seconds.
     """
     logger.info("TAVILY SEARCH")
     writer({"web_answer": "\n Performing web search \n"})
+    search_end = time.monotonic() + timeout if timeout is not None else None
+
+    def _request_timeout():
+        if search_end is None:
+            return ASYNC_TIMEOUT
+        return min(ASYNC_TIMEOUT, max(search_end - time.monotonic(), 0.0))
+
     try: 
         all_results = []
 
@@ -117,10 +119,13 @@ async def search_tavily(prompt: str, writer: StreamWriter):
                     include_domains=domain_chunk,
                     # exclude_domains=[...], 
                 )
+                record_usage(tavily_calls=1)
                 try:
-                    async with asyncio.timeout(ASYNC_TIMEOUT):
-                        chunk_results = await tool.ainvoke({"query": prompt})
-                        all_results.extend(chunk_results)
+                    with call_span("tavily", query=prompt) as span:
+                        async with asyncio.timeout(_request_timeout()):
+                            chunk_results = await tool.ainvoke({"query": prompt})
+                            span.set_attribute("results", len(chunk_results))
+                            all_results.extend(chunk_results)
                 except asyncio.TimeoutError:
                     writer({"web_answer": f"""
     --------
@@ -141,11 +146,14 @@ async def search_tavily(prompt: str, writer: StreamWriter):
                     include_images=False,
                     exclude_domains=seen_domains, 
                     )
+                record_usage(tavily_calls=1)
                 try:
-                    async with asyncio.timeout(ASYNC_TIMEOUT):
-                        chunk_results = await tool.ainvoke({"query": prompt})
-                        all_results.extend(chunk_results)
-                        seen_domains.extend([get_domain(r["url"]) for r in chunk_results])
+                    with call_span("tavily", query=prompt) as span:
+                        async with asyncio.timeout(_request_timeout()):
+                            chunk_results = await tool.ainvoke({"query": prompt})
+                            span.set_attribute("results", len(chunk_results))
+                            all_results.extend(chunk_results)
+                            seen_domains.extend([get_domain(r["url"]) for r in chunk_results])
                 except asyncio.TimeoutError:
                     writer({"web_answer": f"""
         --------
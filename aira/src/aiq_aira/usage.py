@@ -0,0 +1,96 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextvars
+import functools
+import time
+from collections import Counter
+
+from aiq_aira.telemetry import stage_span
+from aiq_aira.token_budget import TokenCounter
+
+# counters of one graph node, recorded by the LLM gateway, the search tools and the NIM calls
+_usage: contextvars.ContextVar[Counter | None] = contextvars.ContextVar("aira_usage", default=None)
+_estimator = TokenCounter()
+
+
+def record_usage(**counts: float):
+    """
+    Adds to the usage of the graph node the call is made from, no-op outside of a tracked node.
+    """
+    usage = _usage.get()
+    if usage is not None:
+        usage.update({name: value for name, value in counts.items() if value})
+
+
+def record_llm_usage(usage: dict | None, thinking: str = ""):
+    """
+    Records one LLM call with its usage metadata.
+    Thinking tokens are taken from the reasoning token count of the endpoint if it reports one,
+    otherwise estimated from the streamed thinking text.
+    """
+    usage = usage or {}
+    reasoning = (usage.get("output_token_details") or {}).get("reasoning")
+    record_usage(
+        llm_calls=1,
+        prompt_tokens=usage.get("input_tokens", 0),
+        completion_tokens=usage.get("output_tokens", 0),
+        thinking_tokens=reasoning if reasoning is not None else _estimator.count(thinking),
+    )
+
+
+def merge_usage(left: dict | None, right: dict | None) -> dict:
+    """
+    Reducer of the usage of the graph state: sums the counters of each node.
+    """
+    merged = {node: dict(counts) for node, counts in (left or {}).items()}
+    for node, counts in (right or {}).items():
+        merged[node] = dict(Counter(merged.get(node, {})) + Counter(counts))
+    return merged
+
+
+def track_usage(node):
+    """
+    Wraps a graph node so the usage of its calls (including those of its sub-tasks) and its wall
+    time are added to the `usage` of the graph state, keyed by the name of the node function.
+    """
+
+    @functools.wraps(node)
+    async def _tracked(state, *args, **kwargs):
+        usage = Counter()
+        token = _usage.set(usage)
+        start = time.monotonic()
+        try:
+            with stage_span(node.__name__):
+                update = await node(state, *args, **kwargs)
+        finally:
+            _usage.reset(token)
+        usage["wall_seconds"] = round(time.monotonic() - start, 3)
+        return {**(update or {}), "usage": {node.__name__: dict(usage)}}
+
+    return _tracked
+
+
+def usage_report(node_usage: dict | None, wall_seconds: float, **counts: float) -> dict:
+    """
+    The usage of a request: the totals over all nodes plus `counts` (e.g. cache_hits), the wall time
+    of the request, and the counters of each node.
+    """
+    total = Counter()
+    for usage in (node_usage or {}).values():
+        total.update({name: value for name, value in usage.items() if name != "wall_seconds"})
+    total.update(counts)
+    total["wall_seconds"] = round(wall_seconds, 3)
+    return {"total": dict(total), "nodes": node_usage or {}}
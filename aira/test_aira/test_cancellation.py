@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from langgraph.config import get_stream_writer
+from langgraph.graph import START, END, StateGraph
+from typing_extensions import TypedDict
+
+from aiq_aira.cancellation import cancel_on_disconnect, run_metrics
+
+
+class State(TypedDict):
+    report: str
+
+
+def _graph(searches: list, started: asyncio.Event):
+
+    async def search(query):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            searches.append(query)
+            raise
+
+    async def web_research(state: State):
+        writer = get_stream_writer()
+        writer({"web_research": "searching"})
+        started.set()
+        await asyncio.gather(search("CFTR modulators"), search("cystic fibrosis"))
+        return {"report": "done"}
+
+    builder = StateGraph(State)
+    builder.add_node("web_research", web_research)
+    builder.add_edge(START, "web_research")
+    builder.add_edge("web_research", END)
+    return builder.compile()
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_cancels_the_graph_run():
+    cancelled_searches, started = [], asyncio.Event()
+    before = run_metrics.as_dict().get("cancelled", 0)
+
+    stream = _graph(cancelled_searches, started).astream({"report": ""}, stream_mode="custom")
+    outputs = cancel_on_disconnect(stream, "thread-1")
+    assert await outputs.__anext__() == {"web_research": "searching"}
+    await started.wait()
+    await outputs.aclose()
+
+    assert sorted(cancelled_searches) == ["CFTR modulators", "cystic fibrosis"]
+    assert run_metrics.as_dict()["cancelled"] == before + 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_consumer_cancels_the_graph_run():
+    cancelled_searches, started = [], asyncio.Event()
+
+    async def consume():
+        stream = _graph(cancelled_searches, started).astream({"report": ""}, stream_mode="custom")
+        async for _ in cancel_on_disconnect(stream):
+            pass
+
+    task = asyncio.create_task(consume())
+    await started.wait()
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert sorted(cancelled_searches) == ["CFTR modulators", "cystic fibrosis"]
+
+
+@pytest.mark.asyncio
+async def test_completed_and_failed_runs():
+    async def items(fail):
+        yield 1
+        yield 2
+        if fail:
+            raise ValueError("NIM unavailable")
+
+    before = run_metrics.as_dict()
+    assert [item async for item in cancel_on_disconnect(items(False))] == [1, 2]
+    with pytest.raises(ValueError):
+        async for _ in cancel_on_disconnect(items(True)):
+            pass
+
+    after = run_metrics.as_dict()
+    assert after["completed"] == before.get("completed", 0) + 1
+    assert after["failed"] == before.get("failed", 0) + 1
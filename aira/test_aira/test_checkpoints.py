@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import pytest
+from langgraph.graph import START, END, StateGraph
+from aiq_aira.checkpoints import CompressedSerializer, open_checkpointer
+from aiq_aira.schema import AIRAState, GeneratedQuery
+
+
+def test_compressed_serializer_round_trip():
+    serde = CompressedSerializer(min_size=100)
+    value = {
+        "running_summary": "gene therapy " * 200,
+        "queries": [GeneratedQuery(query="q", report_section="s", rationale="r")]
+    }
+
+    type_, data = serde.dumps_typed(value)
+    assert type_.startswith("zlib+")
+    assert len(data) < len(value["running_summary"]) / 4
+    assert serde.loads_typed((type_, data)) == value
+    assert serde.dumps_typed("short")[0] == "msgpack"
+
+
+@pytest.mark.asyncio
+async def test_resume_after_failed_node(tmp_path):
+    calls = []
+
+    async def research(state: AIRAState):
+        calls.append("research")
+        return {"running_summary": "draft " * 500}
+
+    async def finalize(state: AIRAState, config):
+        calls.append("finalize")
+        if len(calls) == 2:
+            raise asyncio.TimeoutError()
+        report_organization = config["configurable"]["report_organization"]
+        return {"final_report": state.running_summary[:5] + report_organization}
+
+    async with open_checkpointer(str(tmp_path / "checkpoints.db")) as checkpointer:
+        builder = StateGraph(AIRAState)
+        builder.add_node("research", research)
+        builder.add_node("finalize", finalize)
+        builder.add_edge(START, "research")
+        builder.add_edge("research", "finalize")
+        builder.add_edge("finalize", END)
+        graph = builder.compile(checkpointer=checkpointer)
+
+        # the llm client is not serializable and must not be written to the checkpoint metadata
+        config = {"thread_id": "report-1", "llm": object(), "report_organization": "!"}
+        with pytest.raises(asyncio.TimeoutError):
+            await graph.ainvoke({"queries": []}, config=config)
+
+        result = await graph.ainvoke(None, config=config)
+        assert result["final_report"] == "draft!"
+        assert calls == ["research", "finalize", "finalize"]
+
+        assert await checkpointer.prune(3600) == 0
+        assert await checkpointer.prune(-1) == 1
+        assert not (await graph.aget_state({"configurable": {"thread_id": "report-1"}})).values
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prune_interval, pruned", [(0, True), (3600, False)])
+async def test_threads_are_pruned_while_the_server_runs(tmp_path, prune_interval, pruned):
+    async def research(state: AIRAState):
+        return {"running_summary": "draft"}
+
+    db_path = str(tmp_path / "checkpoints.db")
+    async with open_checkpointer(
+        db_path, retention_hours=1, prune_interval=prune_interval
+    ) as checkpointer:
+        builder = StateGraph(AIRAState)
+        builder.add_node("research", research)
+        builder.add_edge(START, "research")
+        builder.add_edge("research", END)
+        graph = builder.compile(checkpointer=checkpointer)
+
+        await graph.ainvoke({"queries": []}, config={"thread_id": "old-report"})
+        # the report was last written two hours ago, after the checkpointer was opened
+        await checkpointer.conn.execute(
+            "UPDATE report_threads SET updated_at = updated_at - 7200 "
+            "WHERE thread_id = 'old-report'"
+        )
+        await checkpointer.conn.commit()
+
+        await graph.ainvoke({"queries": []}, config={"thread_id": "new-report"})
+
+        old_state = await graph.aget_state({"configurable": {"thread_id": "old-report"}})
+        assert bool(old_state.values) is not pruned
+        assert (await graph.aget_state({"configurable": {"thread_id": "new-report"}})).values
@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import xml.etree.ElementTree as ET
+from aiq_aira.compression import compress_sources, split_sentences
+
+ANSWER = (
+    "Cookies help us deliver our services. "
+    "CFTR modulators such as ivacaftor improve lung function in cystic fibrosis [1]. "
+    "Subscribe to our newsletter for updates. "
+    "Elexacaftor combinations restore CFTR protein folding (Keating et al., 2018). "
+    "All rights reserved."
+)
+
+
+def test_split_sentences_keeps_citation_markers():
+    assert split_sentences("Gene therapy works. [2]\nSecond line. Third one.") == [
+        "Gene therapy works. [2]", "Second line.", "Third one."
+    ]
+
+
+def test_compress_sources_keeps_relevant_sentences_in_order():
+    sources = (
+        '<sources><source type="rag"><query>CFTR modulators for cystic fibrosis</query>'
+        f"<answer>{ANSWER}</answer></source>"
+        '<source type="web"><query>short</query><answer>Short answer.</answer></source></sources>'
+    )
+    sections = {"CFTR modulators for cystic fibrosis": "Treatment"}
+    compressed = ET.fromstring(compress_sources(sources, 50, sections))
+    first, second = compressed.findall("source")
+
+    assert first.get("type") == "rag"
+    assert first.findtext("answer").split("\n") == [
+        "CFTR modulators such as ivacaftor improve lung function in cystic fibrosis [1].",
+        "Elexacaftor combinations restore CFTR protein folding (Keating et al., 2018).",
+    ]
+    assert second.findtext("answer") == "Short answer."
+    assert compress_sources(sources, 1000) == sources
@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from aiq_aira.deadline import has_time_for, make_deadline, step_timeout
+from aiq_aira.report_gen_utils import IncompleteReportError, ReportTimeoutError, summarize_report
+
+
+def _config(seconds_left, reserve=10):
+    return {"configurable": {"deadline": time.time() + seconds_left, "deadline_reserve": reserve}}
+
+
+def test_step_timeout_is_capped_by_the_remaining_time():
+    assert make_deadline(0) is None
+    assert step_timeout({"configurable": {}}, 120) == 120
+
+    assert step_timeout(_config(1000), 120) == 120
+    assert step_timeout(_config(50), 120, steps=2) == pytest.approx(30, abs=1)
+    assert step_timeout(_config(15), 120, steps=2) == 0
+    assert step_timeout(_config(50), None, steps=1) == pytest.approx(40, abs=1)
+
+
+def test_has_time_for():
+    assert has_time_for({"configurable": {}}, 4)
+    assert has_time_for(_config(50), 4)
+    assert not has_time_for(_config(50), 4, extra=15)
+    assert not has_time_for(_config(-5), 0)
+
+
+class SlowLLM:
+    model_name = "slow-model"
+
+    async def astream(self, prompt, **kwargs):
+        for text in ["# Cystic Fibrosis\n\n", "CFTR modulators ", "improve lung function."]:
+            yield AIMessageChunk(content=text)
+            await asyncio.sleep(0.2)
+
+
+@pytest.mark.asyncio
+async def test_summarize_report_raises_with_written_report_on_timeout():
+    def writer(_):
+        pass
+
+    with pytest.raises(ReportTimeoutError) as draft:
+        await summarize_report("", "<sources/>", "Write a report", SlowLLM(), writer, timeout=0.3)
+    assert draft.value.report == "# Cystic Fibrosis\n\nCFTR modulators "
+
+    existing = "# Cystic Fibrosis\n\nExisting report."
+    with pytest.raises(ReportTimeoutError) as extended:
+        await summarize_report(
+            existing, "<sources/>", "Write a report", SlowLLM(), writer, timeout=0.3
+        )
+    assert extended.value.report == existing
+
+
+class ThinkingLLM:
+    """
+    A reasoning model whose chat template opened the <think> block, still thinking at the deadline
+    (or done thinking without writing a report).
+    """
+    model_name = "nvidia/llama-3.3-nemotron-super-49b-v1"
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def astream(self, prompt, **kwargs):
+        for text in ["The sources cover ", "CFTR modulators."]:
+            yield AIMessageChunk(content=text)
+            await asyncio.sleep(self.delay)
+        yield AIMessageChunk(content="</think>")
+
+
+SOURCES = (
+    "<sources>"
+    "<source><query>CFTR modulators</query><answer>They improve lung function.</answer></source>"
+    "</sources>"
+)
+
+
+@pytest.mark.asyncio
+async def test_empty_first_draft_falls_back_to_the_sources():
+    def writer(_):
+        pass
+
+    with pytest.raises(ReportTimeoutError) as timed_out:
+        await summarize_report("", SOURCES, "Write a report", ThinkingLLM(0.2), writer, timeout=0.3)
+    assert timed_out.value.report == "## CFTR modulators\nThey improve lung function."
+
+    with pytest.raises(IncompleteReportError) as empty:
+        await summarize_report("", SOURCES, "Write a report", ThinkingLLM(0), writer)
+    assert empty.value.report == "## CFTR modulators\nThey improve lung function."
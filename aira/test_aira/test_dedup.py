@@ -0,0 +1,71 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import xml.etree.ElementTree as ET
+from aiq_aira.dedup import MinHashDeduplicator, dedupe_sources, merge_duplicate_sources
+from aiq_aira.schema import SourceRecord
+from aiq_aira.sources import render_sources
+
+PASSAGE = (
+    "Cystic fibrosis is caused by mutations in the CFTR gene which encodes a chloride channel "
+    "expressed in epithelial cells of the lungs, pancreas and other organs"
+)
+OTHER = (
+    "Lung transplantation remains an option for patients with end stage disease "
+    "and severe respiratory failure"
+)
+
+
+def source(query, answer, cited, id=0):
+    return SourceRecord(id=id, kind="rag", query=query, answer=answer, documents=[cited])
+
+
+def test_cluster_is_deterministic_and_keeps_first():
+    texts = [
+        OTHER, PASSAGE, PASSAGE.replace("other organs", "other organs."), "unrelated short text"
+    ]
+    assert MinHashDeduplicator().cluster(texts) == [0, 1, 1, 3]
+
+
+def test_dedupe_sources_against_previous_results():
+    previous = (
+        f"<sources><source type=\"rag\"><query>q1</query><answer>{PASSAGE}</answer></source>"
+        "</sources>"
+    )
+    current = (
+        f"<sources><source type=\"rag\"><query>q2</query>"
+        f"<answer>{PASSAGE.upper()}\n\n{OTHER}</answer></source>"
+        f"<source type=\"web\"><query>q3</query><answer>{PASSAGE}</answer></source></sources>"
+    )
+    deduped = ET.fromstring(dedupe_sources(current, [previous]))
+
+    assert [s.findtext("query") for s in deduped.findall("source")] == ["q2"]
+    assert deduped.find("source/answer").text == OTHER
+
+
+def test_merge_duplicate_sources_keeps_order():
+    sources = [
+        source("q1", OTHER, "b.pdf", 1),
+        source("q2", PASSAGE, "a.pdf", 2),
+        source("q3", PASSAGE + ".", "c.pdf", 3),
+        source("q1", OTHER, "b.pdf", 4),
+    ]
+    merged, aliases = merge_duplicate_sources(sources)
+
+    assert [s.query for s in merged] == ["q1", "q2"]
+    assert merged[1].documents == ["a.pdf", "c.pdf"]
+    assert aliases == {3: 2, 4: 1}
+    assert sources[1].documents == ["a.pdf"]
+    assert render_sources(merged).count("**Source**") == 2
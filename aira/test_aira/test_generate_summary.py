@@ -16,7 +16,12 @@
 import pytest
 from pathlib import Path
 from aiq.builder.workflow_builder import WorkflowBuilder
-from aiq_aira.schema import GenerateSummaryStateInput, GenerateSummaryStateOutput, GeneratedQuery
+from aiq_aira.schema import (
+    GenerateSummaryStateInput,
+    GenerateSummaryStateOutput,
+    GeneratedQuery,
+    SourceRecord
+)
 from aiq.data_models.config import AIQConfig
 import yaml
 import logging
@@ -151,4 +156,76 @@ async def test_generate_summary_no_web(workflow_builder):
         # Verify no web research steps occurred
         assert not any("web_answer" in r.intermediate_step.lower() for r in intermediate_results if r.intermediate_step)
 
-        
\ No newline at end of file
+        
+@pytest.mark.asyncio
+async def test_generate_summary_with_research(workflow_builder):
+    """Test summary generation from research done beforehand, e.g. by the ai_researcher workflow."""
+    async for builder in workflow_builder:
+        workflow = builder.build(entry_function="generate_summary")
+
+        input_data = GenerateSummaryStateInput(
+            topic="Comprehensive Financial Report",
+            report_organization="Introduction, Revenue Growth, Conclusion",
+            queries=SAMPLE_QUERIES[:1],
+            search_web=False,
+            rag_collection=TEST_RAG_COLLECTION,
+            reflection_count=0,
+            llm_name="nemotron",
+            web_research_results=[
+                "<sources><source><query>Amazon 2023 Annual Report Summary official release</query>"
+                "<answer>Amazon's 2023 net sales increased 12% to $574.8 billion.</answer>"
+                "</source></sources>"
+            ],
+            sources=[SourceRecord(
+                id=1,
+                kind="rag",
+                query="Amazon 2023 Annual Report Summary official release",
+                answer="Amazon's 2023 net sales increased 12% to $574.8 billion.",
+                documents=["amazon-2023-annual-report.pdf"]
+            )]
+        )
+
+        intermediate_results = []
+        final_result = None
+        async with workflow.run(input_data) as runner:
+            async for intermediate in runner.result_stream():
+                intermediate_results.append(intermediate)
+                if intermediate.final_report is not None:
+                    final_result = intermediate
+
+        # the research step is skipped
+        assert not any(
+            "rag_answer" in r.intermediate_step.lower()
+            for r in intermediate_results if r.intermediate_step
+        )
+        assert final_result is not None
+        assert "amazon-2023-annual-report.pdf" in final_result.citations
+
+@pytest.mark.asyncio
+async def test_ai_researcher_chunks(workflow_builder):
+    """
+    Test the ai_researcher workflow streams the planned queries in one chunk, then the final report.
+    """
+    async for builder in workflow_builder:
+        workflow = builder.build()
+
+        input_message = json.dumps({
+            "topic": "Comprehensive Financial Report",
+            "report_organization": "Introduction, Revenue Growth, Conclusion",
+            "search_web": False,
+            "rag_collection": TEST_RAG_COLLECTION,
+            "num_queries": 2,
+            "llm_name": "nemotron",
+            "reflection_count": 0
+        })
+
+        chunks = []
+        async with workflow.run(input_message) as runner:
+            async for chunk in runner.result_stream():
+                chunks.append(chunk.choices[0].message.content)
+
+        assert len(chunks) == 2
+        assert chunks[0].startswith("Queries: ")
+        queries = json.loads(chunks[0].removeprefix("Queries: "))
+        assert [GeneratedQuery.model_validate(query) for query in queries]
+        assert "introduction" in chunks[1].lower()
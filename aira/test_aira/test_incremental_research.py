@@ -0,0 +1,146 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from aiq_aira import nodes
+from aiq_aira.nodes import incremental_web_research
+from aiq_aira.schema import AIRAState, GeneratedQuery, SourceRecord
+
+QUERIES = [
+    GeneratedQuery(query=f"query {i}", report_section="Body", rationale="r") for i in range(4)
+]
+
+
+def make_config(**configurable):
+    return {"configurable": {
+        "llm": object(),
+        "search_web": False,
+        "collection": "collection",
+        "report_organization": "Body",
+        "context_window": 0,
+        **configurable
+    }}
+
+
+class FakePipeline:
+    """
+    Stands in for the research of each query (finishing after its delay) and the report writer,
+    recording the queries of every draft and the research that was cancelled.
+    """
+
+    def __init__(self, delays, draft_seconds=0.0, fail_draft=False):
+        self.delays = delays
+        self.draft_seconds = draft_seconds
+        self.fail_draft = fail_draft
+        self.drafts = []
+        self.cancelled = []
+
+    async def process_single_query(self, query, config, writer, collection, llm, search_web):
+        try:
+            await asyncio.sleep(self.delays[query])
+        except asyncio.CancelledError:
+            self.cancelled.append(query)
+            raise
+        source = SourceRecord(
+            kind="rag", query=query, answer=f"answer to {query}", documents=[f"{query}.pdf"]
+        )
+        return f"answer to {query}", source, {"score": "yes"}, None, []
+
+    async def summarize_report(self, existing_summary, new_source, **kwargs):
+        if self.fail_draft:
+            raise RuntimeError("LLM unavailable")
+        self.drafts.append([q.query for q in QUERIES if q.query in new_source])
+        await asyncio.sleep(self.draft_seconds)
+        return f"{existing_summary}|{len(self.drafts)}"
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    def _make(delays, **kwargs):
+        fake = FakePipeline(dict(zip([q.query for q in QUERIES], delays)), **kwargs)
+        monkeypatch.setattr(nodes, "process_single_query", fake.process_single_query)
+        monkeypatch.setattr(nodes, "summarize_report", fake.summarize_report)
+        return fake
+    return _make
+
+
+@pytest.mark.asyncio
+async def test_first_draft_waits_for_first_k_sources(pipeline):
+    fake = pipeline([0.01, 0.02, 0.1, 0.12], draft_seconds=0.05)
+    writes = []
+
+    update = await incremental_web_research(
+        AIRAState(queries=QUERIES), make_config(summary_first_k=2), writes.append
+    )
+
+    # the first draft starts with the first two sources, the source that arrived while
+    # a draft was written extends the next one
+    assert fake.drafts == [["query 0", "query 1"], ["query 2"], ["query 3"]]
+    assert update["running_summary"] == "|1|2|3"
+    assert "degraded" not in update
+
+
+@pytest.mark.asyncio
+async def test_research_deadline_drops_stragglers(pipeline):
+    fake = pipeline([0.01, 0.02, 0.015, 5])
+    writes = []
+
+    update = await incremental_web_research(
+        AIRAState(queries=QUERIES),
+        make_config(summary_first_k=1, research_deadline=0.2),
+        writes.append
+    )
+
+    assert [source.query for source in update["sources"]] == ["query 0", "query 2", "query 1"]
+    assert fake.cancelled == ["query 3"]
+    assert "query 3" not in update["web_research_results"][0]
+    assert update["degraded"] is True
+    assert any("Research deadline reached" in write.get("web_research", "") for write in writes)
+
+
+@pytest.mark.asyncio
+async def test_sources_are_stored_in_arrival_order(pipeline):
+    pipeline([0.08, 0.06, 0.04, 0.02])
+    earlier = SourceRecord(
+        id=1, kind="web", query="earlier", answer="a", urls=["https://example.com"]
+    )
+
+    update = await incremental_web_research(
+        AIRAState(queries=QUERIES, sources=[earlier]),
+        make_config(summary_first_k=4),
+        lambda _: None
+    )
+
+    # numbered after the sources already in the store, in the order the research finished
+    assert [(source.id, source.query) for source in update["sources"]] == [
+        (2, "query 3"), (3, "query 2"), (4, "query 1"), (5, "query 0")
+    ]
+    research = update["web_research_results"][0]
+    assert research.index("query 3") < research.index("query 0")
+
+
+@pytest.mark.asyncio
+async def test_failed_draft_cancels_the_research(pipeline):
+    fake = pipeline([0.01, 5, 5, 5], fail_draft=True)
+
+    with pytest.raises(RuntimeError, match="LLM unavailable"):
+        await incremental_web_research(
+            AIRAState(queries=QUERIES), make_config(summary_first_k=1), lambda _: None
+        )
+
+    assert sorted(fake.cancelled) == ["query 1", "query 2", "query 3"]
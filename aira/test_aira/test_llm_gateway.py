@@ -0,0 +1,148 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langgraph.graph import START, END, StateGraph
+from typing_extensions import TypedDict
+
+from aiq_aira import llm_gateway
+from aiq_aira.llm_gateway import chat_prompt, invoke_llm, llm_metrics, stream_llm
+
+
+def _connection_error():
+    return openai.APIConnectionError(
+        request=httpx.Request("POST", "http://llm:8000/v1/chat/completions")
+    )
+
+
+class FakeLLM:
+    """
+    Streams the given chunks, failing the first `failures` attempts (after `fail_after` chunks).
+    """
+
+    model_name = "fake-model"
+
+    def __init__(self, chunks, failures=0, fail_after=0, delay=0.0):
+        self.chunks = chunks
+        self.failures = failures
+        self.fail_after = fail_after
+        self.delay = delay
+        self.attempts = 0
+        self.options = {}
+
+    def bind(self, **options):
+        bound = FakeLLM(self.chunks, self.failures, self.fail_after, self.delay)
+        bound.options = options
+        return bound
+
+    async def astream(self, prompt, **kwargs):
+        self.attempts += 1
+        for idx, chunk in enumerate(self.chunks):
+            if self.attempts <= self.failures and idx == self.fail_after:
+                raise _connection_error()
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise _connection_error()
+        await asyncio.sleep(self.delay)
+        return AIMessage(
+            content="".join(chunk.content for chunk in self.chunks), usage_metadata=USAGE
+        )
+
+
+USAGE = {"input_tokens": 12, "output_tokens": 5, "total_tokens": 17}
+CHUNKS = [
+    AIMessageChunk(content="<think>plan</think>"),
+    AIMessageChunk(content="Report"),
+    AIMessageChunk(content="", usage_metadata=USAGE),
+]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_RETRY_BACKOFF", 0)
+
+
+def test_chat_prompt_is_compiled_once():
+    assert chat_prompt("detailed thinking on") is chat_prompt("detailed thinking on")
+    assert chat_prompt("detailed thinking on") is not chat_prompt("detailed thinking off")
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_filters_thinking_and_records_metrics():
+    thinking = []
+    think_filter = await stream_llm(
+        FakeLLM(CHUNKS), "prompt", "test_stream", on_thinking=thinking.append
+    )
+
+    assert think_filter.answer == "Report"
+    assert "".join(thinking) == "plan"
+    stats = llm_metrics.as_dict()["test_stream"]
+    assert stats["ok"] == 1 and stats["streamed_calls"] == 1
+    assert stats["prompt_tokens"] == 12 and stats["completion_tokens"] == 5
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_retries_only_before_the_first_chunk():
+    llm = FakeLLM(CHUNKS, failures=1)
+    think_filter = await stream_llm(llm, "prompt", "test_retry")
+    assert think_filter.answer == "Report"
+    assert llm.attempts == 2
+    assert llm_metrics.as_dict()["test_retry"]["retries"] == 1
+
+    llm = FakeLLM(CHUNKS, failures=1, fail_after=1)
+    with pytest.raises(openai.APIConnectionError):
+        await stream_llm(llm, "prompt", "test_no_retry")
+    assert llm.attempts == 1
+    assert llm_metrics.as_dict()["test_no_retry"]["error"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_and_call_options():
+    with pytest.raises(asyncio.TimeoutError):
+        await invoke_llm(FakeLLM(CHUNKS, delay=0.5), "prompt", "test_timeout", timeout=0.05)
+    assert llm_metrics.as_dict()["test_timeout"]["timeout"] == 1
+
+    llm = FakeLLM(CHUNKS)
+    response = await invoke_llm(llm, "prompt", "test_options", max_tokens=2)
+    assert response.content == "<think>plan</think>Report"
+    assert llm.options == {} and llm.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_recorded_per_graph_node():
+    class State(TypedDict):
+        answer: str
+
+    async def gateway_node(state: State):
+        think_filter = await stream_llm(FakeLLM(CHUNKS), "prompt", "test_node_call")
+        return {"answer": think_filter.answer}
+
+    builder = StateGraph(State)
+    builder.add_node("gateway_node", gateway_node)
+    builder.add_edge(START, "gateway_node")
+    builder.add_edge("gateway_node", END)
+    result = await builder.compile().ainvoke({"answer": ""})
+
+    assert result["answer"] == "Report"
+    assert llm_metrics.as_dict()["gateway_node"]["calls"] == 1
@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+from aiq_aira.model_routing import ModelRoute, expects_thinking, route_model, with_reasoning
+from aiq_aira.utils import update_system_prompt
+
+NEMOTRON = SimpleNamespace(model_name="nvidia/llama-3.3-nemotron-super-49b-v1")
+INSTRUCT = SimpleNamespace(model_name="meta/llama-3.3-70b-instruct")
+
+
+def test_route_model_falls_back_to_request_llm():
+    config = {
+        "configurable": {
+            "llm": NEMOTRON,
+            "model_routes": {"finalize_summary": ModelRoute(INSTRUCT, False)}
+        }
+    }
+
+    assert route_model(config, "finalize_summary") == ModelRoute(INSTRUCT, False)
+    assert route_model(config, "summarize_sources") == ModelRoute(NEMOTRON, None)
+    assert route_model(config, "relevancy", INSTRUCT) == ModelRoute(INSTRUCT, None)
+    request_only = {"configurable": {"llm": NEMOTRON}}
+    assert route_model(request_only, "finalize_summary") == ModelRoute(NEMOTRON, None)
+
+
+def test_reasoning_switch():
+    assert update_system_prompt("", NEMOTRON) == "detailed thinking on"
+    assert update_system_prompt("", NEMOTRON, reasoning=False) == "detailed thinking off"
+    assert update_system_prompt("", INSTRUCT, reasoning=True) == ""
+
+    assert with_reasoning("Grade this", ModelRoute(NEMOTRON)) == "Grade this"
+    assert with_reasoning("Grade this", ModelRoute(INSTRUCT, False)) == "Grade this"
+    assert with_reasoning("Grade this", ModelRoute(NEMOTRON, False)) == [
+        ("system", "detailed thinking off"), ("human", "Grade this")
+    ]
+
+
+def test_virtual_screening_search_has_its_own_route():
+    routes = {"begin_virtual_screening_if_intended": ModelRoute(INSTRUCT, False)}
+    config = {"configurable": {"llm": NEMOTRON, "model_routes": routes}}
+
+    # the intent check goes to the instruct model, the search loop keeps the reasoning model
+    assert route_model(config, "begin_virtual_screening_if_intended") == ModelRoute(INSTRUCT, False)
+    assert route_model(config, "find_protein_and_molecule") == ModelRoute(NEMOTRON, None)
+
+    routes["find_protein_and_molecule"] = ModelRoute(NEMOTRON, True)
+    assert route_model(config, "find_protein_and_molecule") == ModelRoute(NEMOTRON, True)
+
+
+def test_expects_thinking():
+    assert expects_thinking(NEMOTRON)
+    assert expects_thinking(NEMOTRON, reasoning=True)
+    assert not expects_thinking(NEMOTRON, reasoning=False)
+    assert not expects_thinking(INSTRUCT, reasoning=True)
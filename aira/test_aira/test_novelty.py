@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from aiq_aira.novelty import NoveltyTracker
+
+REPORT = (
+    "# Cystic Fibrosis\n\n"
+    "Cystic fibrosis is caused by mutations in the CFTR gene which encodes a chloride channel."
+)
+KNOWN = (
+    "<sources><source type=\"rag\"><query>q</query><answer>CFTR modulators such as ivacaftor "
+    "improve lung function in patients with gating mutations.</answer></source></sources>"
+)
+
+
+def test_novelty_of_repeated_and_new_research():
+    tracker = NoveltyTracker()
+    tracker.add_text(REPORT)
+    tracker.add_sources(KNOWN)
+
+    repeated = KNOWN.replace("<query>q</query>", "<query>q2</query>")
+    new = (
+        "<sources><source type=\"web\"><query>q3</query><answer>Lung transplantation remains "
+        "an option for end stage disease.</answer></source></sources>"
+    )
+    assert tracker.sources_novelty(repeated) == 0
+    assert tracker.sources_novelty(new) == 1
+    assert tracker.sources_novelty("<sources />") == 0
+
+
+def test_duplicate_query():
+    tracker = NoveltyTracker()
+    tracker.add_query("What are the CFTR modulator therapies for cystic fibrosis?")
+
+    assert tracker.duplicate_query("CFTR modulator therapies cystic fibrosis", 0.8)
+    assert not tracker.duplicate_query("lung transplantation outcomes in cystic fibrosis", 0.8)
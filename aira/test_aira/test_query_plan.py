@@ -0,0 +1,57 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from aiq_aira.nodes import generate_query_plan
+
+PLAN = [
+    {"query": "real query 1", "report_section": "Body", "rationale": "r"},
+    {"query": "real query 2", "report_section": "Body", "rationale": "r"},
+]
+
+
+class FakeReasoningLLM:
+    """
+    A reasoning model whose chat template already opened the <think> block:
+    the stream starts with the thinking and has no opening tag.
+    """
+
+    model_name = "nvidia/llama-3.3-nemotron-super-49b-v1"
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, prompt, **kwargs):
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk)
+
+
+@pytest.mark.asyncio
+async def test_query_plan_ignores_json_in_thinking():
+    thinking = 'Example: [{"query": "draft idea", "report_section": "Body", "rationale": "r"}]'
+    llm = FakeReasoningLLM([thinking[:30], thinking[30:], "</think>", json.dumps(PLAN)])
+    started, steps = [], []
+
+    queries = await generate_query_plan(
+        llm, "topic", "Body", 2, steps.append, on_query=lambda query: started.append(query.query)
+    )
+
+    assert [query["query"] for query in queries] == ["real query 1", "real query 2"]
+    assert started == ["real query 1", "real query 2"]
+    assert "draft idea" in "".join(step["generating_questions"] for step in steps)
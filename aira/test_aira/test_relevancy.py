@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+from types import SimpleNamespace
+
+import pytest
+from aiq_aira.relevancy import RelevancyStats, grade_yes_no, parse_grade, prefilter_relevancy
+
+QUERY = "What are the approved CFTR modulator therapies for cystic fibrosis?"
+ANSWER = (
+    "Approved CFTR modulator therapies for cystic fibrosis include ivacaftor, "
+    "lumacaftor/ivacaftor, tezacaftor/ivacaftor and elexacaftor/tezacaftor/ivacaftor. "
+    "These therapies target the underlying protein defect and improve lung function, weight and "
+    "quality of life in eligible patients."
+)
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("", ("no", "empty")),
+    ("Error fetching http://rag:8081/v1/generate: Cannot connect to host", ("no", "error")),
+    ("Timeout fetching http://rag:8081/v1/generate:", ("no", "error")),
+    ("I'm sorry, I don't have information about CFTR modulators in the provided documents.",
+     ("no", "refusal")),
+    ("The provided context does not cover this. CFTR modulators are not mentioned in the context.",
+     ("no", "refusal")),
+    (ANSWER, ("yes", "coverage")),
+    ("Lung transplantation remains an option for patients with end stage disease.", (None, "llm")),
+])
+def test_prefilter_relevancy(answer, expected):
+    assert prefilter_relevancy(QUERY, answer) == expected
+
+
+def test_relevancy_stats():
+    stats = RelevancyStats()
+    stats.record("error", "no")
+    stats.record("llm", "yes")
+    stats.record("llm", "yes")
+    assert stats.as_dict() == {"error:no": 1, "llm:yes": 2}
+
+
+def _graded(content, top_logprobs=None):
+    metadata = {}
+    if top_logprobs is not None:
+        metadata["logprobs"] = {"content": [{"token": content, "logprob": 0.0, "top_logprobs": [
+            {"token": token, "logprob": math.log(prob)} for token, prob in top_logprobs
+        ]}]}
+    return SimpleNamespace(content=content, response_metadata=metadata)
+
+
+def test_parse_grade():
+    verdict, confidence = parse_grade(
+        _graded("yes", [("yes", 0.6), ("Yes", 0.2), (" no", 0.1), ("maybe", 0.1)])
+    )
+    assert verdict == "yes" and confidence == pytest.approx(8 / 9)
+
+    verdict, confidence = parse_grade(_graded("no", [("no", 0.7), ("yes", 0.3)]))
+    assert verdict == "no" and confidence == pytest.approx(0.7)
+
+    assert parse_grade(_graded("No.")) == ("no", None)
+    with pytest.raises(ValueError):
+        parse_grade(_graded("perhaps"))
+
+
+class FakeLLM:
+    def __init__(self, response):
+        self.response = response
+        self.bound = None
+        self.prompts = []
+
+    def bind(self, **kwargs):
+        bound = FakeLLM(self.response)
+        bound.bound = kwargs
+        bound.prompts = self.prompts
+        self.last_bound = bound
+        return bound
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return self.response
+
+
+@pytest.mark.asyncio
+async def test_grade_yes_no_binds_single_token_call():
+    llm = FakeLLM(_graded("yes", [("yes", 0.9), ("no", 0.1)]))
+    verdict, confidence = await grade_yes_no(llm, "Is it relevant?", guided_choice=True)
+
+    assert verdict == "yes" and confidence == pytest.approx(0.9)
+    assert llm.prompts == ["Is it relevant?"]
+    assert llm.bound is None
+    assert llm.last_bound.bound["max_tokens"] <= 2
+    assert llm.last_bound.bound["logprobs"] is True
+    assert llm.last_bound.bound["extra_body"] == {"nvext": {"guided_choice": ["yes", "no"]}}
@@ -0,0 +1,90 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+import pytest
+from aiq_aira.collection_versions import CollectionVersionRegistry, documents_hash
+from aiq_aira.report_cache import (
+    CachedReport,
+    ReportCache,
+    replay_intermediate_steps,
+    report_cache_key
+)
+from aiq_aira.schema import GeneratedQuery
+
+
+def test_report_cache_key_is_canonical():
+    queries = [GeneratedQuery(query="q", report_section="s", rationale="r")]
+    key = report_cache_key({"topic": "cf", "search_web": True}, queries)
+
+    assert key == report_cache_key({"search_web": True, "topic": "cf"}, queries)
+    assert key != report_cache_key({"search_web": False, "topic": "cf"}, queries)
+
+
+def test_report_cache_round_trip_and_ttl(tmp_path):
+    cache = ReportCache(str(tmp_path), ttl_seconds=60)
+    cache.put("k", CachedReport(
+        final_report="report", citations="refs", intermediate_steps=[(0.5, "step")]
+    ))
+
+    entry = cache.get("k")
+    assert (entry.final_report, entry.citations, entry.intermediate_steps) == (
+        "report", "refs", [(0.5, "step")]
+    )
+    assert cache.get("missing") is None
+
+    cache.put("old", CachedReport(final_report="stale", created_at=time.time() - 120))
+    assert cache.evict_expired() == 1
+    assert not (tmp_path / "old.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_replay_intermediate_steps_is_accelerated():
+    entry = CachedReport(final_report="r", intermediate_steps=[(0.0, "a"), (1.0, "b"), (2.0, "c")])
+    start = time.monotonic()
+    steps = [step async for step in replay_intermediate_steps(entry, speedup=100)]
+
+    assert steps == ["a", "b", "c"]
+    assert 0.015 < time.monotonic() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_collection_version_bump_evicts_stale_reports(tmp_path):
+    registry_file = tmp_path / "collection_versions.json"
+    cache = ReportCache(str(tmp_path / "cache"), ttl_seconds=0)
+    registry = CollectionVersionRegistry(registry_file=str(registry_file))
+    registry.on_change(cache.evict_collection)
+
+    assert await registry.get_version("cf") == ""
+
+    def write_version(version, names):
+        registry_file.write_text(json.dumps({
+            "collections": {"cf": {"version": version, "content_hash": documents_hash(names)}}
+        }))
+
+    write_version(1, ["a.pdf"])
+    v1 = await registry.get_version("cf")
+    cache.put("cf-report", CachedReport(final_report="r", collection="cf", collection_version=v1))
+    cache.put(
+        "other-report", CachedReport(final_report="r", collection="other", collection_version="")
+    )
+
+    write_version(2, ["b.pdf", "a.pdf"])
+    # the mtime resolution of some filesystems is coarse
+    registry.refresh()
+    assert await registry.get_version("cf") != v1
+    assert cache.get("cf-report") is None
+    assert cache.get("other-report") is not None
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from aiq_aira.schema import GeneratedQuery
+from aiq_aira.report_sections import (
+    apply_report_patches,
+    format_sections_for_prompt,
+    group_sources_by_section,
+    parse_report,
+    render_report,
+    sources_report
+)
+
+REPORT = """# Cystic Fibrosis Report
+
+## Abstract
+CF is a genetic disease.
+
+## Gene Therapy
+AAV vectors are studied.
+
+```python
+# not a heading
+```
+
+## Conclusion
+More research is needed."""
+
+
+def test_parse_report_round_trips():
+    sections = parse_report(REPORT)
+    assert [s.heading for s in sections] == [
+        "", "# Cystic Fibrosis Report", "## Abstract", "## Gene Therapy", "## Conclusion"
+    ]
+    assert "# not a heading" in sections[3].body
+    assert render_report(sections) == REPORT
+    assert '<section id="2">\n## Abstract' in format_sections_for_prompt(sections)
+
+
+def test_apply_report_patches():
+    sections = parse_report(REPORT)
+    patched = render_report(apply_report_patches(sections, [
+        {"op": "append", "section": 3, "content": "Lentiviral vectors show promise."},
+        {"op": "replace", "section": 2, "content": "CF is an inherited disease."},
+        {
+            "op": "insert_after",
+            "section": 3,
+            "heading": "Cell Therapy",
+            "content": "Stem cells are explored."
+        },
+        {"op": "append", "section": 42, "content": "ignored"},
+        "not a patch",
+    ]))
+
+    assert "## Abstract\nCF is an inherited disease." in patched
+    assert (
+        "```\n\nLentiviral vectors show promise.\n\n"
+        "## Cell Therapy\nStem cells are explored.\n\n## Conclusion"
+    ) in patched
+    assert "ignored" not in patched
+
+
+def test_group_sources_by_section_keeps_plan_order():
+    queries = [
+        GeneratedQuery(query="q1", report_section="Gene Therapy", rationale=""),
+        GeneratedQuery(query="q2", report_section="Background", rationale=""),
+        GeneratedQuery(query="q3", report_section="gene therapy ", rationale=""),
+    ]
+    sources = (
+        "<sources>"
+        "<source><query>q2</query><answer>a2</answer></source>"
+        "<source><query>q3</query><answer>a3</answer></source>"
+        "<source><query>q1</query><answer>a1</answer></source>"
+        "<source><query>other</query><answer>a4</answer></source>"
+        "</sources>"
+    )
+    grouped = group_sources_by_section(sources, queries)
+
+    assert list(grouped) == ["Gene Therapy", "Background", "Additional Findings"]
+    assert grouped["Gene Therapy"].index("a3") < grouped["Gene Therapy"].index("a1")
+    assert "a2" in grouped["Background"] and "a1" not in grouped["Background"]
+    assert "a4" in grouped["Additional Findings"]
+
+
+def test_sources_report_skips_empty_answers():
+    sources = (
+        "<sources>"
+        "<source><query>q1</query><answer>a1</answer></source>"
+        "<source><query>q2</query><answer> </answer></source>"
+        "<source><query>q3</query><answer>a3</answer></source>"
+        "</sources>"
+    )
+    assert sources_report(sources) == "## q1\na1\n\n## q3\na3"
+    assert sources_report("not xml") == ""
@@ -0,0 +1,90 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from aiq_aira.deadline import make_deadline
+from aiq_aira.nodes import summarize_sources
+from aiq_aira.schema import AIRAState, GeneratedQuery
+
+QUERIES = [
+    GeneratedQuery(query="q1", report_section="Background", rationale="r"),
+    GeneratedQuery(query="q2", report_section="Methods", rationale="r"),
+]
+SOURCES = (
+    "<sources>"
+    "<source type=\"rag\"><query>q1</query><answer>background answer</answer></source>"
+    "<source type=\"rag\"><query>q2</query><answer>methods answer</answer></source>"
+    "</sources>"
+)
+
+
+class SlowSectionLLM:
+    """
+    Drafts every section at once, except for the `slow` section which does not finish in time.
+    """
+
+    model_name = "fake-model"
+
+    def __init__(self, slow: str):
+        self.slow = slow
+
+    async def astream(self, prompt, **kwargs):
+        text = "".join(message.content for message in prompt)
+        if f"# Section to write\n{self.slow}\n" in text:
+            await asyncio.sleep(5)
+        section = "Background" if "# Section to write\nBackground\n" in text else None
+        content = f"## {section}\n\ndrafted" if section else "# Title\n\nAbstract"
+        yield AIMessageChunk(content=content)
+
+
+def make_config(llm, **configurable):
+    return {"configurable": {
+        "llm": llm,
+        "report_organization": "Background, Methods",
+        "summary_mode": "map_reduce",
+        "context_window": 0,
+        **configurable
+    }}
+
+
+@pytest.mark.asyncio
+async def test_timed_out_section_marks_report_degraded():
+    config = make_config(
+        SlowSectionLLM(slow="Methods"), deadline=make_deadline(0.5), deadline_reserve=0
+    )
+    state = AIRAState(queries=QUERIES, web_research_results=[SOURCES])
+
+    update = await summarize_sources(state, config, lambda _: None)
+
+    # the report is finished from the sections that were drafted, generate_summary does not cache
+    # degraded reports (nor returns them as complete)
+    assert update["degraded"] is True
+    assert "## Background\n\ndrafted" in update["running_summary"]
+    assert "Methods" not in update["running_summary"]
+
+
+@pytest.mark.asyncio
+async def test_drafted_sections_are_not_degraded():
+    config = make_config(SlowSectionLLM(slow="none"), deadline=make_deadline(5), deadline_reserve=0)
+    state = AIRAState(queries=QUERIES, web_research_results=[SOURCES])
+
+    update = await summarize_sources(state, config, lambda _: None)
+
+    assert "degraded" not in update
+    assert update["running_summary"].startswith("# Title\n\nAbstract")
@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from aiq_aira.scheduler import FairQueue, Lane, current_lane, run_in_lane
+
+
+async def _serve(queue: FairQueue, requests: list[tuple[str, Lane]]) -> list[str]:
+    """
+    Queues all requests behind a held slot and returns the order they are served in.
+    """
+    served = []
+    blocker = queue.enqueue(Lane())
+
+    async def call(name, lane):
+        async with queue.slot(lane):
+            served.append(name)
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(call(name, lane)) for name, lane in requests]
+    await asyncio.sleep(0)
+    queue.leave(blocker)
+    await asyncio.gather(*tasks)
+    return served
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_overtake_queued_report_calls():
+    reports = [(f"report-{i}", Lane("report", "tenant-a")) for i in range(4)]
+    served = await _serve(FairQueue(1), reports + [("chat", Lane("interactive", "tenant-b"))])
+    assert served[0] == "chat"
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_capacity_fairly():
+    busy = [(f"a-{i}", Lane("report", "tenant-a")) for i in range(4)]
+    waiting = [("b-0", Lane("report", "tenant-b")), ("b-1", Lane("report", "tenant-b"))]
+    served = await _serve(FairQueue(1), busy + waiting)
+    assert served == ["a-0", "b-0", "a-1", "b-1", "a-2", "a-3"]
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_positions_and_withdrawal():
+    queue = FairQueue(1)
+    running = queue.enqueue(Lane())
+    first = queue.enqueue(Lane("report", "tenant-a"))
+    second = queue.enqueue(Lane("report", "tenant-b"))
+    assert (queue.position(running), queue.position(first), queue.position(second)) == (0, 1, 2)
+
+    positions = []
+
+    async def wait():
+        async for position in queue.wait(second):
+            positions.append(position)
+
+    waiter = asyncio.create_task(wait())
+    await asyncio.sleep(0)
+    queue.leave(first)      # the client of the first queued report disconnected
+    await asyncio.sleep(0.01)
+    queue.leave(running)
+    await waiter
+
+    assert positions == [2, 1]
+    assert queue.active == 1 and queue.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_capacity():
+    queue = FairQueue(1)
+    holder = queue.enqueue(Lane())
+
+    async def call():
+        async with queue.slot(Lane()):
+            pass
+
+    task = asyncio.create_task(call())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    queue.leave(holder)
+
+    assert queue.active == 0 and queue.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_lane_is_inherited_by_sub_tasks():
+    async def node():
+        return await asyncio.create_task(asyncio.sleep(0, current_lane()))
+
+    lane = Lane("interactive", "session-1")
+    assert await run_in_lane(lane, node()) == lane
+    assert current_lane() == Lane()
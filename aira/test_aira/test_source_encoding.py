@@ -0,0 +1,71 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import xml.etree.ElementTree as ET
+from aiq_aira.prompts import summarizer_instructions
+from aiq_aira.source_encoding import (
+    HANDLE_CITATIONS_INSTRUCTION,
+    encode_sources,
+    resolve_source_handles
+)
+from aiq_aira.token_budget import TokenBudget, TokenCounter, format_with_sources
+
+ANSWER = "CFTR modulators   improve lung function.\n\n\nThey are approved for most patients."
+
+
+def sources_xml(n: int) -> str:
+    # as written by deduplicate_and_format_sources for stored sources 1..n
+    root = ET.Element("sources")
+    for i in range(n):
+        source = ET.SubElement(root, "source", type="rag", refs=str(i + 1))
+        ET.SubElement(source, "query").text = f"cystic fibrosis query {i}"
+        ET.SubElement(source, "answer").text = ANSWER
+    return ET.tostring(root, encoding="unicode")
+
+
+def test_encode_sources_with_handles():
+    encoded = encode_sources(sources_xml(2))
+    assert (
+        "[S1] Q: cystic fibrosis query 0\nCFTR modulators improve lung function.\nThey are approved"
+    ) in encoded
+    assert "[S2] Q: cystic fibrosis query 1" in encoded
+    assert "<source" not in encoded
+
+
+def test_compact_encoding_uses_fewer_tokens_than_xml():
+    counter = TokenCounter()
+    xml = sources_xml(20)
+    assert counter.count(encode_sources(xml)) < 0.85 * counter.count(xml)
+
+
+def test_format_with_sources_compact():
+    prompt = format_with_sources(
+        TokenBudget(context_window=8000, output_tokens=1000),
+        "summarizer_instructions",
+        summarizer_instructions,
+        sources_xml(3),
+        "compact",
+        report_organization="intro, conclusion"
+    )
+    assert HANDLE_CITATIONS_INSTRUCTION in prompt
+    assert "[S3] Q: cystic fibrosis query 2" in prompt
+    assert "Do not include any source citations" not in prompt
+
+
+def test_resolve_source_handles():
+    report = "Modulators help [S3]. Transplants remain an option [S1, S4; S9]."
+    assert resolve_source_handles(report, {1: 1, 3: 2, 4: 2}) == (
+        "Modulators help [2]. Transplants remain an option [1, 2]."
+    )
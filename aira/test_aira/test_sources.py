@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from langgraph.graph import START, END, StateGraph
+from aiq_aira.checkpoints import open_checkpointer
+from aiq_aira.schema import AIRAState, SourceRecord
+from aiq_aira.sources import cited_sources, number_sources, render_sources, store_sources
+
+RAG = SourceRecord(kind="rag", query="q1", answer="CFTR mutations", documents=["a.pdf", "b.pdf"])
+WEB = SourceRecord(
+    kind="web", query="q1", answer="Lung transplantation", urls=["https://example.org/cf"]
+)
+
+
+def test_cited_sources_follow_relevancy():
+    assert cited_sources(RAG, {"score": "yes"}, [WEB]) == [RAG]
+    assert cited_sources(RAG, {"score": "no"}, [WEB]) == [WEB]
+    assert cited_sources(None, {"score": "yes"}, []) == []
+
+
+def test_number_and_render_sources():
+    stored, cited = store_sources([[RAG], [WEB, RAG]], 2)
+    assert [source.id for source in stored] == [3, 4]
+    assert [[source.id for source in query_sources] for query_sources in cited] == [[3], [4, 3]]
+    assert RAG.id == 0
+
+    rendered = render_sources(stored)
+    assert rendered.index("**Source** 1") < rendered.index("**Source** 2")
+    assert "CITATION:\na.pdf, b.pdf\n" in rendered
+    assert "CITATION:\nhttps://example.org/cf\n" in rendered
+
+
+@pytest.mark.asyncio
+async def test_source_store_appends_across_nodes_and_checkpoints(tmp_path):
+    async def research(state: AIRAState):
+        return {"sources": number_sources([RAG], len(state.sources))}
+
+    async def reflect(state: AIRAState):
+        return {"sources": number_sources([WEB], len(state.sources))}
+
+    async with open_checkpointer(str(tmp_path / "checkpoints.db")) as checkpointer:
+        builder = StateGraph(AIRAState)
+        builder.add_node("research", research)
+        builder.add_node("reflect", reflect)
+        builder.add_edge(START, "research")
+        builder.add_edge("research", "reflect")
+        builder.add_edge("reflect", END)
+        graph = builder.compile(checkpointer=checkpointer)
+
+        result = await graph.ainvoke({"queries": []}, config={"thread_id": "report-1"})
+        stored = [(source.id, source.kind) for source in result["sources"]]
+        assert stored == [(1, "rag"), (2, "web")]
+
+        snapshot = await graph.aget_state({"configurable": {"thread_id": "report-1"}})
+        assert snapshot.values["sources"] == result["sources"]
@@ -0,0 +1,203 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import json
+from aiq_aira.schema import AIRAState, GeneratedQuery, SourceRecord
+from aiq_aira.stream_utils import (
+    ThinkTagFilter,
+    StreamCoalescer,
+    JsonArrayStreamParser,
+    coalesce_stream,
+    dumps_event,
+    merge_state_updates,
+    remove_think_tags,
+    state_reducers
+)
+
+
+def feed_all(chunks):
+    think_filter = ThinkTagFilter()
+    thinking, answer = [], []
+    for chunk in chunks:
+        t, a = think_filter.feed(chunk)
+        thinking.append(t)
+        answer.append(a)
+    t, a = think_filter.flush()
+    thinking.append(t)
+    answer.append(a)
+    return think_filter, "".join(thinking), "".join(answer)
+
+
+@pytest.mark.parametrize("chunks", [
+    ["<think>", "reasoning", "</think>", "the answer"],
+    ["<thi", "nk>reason", "ing</th", "ink>the ", "answer"],
+    list("<think>reasoning</think>the answer"),
+])
+def test_think_filter_routes_split_tags(chunks):
+    think_filter, thinking, answer = feed_all(chunks)
+    assert thinking == "reasoning"
+    assert answer == "the answer"
+    assert think_filter.thinking == "reasoning"
+    assert think_filter.answer == "the answer"
+
+
+def test_think_filter_keeps_literal_angle_brackets():
+    _, thinking, answer = feed_all(["a < b and <b>bold</b> <", "thinker"])
+    assert thinking == ""
+    assert answer == "a < b and <b>bold</b> <thinker"
+
+
+def test_think_filter_missing_open_tag():
+    think_filter, _, _ = feed_all(["reasoning without a tag", "</think>", "answer"])
+    assert think_filter.answer == "answer"
+    assert think_filter.thinking == "reasoning without a tag"
+
+
+def test_remove_think_tags_matches_previous_behaviour():
+    assert remove_think_tags("x<think>a</think>b<think>c</think>d") == "xbd"
+    assert remove_think_tags("<think>a</think>b</think>c") == "c"
+    assert remove_think_tags("no tags here") == "no tags here"
+
+
+def test_stream_coalescer_batches_per_key():
+    now = [0.0]
+    coalescer = StreamCoalescer(flush_interval=0.05, max_frame_chars=10, clock=lambda: now[0])
+
+    assert coalescer.add({"summarize_sources": "abc"}) == []
+    assert coalescer.add({"rag_answer": "x"}) == []
+    assert coalescer.add({"summarize_sources": "defghij"}) == [{"summarize_sources": "abcdefghij"}]
+    assert coalescer.add({"queries": [1, 2]}) == [{"queries": [1, 2]}]
+
+    now[0] = 0.06
+    assert coalescer.add({"rag_answer": "y"}) == [{"rag_answer": "xy"}]
+    assert coalescer.time_until_due() is None
+
+
+@pytest.mark.asyncio
+async def test_coalesce_stream_flushes_on_node_boundary():
+    async def events():
+        yield "custom", {"summarize_sources": "a"}
+        yield "custom", {"summarize_sources": "b"}
+        yield "values", {"running_summary": "ab"}
+        yield "custom", {"final_report": "c"}
+
+    coalescer = StreamCoalescer(flush_interval=60, max_frame_chars=1024)
+    frames = [item async for item in coalesce_stream(events(), coalescer)]
+    assert frames == [
+        ("custom", {"summarize_sources": "ab"}),
+        ("values", {"running_summary": "ab"}),
+        ("custom", {"final_report": "c"}),
+    ]
+
+
+def feed_thinking_first(chunks):
+    think_filter = ThinkTagFilter(thinking_first=True)
+    thinking, answer = [], []
+    for chunk in [*chunks, None]:
+        t, a = think_filter.feed(chunk) if chunk is not None else think_filter.flush()
+        thinking.append(t)
+        answer.append(a)
+    return think_filter, thinking, answer
+
+
+@pytest.mark.parametrize("chunks", [
+    # the chat template opened the <think> block, the model only closes it
+    ["reason", "ing</th", "ink>the ", "answer"],
+    # the model opens the block itself
+    ["<think>reason", "ing</think>", "the answer"],
+])
+def test_think_filter_thinking_first_streams_leading_thinking(chunks):
+    think_filter, thinking, answer = feed_thinking_first(chunks)
+    # the thinking is streamed as thinking as it arrives, not as answer deltas
+    assert thinking[0] == "reason"
+    assert "".join(thinking) == "reasoning"
+    assert "".join(answer) == "the answer"
+    assert think_filter.answer == "the answer"
+
+
+def test_think_filter_thinking_first_without_thinking():
+    # a model that did not think at all: the output is the answer
+    think_filter, thinking, answer = feed_thinking_first(["the ", "answer"])
+    assert answer[-1] == "the answer"
+    assert think_filter.answer == "the answer"
+    assert think_filter.thinking == ""
+
+
+def test_merge_state_updates_returns_only_changes():
+    state = {"running_summary": "", "citations": None}
+
+    delta = merge_state_updates(state, {"web_research": {"citations": "a", "running_summary": ""}})
+    assert delta == {"citations": "a"}
+
+    assert merge_state_updates(state, {"call_virtual_screening_nims": None}) == {}
+    delta = merge_state_updates(state, {"summarize_sources": {"running_summary": "draft"}})
+    assert delta == {"running_summary": "draft"}
+    assert state == {"running_summary": "draft", "citations": "a"}
+
+
+def test_merge_state_updates_applies_reducers():
+    reducers = state_reducers(AIRAState)
+    assert set(reducers) == {"sources", "usage"}
+
+    first = SourceRecord(id=1, kind="rag", query="q1", answer="a1")
+    second = SourceRecord(id=2, kind="web", query="q2", answer="a2", urls=["https://example.com"])
+    state = {"sources": [], "usage": {}}
+
+    delta = merge_state_updates(state, {
+        "web_research": {"sources": [first], "usage": {"web_research": {"llm_calls": 1}}}
+    }, reducers)
+    assert delta == {"sources": [first], "usage": {"web_research": {"llm_calls": 1}}}
+
+    # the second node appends to the sources instead of replacing them, the delta holds only its own
+    delta = merge_state_updates(state, {
+        "reflect_on_summary": {
+            "sources": [second], "usage": {"reflect_on_summary": {"llm_calls": 2}}
+        }
+    }, reducers)
+    assert delta == {"sources": [second], "usage": {"reflect_on_summary": {"llm_calls": 2}}}
+    assert state["sources"] == [first, second]
+    assert state["usage"] == {
+        "web_research": {"llm_calls": 1}, "reflect_on_summary": {"llm_calls": 2}
+    }
+
+    # nodes adding nothing do not produce a delta
+    delta = merge_state_updates(
+        state, {"finalize_summary": {"sources": [], "final_report": "r"}}, reducers
+    )
+    assert delta == {"final_report": "r"}
+    assert state["sources"] == [first, second]
+
+
+def test_dumps_event_serializes_pydantic():
+    query = GeneratedQuery(query="q", report_section="s", rationale="r")
+    assert json.loads(dumps_event({"queries": [query]})) == {"queries": [query.model_dump()]}
+
+
+def test_json_array_stream_parser_emits_objects_as_they_complete():
+    stream = (
+        '```json\n[\n  {"query": "a {b} \\"c\\"", "report_section": "Intro", "rationale": "[x]"},\n'
+        '  {"query": "d", "report_section": "Body", "rationale": "e"}\n]\n```'
+    )
+    parser = JsonArrayStreamParser()
+    emitted = []
+    for i in range(0, len(stream), 7):
+        emitted.append(parser.feed(stream[i:i + 7]))
+
+    objects = [obj for batch in emitted for obj in batch]
+    assert [obj["query"] for obj in objects] == ['a {b} "c"', "d"]
+    # the first object is available before the array has been fully streamed
+    first_batch = next(i for i, batch in enumerate(emitted) if batch)
+    assert first_batch < len(emitted) - 2
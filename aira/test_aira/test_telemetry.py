@@ -0,0 +1,135 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+
+import pytest
+
+from aiq_aira import telemetry
+from aiq_aira.schema import AIRAState
+from aiq_aira.telemetry import MAX_ATTRIBUTE_CHARS, call_span, stage_span
+from aiq_aira.usage import track_usage
+
+
+class RecordingTracer:
+    """
+    Records the spans and their attributes in place of an OpenTelemetry tracer.
+    """
+
+    def __init__(self):
+        self.spans: list[tuple[str, dict]] = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name):
+        attributes = {}
+
+        class Span:
+            def set_attribute(self, key, value):
+                attributes[key] = value
+
+        self.spans.append((name, attributes))
+        yield Span()
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = RecordingTracer()
+    monkeypatch.setattr(telemetry, "_tracer", tracer)
+    return tracer
+
+
+def test_spans_are_a_shared_noop_when_disabled():
+    assert call_span("rag", query="CFTR") is call_span("tavily")
+    assert stage_span("summarize_sources") is call_span("nim")
+    with call_span("rag", query="CFTR") as span:
+        span.set_attribute("response_bytes", 10)
+
+
+def test_call_span_attributes(tracer):
+    with call_span("rag", query="q" * 1000, collection="Biomedical_Dataset") as span:
+        span.set_attribute("response_bytes", 2048)
+        span.set_attribute("results", None)
+
+    name, attributes = tracer.spans[0]
+    assert name == "aira.rag"
+    assert len(attributes["aira.query"]) == MAX_ATTRIBUTE_CHARS
+    assert attributes["aira.collection"] == "Biomedical_Dataset"
+    assert attributes["aira.response_bytes"] == 2048
+    assert "aira.results" not in attributes
+
+
+def test_call_span_reraises_errors(tracer):
+    with pytest.raises(asyncio.TimeoutError):
+        with call_span("nim", url="http://diffdock:8000"):
+            raise asyncio.TimeoutError()
+
+
+@pytest.mark.asyncio
+async def test_graph_nodes_get_a_stage_span(tracer):
+    async def finalize_summary(state: AIRAState, config, writer):
+        with call_span("report_cache", collection="Biomedical_Dataset") as span:
+            span.set_attribute("hit", False)
+        return {"final_report": "# Cystic Fibrosis"}
+
+    update = await track_usage(finalize_summary)(AIRAState(), config={}, writer=print)
+
+    assert update["final_report"] == "# Cystic Fibrosis"
+    assert [name for name, _ in tracer.spans] == ["aira.finalize_summary", "aira.report_cache"]
+    assert tracer.spans[1][1]["aira.hit"] is False
+
+
+class FakePrometheus:
+    """
+    Stands in for prometheus_client, raising like it on duplicate metrics and ports.
+    """
+
+    def __init__(self):
+        self.REGISTRY = object()
+        self.names: set = set()
+        self.ports: list[int] = []
+        self.Histogram = self.Gauge = self.Counter = self._metric
+
+    def _metric(self, name, *args, registry, **kwargs):
+        if (registry, name) in self.names:
+            raise ValueError(f"Duplicated timeseries in CollectorRegistry: {name}")
+        self.names.add((registry, name))
+        return object()
+
+    def start_http_server(self, port, registry):
+        if port in self.ports:
+            raise OSError("Address already in use")
+        self.ports.append(port)
+
+
+def test_configure_telemetry_again_reuses_metrics_and_server(monkeypatch):
+    prometheus = FakePrometheus()
+    monkeypatch.setattr(telemetry, "prometheus_client", prometheus)
+    monkeypatch.setattr(telemetry, "_metrics", None)
+    monkeypatch.setattr(telemetry, "_registry_metrics", {})
+    monkeypatch.setattr(telemetry, "_served_ports", set())
+
+    telemetry.configure_telemetry(metrics=True, metrics_port=9464)
+    metrics = telemetry._metrics
+    telemetry.configure_telemetry(metrics=False)
+    assert telemetry._metrics is None
+    telemetry.configure_telemetry(metrics=True, metrics_port=9464)
+
+    assert telemetry._metrics is metrics
+    assert prometheus.ports == [9464]
+
+    other_registry = object()
+    telemetry.configure_telemetry(metrics=True, registry=other_registry)
+    assert telemetry._metrics is not metrics
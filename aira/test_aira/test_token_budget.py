@@ -0,0 +1,59 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import xml.etree.ElementTree as ET
+from aiq_aira.token_budget import TokenBudget, format_with_sources
+
+
+def make_sources(*sources):
+    root = ET.Element("sources")
+    for source_type, query, answer in sources:
+        source = ET.SubElement(root, "source", type=source_type)
+        ET.SubElement(source, "query").text = query
+        ET.SubElement(source, "answer").text = answer
+    return ET.tostring(root, encoding="unicode")
+
+
+def test_pack_sources_prefers_rag_and_keeps_order():
+    sources = make_sources(
+        ("web", "w1", "w" * 2000), ("rag", "r1", "r" * 2000), ("rag", "r2", "s" * 2000)
+    )
+    budget = TokenBudget(context_window=10000, output_tokens=1000)
+
+    assert budget.pack_sources(sources, 5000)[0] == sources
+
+    packed, usage = budget.pack_sources(sources, 1200)
+    root = ET.fromstring(packed)
+    assert [s.findtext("query") for s in root.findall("source")] == ["w1", "r1", "r2"]
+    assert root.findall("source")[0].findtext("answer").endswith("[...]")
+    assert (usage.sources_kept, usage.sources_truncated, usage.sources_dropped) == (3, 1, 0)
+    assert budget.counter.count(packed) <= 1200
+
+    packed, usage = budget.pack_sources(sources, 1050)
+    assert [s.findtext("query") for s in ET.fromstring(packed).findall("source")] == ["r1", "r2"]
+    assert usage.sources_dropped == 1
+
+
+def test_format_with_sources_fits_context_window():
+    sources = make_sources(*[("rag", f"q{i}", "x" * 4000) for i in range(10)])
+    template = "# Report organization\n{report_organization}\n\n# Knowledge Sources\n{source}"
+    budget = TokenBudget(context_window=8000, output_tokens=2000)
+
+    prompt = format_with_sources(budget, "test", template, sources, report_organization="Intro")
+    assert budget.counter.count(prompt) <= budget.context_window - budget.output_tokens
+    assert prompt.startswith("# Report organization\nIntro")
+    assert format_with_sources(
+        None, "test", template, sources, report_organization="Intro"
+    ) == template.format(source=sources, report_organization="Intro")
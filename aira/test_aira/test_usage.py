@@ -0,0 +1,96 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import START, END, StateGraph
+from langgraph.types import StreamWriter
+
+from aiq_aira.llm_gateway import stream_llm
+from aiq_aira.schema import AIRAState
+from aiq_aira.usage import merge_usage, record_usage, track_usage, usage_report
+
+
+class ReasoningLLM:
+    model_name = "reasoning-model"
+
+    def bind(self, **options):
+        return self
+
+    async def astream(self, prompt, **kwargs):
+        yield AIMessageChunk(content="<think>CFTR modulators first</think>")
+        yield AIMessageChunk(content="# Cystic Fibrosis")
+        yield AIMessageChunk(
+            content="",
+            usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120}
+        )
+
+
+async def summarize_sources(state: AIRAState, config: RunnableConfig, writer: StreamWriter):
+    async def search(query):
+        record_usage(rag_calls=1)
+
+    await asyncio.gather(search("CFTR"), search("gene therapy"))
+    think_filter = await stream_llm(
+        config["configurable"]["llm"], "prompt", "summarize",
+        on_answer=lambda text: writer({"summary": text})
+    )
+    return {"running_summary": think_filter.answer}
+
+
+async def finalize_summary(state: AIRAState, config: RunnableConfig, writer: StreamWriter):
+    return {"final_report": state.running_summary}
+
+
+@pytest.mark.asyncio
+async def test_usage_is_aggregated_per_node_in_the_graph_state():
+    builder = StateGraph(AIRAState)
+    builder.add_node("summarize_sources", track_usage(summarize_sources))
+    builder.add_node("finalize_summary", track_usage(finalize_summary))
+    builder.add_edge(START, "summarize_sources")
+    builder.add_edge("summarize_sources", "finalize_summary")
+    builder.add_edge("finalize_summary", END)
+
+    state = await builder.compile().ainvoke(
+        {"queries": []}, config={"configurable": {"llm": ReasoningLLM()}}
+    )
+
+    assert state["final_report"] == "# Cystic Fibrosis"
+    summarize = state["usage"]["summarize_sources"]
+    assert summarize["llm_calls"] == 1 and summarize["rag_calls"] == 2
+    assert summarize["prompt_tokens"] == 100 and summarize["completion_tokens"] == 20
+    assert summarize["thinking_tokens"] == 6  # estimated from the thinking text
+    assert "llm_calls" not in state["usage"]["finalize_summary"]
+
+    report = usage_report(state["usage"], 1.5)
+    assert report["total"]["llm_calls"] == 1 and report["total"]["wall_seconds"] == 1.5
+    assert usage_report({}, 0.1, cache_hits=1)["total"]["cache_hits"] == 1
+
+
+def test_merge_usage_sums_repeated_nodes():
+    first = {"reflect_on_summary": {"llm_calls": 2, "rag_calls": 1}}
+    second = {"reflect_on_summary": {"llm_calls": 1}, "finalize_summary": {"llm_calls": 1}}
+    assert merge_usage(first, second) == {
+        "reflect_on_summary": {"llm_calls": 3, "rag_calls": 1},
+        "finalize_summary": {"llm_calls": 1},
+    }
+    assert first == {"reflect_on_summary": {"llm_calls": 2, "rag_calls": 1}}
+
+
+def test_record_usage_outside_a_node_is_ignored():
+    record_usage(rag_calls=1)
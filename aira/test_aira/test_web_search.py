@@ -170,10 +170,11 @@ async def test_web_research_relevant(mock_rag_relevant, reasoning_llm, capsys):
 
         aira_stream_results = capsys.readouterr()
         print(aira_stream_results.out)
-        assert "citations" in result
-        citations = result["citations"] 
-        citation_list = citations.split("\n")
-        assert len(citation_list) == 15 # based on the rag_response_relevant.json file
+        assert "sources" in result
+        sources = result["sources"]
+        assert [source.id for source in sources] == [1, 2]
+        # based on the rag_response_relevant.json file
+        assert all(source.documents == ["Q4FY25-CFO-Commentary.pdf"] for source in sources)
         assert "web_research_results" in result
         assert "{'score': 'yes'}" in aira_stream_results.out  
     
@@ -205,6 +206,6 @@ async def test_web_research_not_relevant(mock_rag_not_relevant, reasoning_llm, c
 
         aira_stream_results = capsys.readouterr()
         print(aira_stream_results.out)
-        assert "citations" in result
+        assert "sources" in result
         assert "web_research_results" in result
         assert "{'score': 'no'}" in aira_stream_results.out  
\ No newline at end of file
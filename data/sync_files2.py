@@ -16,6 +16,8 @@
 import os
 import json
 import glob
+import time
+import tempfile
 import asyncio
 import logging
 import zipfile
@@ -32,9 +34,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-RAG_URL = os.getenv("RAG_INGEST_URL", "http://ingestor-server:8082")
+RAG_URL = os.getenv("RAG_INGEST_URL", "http://ingestor-server:8082/v1")
 MAX_UPLOAD_WAIT_TIME = os.getenv("MAX_UPLOAD_WAIT_TIME", 60*60)
 FILES_DIR = "."     
+# JSON file shared with the agent, a collection's version is bumped after every finished upload
+# so cached answers and reports of that collection are invalidated. Empty disables the registry.
+COLLECTION_VERSIONS_FILE = os.getenv("COLLECTION_VERSIONS_FILE", "")
 
 class Document(BaseModel):
     """ A document response from the RAG server. """
@@ -192,9 +197,45 @@ async def get_existing_documents(collection_name: str, rag_url: str) -> List[Doc
     """
     async with aiohttp.ClientSession() as session:
         async with session.get(f"{rag_url}/documents", params={"collection_name": collection_name}) as response:
+            if response.status != 200:
+                logger.warning(
+                    f"Could not list the documents of collection {collection_name} "
+                    f"from {rag_url}/documents: HTTP {response.status} {await response.text()}"
+                )
+                return []
             result = await response.json()
             return [Document(document_name=doc["document_name"]) for doc in result.get("documents", [])]
 
+def bump_collection_version(
+        collection_name: str,
+        document_names: List[str],
+        registry_file: str
+) -> int:
+    """
+    Increment the version of a collection in the collection version registry and record
+    the content hash of its document list. Returns the new version.
+    Versioning needs the aiq_aira package, the uploads themselves only need data/requirements.txt.
+    """
+    from aiq_aira.collection_versions import documents_hash
+
+    registry = {"collections": {}}
+    if os.path.exists(registry_file):
+        with open(registry_file, "r") as f:
+            registry = json.load(f)
+
+    entry = registry.setdefault("collections", {}).get(collection_name, {"version": 0})
+    entry["version"] += 1
+    entry["content_hash"] = documents_hash(document_names)
+    entry["updated_at"] = time.time()
+    registry["collections"][collection_name] = entry
+
+    # write atomically, the agent may read the file at any time
+    registry_dir = os.path.dirname(os.path.abspath(registry_file))
+    with tempfile.NamedTemporaryFile("w", dir=registry_dir, delete=False) as f:
+        json.dump(registry, f, indent=2)
+    os.replace(f.name, registry_file)
+    return entry["version"]
+
 async def process_zip_file(zip_path: str):
     """
     Processes a single zip file: unzips it, uploads all files in a batch to the RAG server
@@ -264,6 +305,13 @@ async def process_zip_file(zip_path: str):
         logger.info(f"\n \n--- \n Document Results: {"\n".join([f"{doc.document_name}: Success"  for doc in upload_status.result.documents])}")
         logger.info(f"\n \n Failed Documents: {"\n".join([f"{doc.document_name}: {doc.error_message}" for doc in upload_status.result.failed_documents])}")
 
+        if COLLECTION_VERSIONS_FILE:
+            documents = await get_existing_documents(collection_name, RAG_URL)
+            version = bump_collection_version(
+                collection_name, [doc.document_name for doc in documents], COLLECTION_VERSIONS_FILE
+            )
+            logger.info(f"Collection {collection_name} is now at version {version}")
+
 
 async def main():
     """Main function to process each zip file in the directory and upload to RAG server."""